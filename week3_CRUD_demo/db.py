@@ -1,22 +1,34 @@
+"""
+MySQL connection helpers for the week 3 scripts.
+
+Thin wrapper over the pooled driver in week4_integration/backend/db.py with
+DB_DIALECT=mysql: connections are reused from the pool instead of opening a new
+pymysql connection per call.
+"""
+import importlib.util
 import os
-import pymysql
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
+os.environ.setdefault("DB_DIALECT", "mysql")
+
+_BACKEND_DB = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "week4_integration", "backend", "db.py"
+))
+_spec = importlib.util.spec_from_file_location("pawpoint_db", _BACKEND_DB)
+_db = importlib.util.module_from_spec(_spec)
+sys.modules["pawpoint_db"] = _db
+_spec.loader.exec_module(_db)
 
-def get_connection():
-    return pymysql.connect(
-        host='localhost',
-        user='root',
-        password=os.environ.get('DB_PASSWORD', ''),
-        database=os.environ.get('DB_NAME', ''),
-        cursorclass=pymysql.cursors.DictCursor
-    )
+get_connection = _db.get_connection
+release_connection = _db.release_connection
+get_db_conn = _db.get_db_conn
+dialect = _db.dialect
 
 if __name__ == "__main__":
     try:
-        conn = get_connection()
-        with conn:
+        with get_db_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
                 print("DB connected! Result:", cur.fetchone())
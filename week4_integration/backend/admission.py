@@ -0,0 +1,359 @@
+"""
+Admission control: per-route concurrency caps and weighted fair queuing between roles.
+
+The pool only has DB_POOL_MAX connections. A few admins refreshing /appointments or
+/reports/treatments could hold all of them while owners wait to book. Every request
+therefore takes a slot from a gate sized to the pool before its handler runs:
+
+    - per-route caps (ROUTE_CONCURRENCY): expensive reads get at most a fraction of the
+      pool, keyed by endpoint or endpoint:role without the blueprint prefix
+      (get_appointments:admin is the heavy branch, an owner's /appointments is not)
+    - a write reserve (ADMISSION_WRITE_RESERVE slots): reads never take the last slots,
+      so POST/PUT/PATCH/DELETE keep a share even when reads saturate the rest
+    - weighted fair queuing (ADMISSION_WEIGHTS): when requests have to wait, roles are
+      served in proportion to their weight rather than in arrival order. Each waiter gets a
+      virtual finish tag max(now_virtual, last_tag[role]) + 1/weight, and the admissible
+      waiter with the smallest tag goes next.
+
+Under overload requests are shed early instead of piling up: the gate keeps an EWMA of
+how long a slot is held, and a request whose predicted queue wait
+(waiters ahead + 1) * service_time / capacity exceeds ADMISSION_TIMEOUT gets a 503 with
+Retry-After right away. Requests that do queue get a 503 once they have waited
+ADMISSION_TIMEOUT seconds, and a handler that still cannot get a pooled connection within
+DB_POOL_TIMEOUT (db.PoolTimeout) gets one too. That bounds tail latency at roughly the
+admission timeout plus the handler itself. stats() reports every shedding decision by
+reason, role and route for /metrics. Streaming handlers call hold_for_stream() so their slot lasts until the last
+chunk is sent instead of ending with the view function.
+
+A request's slot pays for one connection. Queries it runs side by side (parallel.py) hold
+more, so parallel.gather() borrow()s a slot for each extra one. Borrowing never waits and
+never goes ahead of queued requests: when no slot is free the queries run one after
+another, and the gate keeps bounding the connections in use by DB_POOL_MAX.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+
+import token_cache
+from db import PoolTimeout
+from routes import endpoint_name
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# fraction of the pool (at least one connection) each expensive route may hold at once
+DEFAULT_ROUTE_LIMITS = {
+    "get_appointments:admin": 0.3,
+    "get_treatments:admin": 0.3,
+    "get_owners": 0.3,
+    "get_users": 0.3,
+    "report_by_status": 0.2,
+    "report_by_clinic": 0.2,
+    "report_treatments": 0.2,
+    "report_summary": 0.2,
+    "dashboard": 0.2,
+    "export_treatments": 0.1,
+}
+
+DEFAULT_WEIGHTS = "pet_owner=4,veterinarian=3,anonymous=2,admin=1"
+
+# endpoints that never touch the database
+EXEMPT_ENDPOINTS = {"static", "metrics", "healthz", "readyz"}
+
+
+def parse_pairs(value):
+    """'a=1,b:admin=2' -> {'a': '1', 'b:admin': '2'}"""
+    pairs = {}
+    for item in str(value or "").split(","):
+        key, sep, val = item.partition("=")
+        if sep and key.strip():
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+class Shed(Exception):
+    """Request refused by admission control; retry_after is a hint in seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    __slots__ = ("role", "route", "write", "tag", "granted", "granted_at")
+
+    def __init__(self, role, route, write, tag):
+        self.role = role
+        self.route = route
+        self.write = write
+        self.tag = tag
+        self.granted = False
+        self.granted_at = None
+
+
+class AdmissionGate:
+    """Slots for `capacity` concurrent requests, shared out as described in the module doc."""
+
+    def __init__(self, capacity, route_limits=None, weights=None, write_reserve=1):
+        self.capacity = max(1, capacity)
+        self.route_limits = dict(route_limits or {})
+        self.weights = dict(weights or {})
+        self.write_reserve = min(max(0, write_reserve), self.capacity - 1)
+        self._cond = threading.Condition()
+        self._queues = {}  # role -> deque of waiting tickets
+        self._last_tag = {}
+        self._virtual = 0.0
+        self._in_use = 0
+        self._reads_in_use = 0
+        self._route_in_use = {}
+        self._service_s = 0.05  # EWMA of slot hold time, seeded at 50 ms
+        self._extra_in_use = 0
+        self._stats = {"admitted": 0, "queued": 0, "wait_ms_total": 0.0, "extra_granted": 0, "extra_refused": 0}
+        self._shed = {"reasons": {}, "roles": {}, "routes": {}}
+
+    def route_key(self, endpoint, role):
+        endpoint = endpoint_name(endpoint)
+        key = f"{endpoint}:{role}"
+        return key if key in self.route_limits else (endpoint if endpoint in self.route_limits else None)
+
+    def _admissible(self, ticket):
+        if self._in_use >= self.capacity:
+            return False
+        if not ticket.write and self._reads_in_use >= self.capacity - self.write_reserve:
+            return False
+        if ticket.route is not None and self._route_in_use.get(ticket.route, 0) >= self.route_limits[ticket.route]:
+            return False
+        return True
+
+    def _grant(self, ticket):
+        ticket.granted = True
+        ticket.granted_at = time.monotonic()
+        self._in_use += 1
+        if not ticket.write:
+            self._reads_in_use += 1
+        if ticket.route is not None:
+            self._route_in_use[ticket.route] = self._route_in_use.get(ticket.route, 0) + 1
+        self._stats["admitted"] += 1
+
+    def _dispatch(self):
+        """Grant waiting tickets in finish-tag order while slots allow; caller holds the lock."""
+        granted = False
+        while True:
+            best = None
+            for queue in self._queues.values():
+                for ticket in queue:
+                    if self._admissible(ticket):
+                        if best is None or ticket.tag < best.tag:
+                            best = ticket
+                        break  # later tickets of a role never go before its first admissible one
+            if best is None:
+                break
+            self._queues[best.role].remove(best)
+            self._virtual = max(self._virtual, best.tag)
+            self._grant(best)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def predicted_wait(self, ahead):
+        """Seconds until a request with `ahead` waiters in front of it is likely admitted."""
+        return (ahead + 1) * self._service_s / self.capacity
+
+    def acquire(self, role, route, write, timeout):
+        """Ticket once admitted; raises Shed when the wait would or did exceed `timeout`."""
+        with self._cond:
+            weight = float(self.weights.get(role, 1)) or 1.0
+            tag = max(self._virtual, self._last_tag.get(role, 0.0)) + 1.0 / weight
+            ticket = Ticket(role, route, write, tag)
+            waiting = sum(len(q) for q in self._queues.values())
+            if not waiting and self._admissible(ticket):
+                self._virtual = max(self._virtual, tag)
+                self._last_tag[role] = tag
+                self._grant(ticket)
+                return ticket
+            predicted = self.predicted_wait(waiting)
+            if predicted > timeout:
+                # shed now rather than make the client wait for a 503 anyway
+                self._record_shed("predicted", role, route)
+                raise Shed("predicted", predicted)
+            self._last_tag[role] = tag
+            self._queues.setdefault(role, deque()).append(ticket)
+            self._stats["queued"] += 1
+            self._dispatch()
+            start = time.monotonic()
+            deadline = start + timeout
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queues[role].remove(ticket)
+                    self._record_shed("timeout", role, route)
+                    # a ticket stuck behind this one may be admissible now
+                    self._dispatch()
+                    raise Shed("timeout", self.predicted_wait(sum(len(q) for q in self._queues.values())))
+                self._cond.wait(remaining)
+            self._stats["wait_ms_total"] += (ticket.granted_at - start) * 1000
+            return ticket
+
+    def try_extra(self, ticket, wanted):
+        """Up to `wanted` more slots for the request holding `ticket`, without waiting."""
+        with self._cond:
+            granted = 0
+            if not any(self._queues.values()):  # queued requests go first
+                while granted < wanted and self._in_use < self.capacity and (
+                    ticket.write or self._reads_in_use < self.capacity - self.write_reserve
+                ):
+                    self._in_use += 1
+                    if not ticket.write:
+                        self._reads_in_use += 1
+                    granted += 1
+            self._extra_in_use += granted
+            self._stats["extra_granted"] += granted
+            self._stats["extra_refused"] += wanted - granted
+            return granted
+
+    def release_extra(self, ticket, count):
+        with self._cond:
+            self._in_use -= count
+            if not ticket.write:
+                self._reads_in_use -= count
+            self._extra_in_use -= count
+            self._dispatch()
+
+    def _record_shed(self, reason, role, route):
+        for group, key in (("reasons", reason), ("roles", role), ("routes", route or "other")):
+            counts = self._shed[group]
+            counts[key] = counts.get(key, 0) + 1
+
+    def shed(self, reason, role=None, route=None):
+        """Count a shedding decision taken outside the gate (e.g. a pool timeout in a handler)."""
+        with self._cond:
+            self._record_shed(reason, role or "anonymous", route)
+            return self.predicted_wait(sum(len(q) for q in self._queues.values()))
+
+    def release(self, ticket):
+        with self._cond:
+            held = time.monotonic() - ticket.granted_at
+            self._service_s += 0.1 * (held - self._service_s)
+            self._in_use -= 1
+            if not ticket.write:
+                self._reads_in_use -= 1
+            if ticket.route is not None:
+                self._route_in_use[ticket.route] -= 1
+            self._dispatch()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                capacity=self.capacity,
+                in_use=self._in_use,
+                reads_in_use=self._reads_in_use,
+                extra_in_use=self._extra_in_use,
+                service_ms=self._service_s * 1000,
+                waiting={role: len(q) for role, q in self._queues.items() if q},
+                routes={route: n for route, n in self._route_in_use.items() if n},
+                shed={group: dict(counts) for group, counts in self._shed.items()},
+            )
+
+
+gate = None
+
+
+def init_admission(app, capacity):
+    """Size the gate to `capacity` pool connections and register the request hooks."""
+    global gate
+    app.config.setdefault("ADMISSION_ENABLED", os.environ.get("ADMISSION_ENABLED", "1") == "1")
+    app.config.setdefault("ADMISSION_TIMEOUT", float(os.environ.get("ADMISSION_TIMEOUT", 5)))
+    app.config.setdefault("ADMISSION_WEIGHTS", os.environ.get("ADMISSION_WEIGHTS", DEFAULT_WEIGHTS))
+    app.config.setdefault(
+        "ADMISSION_WRITE_RESERVE", int(os.environ.get("ADMISSION_WRITE_RESERVE", max(1, capacity // 5)))
+    )
+    app.config.setdefault("ROUTE_CONCURRENCY", os.environ.get("ROUTE_CONCURRENCY", ""))
+
+    limits = {route: max(1, int(capacity * share)) for route, share in DEFAULT_ROUTE_LIMITS.items()}
+    limits.update({route: max(1, int(n)) for route, n in parse_pairs(app.config["ROUTE_CONCURRENCY"]).items()})
+    weights = {role: float(w) for role, w in parse_pairs(app.config["ADMISSION_WEIGHTS"]).items()}
+    gate = AdmissionGate(capacity, limits, weights, app.config["ADMISSION_WRITE_RESERVE"])
+
+    @app.errorhandler(PoolTimeout)
+    def _pool_timeout(e):
+        role = request_role()
+        return shed_response(gate.shed("pool_timeout", role, gate.route_key(request.endpoint, role)))
+
+    if not app.config["ADMISSION_ENABLED"]:
+        return app
+
+    @app.before_request
+    def _admit():
+        if request.method == "OPTIONS" or request.endpoint is None or endpoint_name(request.endpoint) in EXEMPT_ENDPOINTS:
+            return None
+        role = request_role()
+        try:
+            g.admission_ticket = gate.acquire(
+                role,
+                gate.route_key(request.endpoint, role),
+                request.method in WRITE_METHODS,
+                app.config["ADMISSION_TIMEOUT"],
+            )
+        except Shed as e:
+            return shed_response(e.retry_after)
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        ticket = g.pop("admission_ticket", None)
+        if ticket is not None:
+            gate.release(ticket)
+
+    return app
+
+
+def shed_response(retry_after):
+    response = jsonify({"message": "Server busy, please retry"})
+    response.headers["Retry-After"] = str(max(1, int(math.ceil(retry_after))))
+    return response, 503
+
+
+def request_role():
+    """Role of the request's token, or 'anonymous'; the handlers still enforce auth."""
+    try:
+        if verify_jwt_in_request(optional=True) is None:
+            return "anonymous"
+        return token_cache.current_state().role or "anonymous"
+    except Exception:
+        return "anonymous"
+
+
+def hold_for_stream():
+    """Keep this request's slot past the view function; pass the result to Response.call_on_close."""
+    ticket = g.pop("admission_ticket", None)
+    released = []
+
+    def release():
+        if ticket is not None and not released:
+            released.append(True)
+            gate.release(ticket)
+
+    return release
+
+
+def borrow(wanted):
+    """
+    (slots, release) for up to `wanted` extra connections of the current request, granted
+    without waiting; call release() once they are all returned. Requests that were not
+    admitted through the gate (admission off, no request) get all of them.
+    """
+    ticket = g.get("admission_ticket") if has_request_context() else None
+    if ticket is None or gate is None or wanted <= 0:
+        return wanted, lambda: None
+    granted = gate.try_extra(ticket, wanted)
+    return granted, lambda: gate.release_extra(ticket, granted) if granted else None
+
+
+def stats():
+    return gate.stats() if gate is not None else {}
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Startup cost and memory per worker of the backend.
+
+Two measurements, each against the tree in --chdir (default: this backend), so an older
+checkout (git worktree add /tmp/before <commit>) can be compared with the current one:
+
+    boot     fresh interpreters that import app and answer a first GET /healthz through
+             the test client: median import time and import-to-first-response time
+    workers  gunicorn with --workers N, forked plainly and with --preload: RSS, PSS and
+             private memory of each worker from /proc/<pid>/smaps_rollup (Linux)
+
+PSS divides shared pages between the processes sharing them, so its sum over the workers
+is what they really cost; private is what each worker does not share with anybody.
+
+The database is never contacted (WARMUP=off, and /healthz does not query), so dummy DB_*
+settings are enough. Usage:
+
+    python benchmarks/boot_bench.py [--chdir /tmp/before] [--repeat 10] [--workers 4]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+BOOT_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+response = app.app.test_client().get("/healthz")
+t2 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_response_ms": (t2 - t0) * 1000}))
+"""
+
+
+def bench_env():
+    env = dict(os.environ)
+    env.setdefault("DB_HOST", "localhost")
+    env.setdefault("DB_USER", "bench")
+    env.setdefault("DB_PASSWORD", "bench")
+    env["WARMUP"] = "off"
+    return env
+
+
+def boot(chdir, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", BOOT_SCRIPT], cwd=chdir, env=bench_env(),
+            capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def memory_kb(pid):
+    """Rss, Pss and Private_* of a process in kB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[name] = int(rest.split()[0])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def children(pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def workers(chdir, count, preload, requests):
+    port = free_port()
+    cmd = [sys.executable, "-m", "gunicorn", "--workers", str(count), "--bind", f"127.0.0.1:{port}"]
+    if os.path.exists(os.path.join(chdir, "gunicorn.conf.py")):
+        cmd += ["-c", "gunicorn.conf.py"]
+    if preload:
+        cmd.append("--preload")
+    env = bench_env()
+    env["GUNICORN_PRELOAD"] = "1" if preload else "0"
+    master = subprocess.Popen(cmd + ["app:app"], cwd=chdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or master.poll() is not None:
+                    raise RuntimeError("gunicorn did not come up")
+                time.sleep(0.2)
+        while len(children(master.pid)) < count and time.time() < deadline:
+            time.sleep(0.2)
+        # let every worker serve a few requests so lazily touched pages show up
+        for _ in range(requests):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5).read()
+        per_worker = [memory_kb(pid) for pid in children(master.pid)]
+        return {
+            "workers": len(per_worker),
+            "rss_kb_per_worker": statistics.mean(w["rss"] for w in per_worker),
+            "pss_kb_per_worker": statistics.mean(w["pss"] for w in per_worker),
+            "private_kb_per_worker": statistics.mean(w["private"] for w in per_worker),
+            "pss_kb_total": sum(w["pss"] for w in per_worker) + memory_kb(master.pid)["pss"],
+        }
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chdir", default=BACKEND, help="backend tree to measure")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--skip-workers", action="store_true", help="only measure boot time")
+    args = parser.parse_args()
+
+    result = boot(args.chdir, args.repeat)
+    print(f"import {result['import_ms']:.0f} ms, import to first response {result['first_response_ms']:.0f} ms")
+    if args.skip_workers:
+        return
+    for preload in (False, True):
+        mem = workers(args.chdir, args.workers, preload, args.requests)
+        print(
+            f"{'preload' if preload else 'fork   '}  {mem['workers']} workers: "
+            f"RSS {mem['rss_kb_per_worker'] / 1024:.1f} MB, PSS {mem['pss_kb_per_worker'] / 1024:.1f} MB, "
+            f"private {mem['private_kb_per_worker'] / 1024:.1f} MB per worker; "
+            f"PSS total incl. master {mem['pss_kb_total'] / 1024:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+CPU vs bytes tradeoff of response compression on PawPoint-shaped payloads.
+
+Builds synthetic /appointments, /treatments and /owners JSON bodies of several sizes and
+reports compressed size, ratio and compression time for gzip and brotli at each level.
+
+Usage:
+    python benchmarks/compression_bench.py [--rows 100 1000 10000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from compression import brotli  # noqa: E402  (None when brotli is not installed)
+
+FIRST = ["Olivia", "Peter", "Victor", "Wendy", "Sarah", "Budi", "Ayu", "Dewi", "Rizky", "Putri"]
+LAST = ["Owens", "Paws", "Vet", "Santoso", "Wijaya", "Lestari", "Pratama", "Hidayat"]
+PETS = ["Milo", "Luna", "Bella", "Max", "Kitty", "Oyen", "Coco", "Rocky", "Mochi", "Simba"]
+CLINICS = ["Happy Paws Veterinary", "Animal Care Center", "Sehat Satwa", "PetVet Jogja"]
+DIAGNOSES = ["Healthy, routine checkup", "Mild dermatitis", "Ear infection", "Vaccination", "Dental tartar"]
+
+
+def person(rng):
+    return f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+
+
+def appointments(rng, n):
+    start = datetime(2024, 1, 1, 8, 0)
+    return [{
+        "appointment_id": i + 1,
+        "datetime": (start + timedelta(minutes=30 * i)).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "status": rng.choice(["scheduled", "completed", "completed", "cancelled"]),
+        "pet_name": rng.choice(PETS),
+        "clinic_name": rng.choice(CLINICS),
+        "owner_name": person(rng),
+        "veterinarian_id": rng.randint(1, 200),
+        "license_no": f"VET-{rng.randint(1000, 9999)}",
+        "vet_name": person(rng),
+    } for i in range(n)]
+
+
+def treatments(rng, n):
+    return [{
+        "record_id": i + 1,
+        "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+        "diagnosis": rng.choice(DIAGNOSES),
+        "note": "Auto generated when appointment completed",
+        "appointment_id": i + 1,
+        "pet_name": rng.choice(PETS),
+        "vet_name": person(rng),
+        "license_no": f"VET-{rng.randint(1000, 9999)}",
+    } for i in range(n)]
+
+
+def owners(rng, n):
+    return [{
+        "owner_id": i + 1,
+        "address": f"Jl Sehat {rng.randint(1, 300)}",
+        "user_id": rng.randint(1, n),
+        "pet_id": i + 1,
+        "first_name": rng.choice(FIRST),
+        "last_name": rng.choice(LAST),
+        "pet_name": rng.choice(PETS),
+    } for i in range(n)]
+
+
+def codecs():
+    yield "identity", None, lambda b: b
+    for level in (1, 6, 9):
+        yield "gzip", level, lambda b, lv=level: gzip.compress(b, compresslevel=lv, mtime=0)
+    if brotli is not None:
+        for quality in (1, 4, 6, 11):
+            yield "br", quality, lambda b, q=quality: brotli.compress(b, quality=q)
+
+
+def measure(fn, body, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(body)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli not installed; showing gzip only (pip install Brotli)\n")
+
+    rng = random.Random(42)
+    print(f"{'payload':<22}{'codec':<10}{'level':>6}{'bytes':>12}{'ratio':>8}{'ms':>10}{'MB/s':>9}")
+    for name, builder in (("appointments", appointments), ("treatments", treatments), ("owners", owners)):
+        for n in args.rows:
+            body = json.dumps(builder(rng, n)).encode("utf-8")
+            for codec, level, fn in codecs():
+                out, secs = measure(fn, body, args.repeat)
+                mbps = len(body) / secs / 1e6 if secs else float("inf")
+                print(f"{name + f' x{n}':<22}{codec:<10}{level if level is not None else '-':>6}"
+                      f"{len(out):>12}{len(body) / len(out):>8.1f}{secs * 1000:>10.2f}{mbps:>9.0f}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic PawPoint dataset at production scale.
+
+Streams rows into PostgreSQL with COPY (no per-row INSERTs), in dependency order:
+clinics -> vet users + veterinarian + veterinarian_clinic + weekly veterinarian_schedule
+-> owner users + pets + pet_owner -> appointments over the last N years (and a few months
+ahead) -> treatment records for completed appointments.
+
+Ids are assigned client-side, continuing from the current MAX() of each table, and the
+serial sequences are moved past them afterwards, so the generator can run on top of the
+demo seed data. The same --seed and --as-of always yield the same rows.
+
+Every synthetic user has the password given by --password (hashed once).
+
+Usage:
+    python benchmarks/generate_dataset.py --clinics 200 --vets 2000 --owners 500000 \\
+        --appointments 10000000 --years 3 --seed 42
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from db import get_db_conn  # noqa: E402
+
+FIRST = ["Olivia", "Peter", "Victor", "Wendy", "Sarah", "Budi", "Ayu", "Dewi", "Rizky", "Putri",
+         "Agus", "Sri", "Andi", "Rina", "Joko", "Wati", "Hendra", "Maya", "Fajar", "Indah",
+         "Bima", "Citra", "Dimas", "Eka", "Gilang", "Hana", "Irfan", "Lina", "Nanda", "Tari"]
+LAST = ["Owens", "Paws", "Santoso", "Wijaya", "Lestari", "Pratama", "Hidayat", "Saputra",
+        "Kurniawan", "Nugroho", "Setiawan", "Rahmawati", "Putra", "Halim", "Gunawan", "Susanto"]
+CITIES = ["Yogyakarta", "Sleman", "Bantul", "Jakarta", "Bandung", "Semarang", "Surabaya", "Solo"]
+STREETS = ["Jl Kaliurang", "Jl Malioboro", "Jl Sudirman", "Jl Gejayan", "Jl Magelang", "Jl Solo"]
+SPECIES = [("dog", ["Golden Retriever", "Poodle", "Beagle", "Shih Tzu", "Mixed"], 45),
+           ("cat", ["Persian", "Anggora", "Domestic", "Maine Coon", "Siamese"], 45),
+           ("rabbit", ["Holland Lop", "Rex", "Lionhead"], 5),
+           ("bird", ["Lovebird", "Parrot", "Canary"], 5)]
+PET_NAMES = ["Milo", "Luna", "Bella", "Max", "Kitty", "Oyen", "Coco", "Rocky", "Mochi", "Simba",
+             "Choco", "Snowy", "Leo", "Nala", "Bobby", "Kiki", "Tiger", "Loki", "Bruno", "Momo"]
+DIAGNOSES = ["Healthy, routine checkup", "Vaccination", "Mild dermatitis", "Ear infection",
+             "Dental tartar", "Gastroenteritis", "Flea infestation", "Minor wound", "Obesity",
+             "Upper respiratory infection", "Sterilization follow-up", "Pending diagnosis"]
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+class RowStream(io.RawIOBase):
+    """File-like object over an iterator of CSV lines, consumed by COPY ... FROM STDIN."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buf = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self._buf) < len(b):
+            chunk = "".join(line for _, line in zip(range(1000), self._lines))
+            if not chunk:
+                break
+            self._buf += chunk.encode("utf-8")
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def csv_field(value):
+    if value is None:
+        return ""
+    value = str(value)
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def line(*values):
+    return ",".join(csv_field(v) for v in values) + "\n"
+
+
+def copy(cur, table, columns, lines):
+    t0 = time.perf_counter()
+    stream = io.BufferedReader(RowStream(lines), buffer_size=1 << 20)
+    cur.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', stream)
+    print(f"  {table:<24}{cur.rowcount:>12} rows  {time.perf_counter() - t0:8.1f}s")
+
+
+def next_id(cur, table, column):
+    cur.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return cur.fetchone()[0]
+
+
+def bump_sequence(cur, table, column):
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, %s), (SELECT COALESCE(MAX({column}), 1) FROM {table}))",
+        (table, column)
+    )
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (table,))
+    return cur.fetchone()[0]
+
+
+def role_ids(cur):
+    cur.execute("SELECT role, role_id FROM role")
+    roles = {row[0]: row[1] for row in cur.fetchall()}
+    missing = {"pet_owner", "veterinarian"} - set(roles)
+    if missing:
+        sys.exit(f"role table is missing {', '.join(sorted(missing))}; load insert_data.sql first")
+    return roles
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    password_hash = generate_password_hash(args.password)
+    today = args.as_of
+    start = datetime.combine(today - timedelta(days=365 * args.years), datetime.min.time())
+    horizon = datetime.combine(today + timedelta(days=90), datetime.min.time())
+    span_days = (horizon - start).days
+    now = datetime.combine(today, datetime.min.time()) + timedelta(hours=12)
+
+    with get_db_conn() as conn:
+        with conn.cursor() as cur:
+            # the pool's session statement_timeout (DB_STATEMENT_TIMEOUT_MS) would cancel the
+            # big COPYs and the ANALYZE; lift it for this session, RESET restores it below
+            cur.execute("SET statement_timeout = 0")
+            roles = role_ids(cur)
+            ids = {
+                "clinic": next_id(cur, "clinic", "clinic_id"),
+                "user": next_id(cur, '"user"', "user_id"),
+                "veterinarian": next_id(cur, "veterinarian", "veterinarian_id"),
+                "pet": next_id(cur, "pet", "pet_id"),
+                "appointment": next_id(cur, "appointment", "appointment_id"),
+            }
+            run_tag = f"s{args.seed}u{ids['user']}"
+
+            clinic_ids = list(range(ids["clinic"], ids["clinic"] + args.clinics))
+            copy(cur, "clinic", ["clinic_id", "name", "phone_no", "address"], (
+                line(cid, f"{rng.choice(['Happy Paws', 'Animal Care', 'Sehat Satwa', 'PetVet'])} "
+                          f"{rng.choice(CITIES)} #{cid}",
+                     f"0274-{rng.randint(100000, 999999)}",
+                     f"{rng.choice(STREETS)} {rng.randint(1, 300)}, {rng.choice(CITIES)}")
+                for cid in clinic_ids
+            ))
+
+            # vets: user rows first, then veterinarian rows pointing at them
+            vet_user_start = ids["user"]
+            vet_ids = list(range(ids["veterinarian"], ids["veterinarian"] + args.vets))
+            copy(cur, '"user"', ["user_id", "first_name", "last_name", "email", "password_hash", "phone_no"], (
+                line(vet_user_start + i, rng.choice(FIRST), rng.choice(LAST),
+                     f"vet{vet_user_start + i}.{run_tag}@synthetic.pawpoint.test", password_hash,
+                     f"08{rng.randint(100000000, 999999999)}")
+                for i in range(args.vets)
+            ))
+            copy(cur, "user_role", ["user_id", "role_id"], (
+                line(vet_user_start + i, roles["veterinarian"]) for i in range(args.vets)
+            ))
+            copy(cur, "veterinarian", ["veterinarian_id", "license_no", "user_id"], (
+                line(vid, f"SYN-{run_tag}-{vid}", vet_user_start + i) for i, vid in enumerate(vet_ids)
+            ))
+
+            # every vet works at 1-3 clinics; appointments below only use these pairs
+            vet_clinics = {vid: rng.sample(clinic_ids, min(len(clinic_ids), rng.choice([1, 1, 1, 2, 2, 3])))
+                           for vid in vet_ids}
+            copy(cur, "veterinarian_clinic", ["veterinarian_id", "clinic_id"], (
+                line(vid, cid) for vid, cids in vet_clinics.items() for cid in cids
+            ))
+
+            def schedule_rows():
+                for vid in vet_ids:
+                    days = rng.sample(DAYS[:6], rng.choice([4, 5, 5, 6]))
+                    for day in days:
+                        begin = rng.choice([8, 8, 9, 10, 13])
+                        yield line(day, f"{begin:02d}:00", f"{begin + rng.choice([4, 6, 8]):02d}:00", vid)
+            copy(cur, "veterinarian_schedule", ["day", "time_start", "time_end", "veterinarian_id"], schedule_rows())
+
+            # owners and their pets (one pet_owner row per pet, as create_pet does)
+            owner_user_start = vet_user_start + args.vets
+            copy(cur, '"user"', ["user_id", "first_name", "last_name", "email", "password_hash", "phone_no"], (
+                line(owner_user_start + i, rng.choice(FIRST), rng.choice(LAST),
+                     f"owner{owner_user_start + i}.{run_tag}@synthetic.pawpoint.test", password_hash,
+                     f"08{rng.randint(100000000, 999999999)}")
+                for i in range(args.owners)
+            ))
+            copy(cur, "user_role", ["user_id", "role_id"], (
+                line(owner_user_start + i, roles["pet_owner"]) for i in range(args.owners)
+            ))
+
+            pet_owner_of = []
+            for i in range(args.owners):
+                pet_owner_of.extend([owner_user_start + i] * rng.choice([1, 1, 1, 2, 2, 3]))
+            pet_start = ids["pet"]
+            species_weights = [w for _, _, w in SPECIES]
+
+            def pet_rows():
+                for i in range(len(pet_owner_of)):
+                    species, breeds, _ = rng.choices(SPECIES, weights=species_weights)[0]
+                    age = rng.randint(0, 15)
+                    birth = today - timedelta(days=365 * age + rng.randint(0, 364))
+                    yield line(pet_start + i, rng.choice(PET_NAMES), species, rng.choice(breeds),
+                               rng.choice(["male", "female", "unknown"]), birth.isoformat(), age)
+            copy(cur, "pet", ["pet_id", "name", "species", "breed", "gender", "birth_date", "age"], pet_rows())
+            copy(cur, "pet_owner", ["address", "user_id", "pet_id"], (
+                line(f"{rng.choice(STREETS)} {rng.randint(1, 300)}, {rng.choice(CITIES)}", owner, pet_start + i)
+                for i, owner in enumerate(pet_owner_of)
+            ))
+
+            # appointments: working hours on random days, status depends on past/future.
+            # The stream is replayed from the same sub-seed to derive treatment records, so
+            # 10M appointments never have to be held in memory.
+            appt_start = ids["appointment"]
+            appt_seed = rng.random()
+            pet_count = len(pet_owner_of)
+
+            def appointments():
+                arng = random.Random(appt_seed)
+                for i in range(args.appointments):
+                    vid = arng.choice(vet_ids)
+                    when = start + timedelta(days=arng.randrange(span_days),
+                                             hours=arng.randint(8, 16), minutes=arng.choice([0, 15, 30, 45]))
+                    roll = arng.random()
+                    if when < now:
+                        status = "completed" if roll < 0.82 else "cancelled"
+                    else:
+                        status = "scheduled" if roll < 0.92 else "cancelled"
+                    yield (appt_start + i, when, status, pet_start + arng.randrange(pet_count),
+                           arng.choice(vet_clinics[vid]), vid)
+
+            if is_partitioned(cur, "appointment"):
+                # migrations/002: every month of the generated range needs its partition
+                cur.execute("SELECT create_appointment_partitions(%s, %s)", (start.date(), horizon.date()))
+            copy(cur, "appointment", ["appointment_id", "datetime", "status", "pet_id", "clinic_id", "veterinarian_id"], (
+                line(appt_id, when.strftime("%Y-%m-%d %H:%M:%S"), status, pet_id, clinic_id, vid)
+                for appt_id, when, status, pet_id, clinic_id, vid in appointments()
+            ))
+
+            # most completed visits get a treatment record
+            copy(cur, "treatment_record", ["date", "diagnosis", "note", "appointment_id"], (
+                line(when.date().isoformat(), rng.choice(DIAGNOSES), "Synthetic record", appt_id)
+                for appt_id, when, status, *_ in appointments()
+                if status == "completed" and rng.random() < args.treatment_ratio
+            ))
+
+            for table, column in (("clinic", "clinic_id"), ('"user"', "user_id"), ("veterinarian", "veterinarian_id"),
+                                  ("veterinarian_clinic", "vetclinic_id"), ("veterinarian_schedule", "schedule_id"),
+                                  ("pet", "pet_id"), ("pet_owner", "owner_id"), ("appointment", "appointment_id"),
+                                  ("treatment_record", "record_id")):
+                bump_sequence(cur, table, column)
+        conn.commit()
+
+        if args.analyze:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                t0 = time.perf_counter()
+                cur.execute("ANALYZE")
+                print(f"  ANALYZE{'':<29}{time.perf_counter() - t0:8.1f}s")
+            conn.autocommit = False
+
+        with conn.cursor() as cur:
+            cur.execute("RESET statement_timeout")
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clinics", type=int, default=50)
+    parser.add_argument("--vets", type=int, default=500)
+    parser.add_argument("--owners", type=int, default=20000)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=3, help="history length before today")
+    parser.add_argument("--treatment-ratio", type=float, default=0.9,
+                        help="share of completed appointments that get a treatment record")
+    parser.add_argument("--password", default="synthetic123")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(),
+                        help="YYYY-MM-DD treated as 'today'; pin it for byte-identical reruns")
+    parser.add_argument("--no-analyze", dest="analyze", action="store_false")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    print(f"Generating seed={args.seed}: {args.clinics} clinics, {args.vets} vets, "
+          f"{args.owners} owners, {args.appointments} appointments")
+    generate(args)
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Python-side encoding vs Postgres json_agg passthrough for the largest list responses.
+
+For each query the script times, against the database configured in .env:
+    python   execute -> fetchall tuples -> rows_response() body (FastJSONProvider)
+    json_agg execute json_agg(row_to_json(...))::text -> body passed through untouched
+
+Both paths are measured from execute() to response bytes, so the numbers include network
+transfer of the result (row protocol vs one text value).
+
+Usage:
+    python benchmarks/json_agg_bench.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+from psycopg2.extensions import cursor as TupleCursor  # noqa: E402
+
+import projection  # noqa: E402
+import queries  # noqa: E402
+from db import get_db_conn  # noqa: E402
+from json_provider import init_json, query_response  # noqa: E402
+
+QUERIES = {
+    "appointments (admin)": projection.APPOINTMENTS.build(list(projection.APPOINTMENTS.fields)),
+    "treatments (admin)": projection.TREATMENTS.build(list(projection.TREATMENTS.fields)),
+    "reports/treatments": queries.REPORT_TREATMENTS,
+}
+
+
+def run(app, sql, pg_json_agg, repeat):
+    app.config["PG_JSON_AGG"] = pg_json_agg
+    best, size = float("inf"), 0
+    with app.app_context(), get_db_conn() as conn:
+        for _ in range(repeat):
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                t0 = time.perf_counter()
+                size = len(query_response(cur, sql).get_data())
+                best = min(best, time.perf_counter() - t0)
+            conn.rollback()
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = init_json(Flask("bench"))
+    print(f"{'query':<24}{'mode':<10}{'ms':>10}{'bytes':>14}")
+    for name, sql in QUERIES.items():
+        for mode, flag in (("python", False), ("json_agg", True)):
+            secs, size = run(app, sql, flag, args.repeat)
+            print(f"{name:<24}{mode:<10}{secs * 1000:>10.1f}{size:>14}")
+
+
+if __name__ == "__main__":
+    main()
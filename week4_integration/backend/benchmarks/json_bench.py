@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Serialization cost of a large /appointments response.
+
+Compares, on N synthetic appointment rows (default 50k):
+    baseline   DictCursor rows -> [dict(r) ...] -> jsonify() with Flask's stdlib provider
+    fast-dict  DictCursor rows -> [dict(r) ...] -> jsonify() with FastJSONProvider
+    fast-rows  tuple cursor rows -> rows_response() (no DictRow; one dict(zip()) per row)
+    fast-iso   same as fast-rows with JSON_DATETIME_FORMAT=iso (orjson-native datetimes)
+
+DictRow construction is included for the DictCursor paths because that is where the
+per-row Python work happens in the handlers today.
+
+Usage:
+    python benchmarks/json_bench.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask, jsonify  # noqa: E402
+from psycopg2.extras import DictRow  # noqa: E402
+
+from json_provider import init_json, orjson, rows_response  # noqa: E402
+
+COLUMNS = ["appointment_id", "datetime", "status", "pet_name", "clinic_name",
+           "owner_name", "veterinarian_id", "license_no", "vet_name"]
+
+
+class FakeCursor:
+    """Just enough of a psycopg2 cursor for DictRow and rows_response."""
+    def __init__(self, rows):
+        self.description = [(name,) for name in COLUMNS]
+        self.index = OrderedDict((name, i) for i, name in enumerate(COLUMNS))
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+def make_rows(n):
+    rng = random.Random(7)
+    start = datetime(2022, 1, 1, 8, 0)
+    return [(
+        i + 1,
+        start + timedelta(minutes=30 * i),
+        rng.choice(["scheduled", "completed", "cancelled"]),
+        rng.choice(["Milo", "Luna", "Bella", "Max", "Oyen"]),
+        rng.choice(["Happy Paws Veterinary", "Animal Care Center"]),
+        rng.choice(["Olivia Owens", "Peter Paws", "Sarah Lee"]),
+        rng.randint(1, 200),
+        f"VET-{rng.randint(1000, 9999)}",
+        rng.choice(["Victor Vet", "Wendy Vet"]),
+    ) for i in range(n)]
+
+
+def to_dict_rows(cur, tuples):
+    rows = []
+    for t in tuples:
+        row = DictRow(cur)
+        row[:] = t
+        rows.append(row)
+    return rows
+
+
+def timed(fn, repeat):
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn().get_data())
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tuples = make_rows(args.rows)
+    cur = FakeCursor(tuples)
+
+    stdlib_app = Flask("baseline")
+    fast_app = init_json(Flask("fast"))
+    iso_app = Flask("iso")
+    iso_app.config["JSON_DATETIME_FORMAT"] = "iso"
+    init_json(iso_app)
+
+    def baseline():
+        with stdlib_app.app_context():
+            return jsonify([dict(r) for r in to_dict_rows(cur, tuples)])
+
+    def fast_dict():
+        with fast_app.app_context():
+            return jsonify([dict(r) for r in to_dict_rows(cur, tuples)])
+
+    def fast_rows():
+        with fast_app.app_context():
+            return rows_response(cur)
+
+    def fast_iso():
+        with iso_app.app_context():
+            return rows_response(cur)
+
+    print(f"{args.rows} rows, orjson {'available' if orjson else 'NOT installed (stdlib fallback)'}")
+    base = None
+    for name, fn in (("baseline", baseline), ("fast-dict", fast_dict), ("fast-rows", fast_rows), ("fast-iso", fast_iso)):
+        secs, size = timed(fn, args.repeat)
+        base = base or secs
+        print(f"{name:<11}{secs * 1000:>9.1f} ms{size:>12} bytes{base / secs:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the PawPoint API with a role-mixed traffic profile.
+
+Each worker thread logs in through /login as one of the admin / vet / owner personas and
+replays weighted actions modelled on the frontend pages:
+
+    owner  open dashboard (GET /pets + /appointments), list pets, book an appointment
+    vet    open appointments, update an appointment status, list / update treatments
+    admin  open dashboard (appointments, users, clinics, treatments), open reports page
+
+Per route it reports request count, RPS, error count and p50/p95/p99 latency, and can save
+the run as JSON and diff it against an earlier run.
+
+Target either a running server (--base-url) or let the script serve app.py in-process on a
+local port (--serve) against the database from .env.
+
+Usage:
+    python benchmarks/loadtest.py --serve --threads 16 --duration 60 --out results/run.json
+    python benchmarks/loadtest.py --base-url http://localhost:5000 --compare results/run.json
+"""
+import argparse
+import gzip
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# persona -> relative share of worker threads
+PERSONA_WEIGHTS = {"pet_owner": 60, "veterinarian": 25, "admin": 15}
+
+
+class Client:
+    """Small keep-alive JSON client; reconnects when the server closes the socket."""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or (443 if url.scheme == "https" else 80)
+        self.https = url.scheme == "https"
+        self.timeout = timeout
+        self.token = None
+        self._conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self._conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._connect()
+            try:
+                self._conn.request(method, path, body=payload, headers=headers)
+                resp = self._conn.getresponse()
+                data = resp.read()
+                if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+                    self._conn.close()
+                    self._conn = None
+                return resp.status, resp.getheader("Content-Encoding"), data
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+
+    def json(self, method, path, body=None):
+        status, encoding, data = self.request(method, path, body)
+        if encoding == "gzip":
+            data = gzip.decompress(data)
+        return status, (json.loads(data) if data else None)
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+            if status is None or status >= 400:
+                self.errors[route] += 1
+
+
+class Persona:
+    def __init__(self, role, client, stats, rng):
+        self.role = role
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.cache = {}
+
+    def call(self, route, method, path, body=None):
+        t0 = time.perf_counter()
+        status = None
+        data = None
+        try:
+            status, data = self.client.json(method, path, body)
+        except Exception:
+            pass
+        self.stats.record(route, time.perf_counter() - t0, status)
+        return status, data
+
+    def login(self, email, password):
+        status, data = self.call("POST /login", "POST", "/login", {"email": email, "password": password})
+        if status != 200:
+            raise RuntimeError(f"login failed for {email}: HTTP {status}")
+        self.client.token = data["access_token"]
+
+    # --- owner -----------------------------------------------------------
+    def owner_dashboard(self):
+        _, pets = self.call("GET /pets", "GET", "/pets")
+        self.call("GET /appointments", "GET", "/appointments")
+        if isinstance(pets, list):
+            self.cache["pets"] = [p["pet_id"] for p in pets]
+
+    def owner_list_pets(self):
+        self.call("GET /pets", "GET", "/pets")
+
+    def owner_book(self):
+        if "clinics" not in self.cache:
+            _, clinics = self.call("GET /clinics", "GET", "/clinics")
+            self.cache["clinics"] = [c["clinic_id"] for c in clinics or []]
+        if not self.cache.get("pets") or not self.cache["clinics"]:
+            return self.owner_dashboard()
+        clinic_id = self.rng.choice(self.cache["clinics"])
+        _, vets = self.call("GET /veterinarians/clinic/<id>", "GET", f"/veterinarians/clinic/{clinic_id}")
+        if not vets:
+            return
+        when = datetime.now() + timedelta(days=self.rng.randint(1, 60), hours=self.rng.randint(0, 8))
+        self.call("POST /appointments", "POST", "/appointments", {
+            "datetime": when.strftime("%Y-%m-%d %H:00:00"),
+            "pet_id": self.rng.choice(self.cache["pets"]),
+            "clinic_id": clinic_id,
+            "veterinarian_id": self.rng.choice(vets)["veterinarian_id"],
+        })
+
+    # --- vet -------------------------------------------------------------
+    def vet_appointments(self):
+        _, appts = self.call("GET /appointments", "GET", "/appointments")
+        if isinstance(appts, list):
+            self.cache["appointments"] = [a["appointment_id"] for a in appts]
+
+    def vet_update_status(self):
+        if not self.cache.get("appointments"):
+            return self.vet_appointments()
+        appt = self.rng.choice(self.cache["appointments"])
+        self.call("PUT /appointments/<id>/status", "PUT", f"/appointments/{appt}/status",
+                  {"status": self.rng.choice(["scheduled", "completed"])})
+
+    def vet_treatments(self):
+        _, records = self.call("GET /treatments", "GET", "/treatments")
+        if isinstance(records, list):
+            self.cache["treatments"] = [t["record_id"] for t in records]
+
+    def vet_update_treatment(self):
+        if not self.cache.get("treatments"):
+            return self.vet_treatments()
+        record = self.rng.choice(self.cache["treatments"])
+        self.call("PUT /treatments/<id>", "PUT", f"/treatments/{record}",
+                  {"diagnosis": "Load test follow-up", "note": f"updated {datetime.now():%H:%M:%S}"})
+
+    # --- admin -----------------------------------------------------------
+    def admin_dashboard(self):
+        for route in ("/appointments", "/users", "/clinics", "/treatments"):
+            self.call(f"GET {route}", "GET", route)
+
+    def admin_reports(self):
+        for route in ("/reports/appointments/status", "/reports/appointments/clinic",
+                      "/reports/treatments", "/appointments", "/treatments"):
+            self.call(f"GET {route}", "GET", route)
+
+
+ACTIONS = {
+    "pet_owner": [(Persona.owner_dashboard, 40), (Persona.owner_list_pets, 35), (Persona.owner_book, 25)],
+    "veterinarian": [(Persona.vet_appointments, 40), (Persona.vet_update_status, 20),
+                     (Persona.vet_treatments, 25), (Persona.vet_update_treatment, 15)],
+    "admin": [(Persona.admin_dashboard, 60), (Persona.admin_reports, 40)],
+}
+
+
+def worker(idx, args, credentials, stats, deadline, barrier, start):
+    rng = random.Random(args.seed + idx)
+    role = rng.choices(list(PERSONA_WEIGHTS), weights=list(PERSONA_WEIGHTS.values()))[0]
+    persona = Persona(role, Client(args.base_url, args.timeout), stats, rng)
+    email, password = rng.choice(credentials[role])
+    try:
+        persona.login(email, password)
+    except Exception as e:
+        print(f"[worker {idx}] {e}", file=sys.stderr)
+        barrier.wait()
+        return
+    barrier.wait()
+    start.wait()  # set once the measured window (deadline) is in place
+
+    funcs, weights = zip(*ACTIONS[role])
+    while time.monotonic() < deadline[0]:
+        rng.choices(funcs, weights=weights)[0](persona)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # nearest-rank percentile
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(stats, elapsed):
+    routes = {}
+    total = 0
+    for route, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        total += len(values)
+        routes[route] = {
+            "count": len(values),
+            "rps": len(values) / elapsed,
+            "errors": stats.errors[route],
+            "statuses": {str(k): v for k, v in stats.statuses[route].items()},
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    return {"total_requests": total, "rps": total / elapsed, "routes": routes}
+
+
+def print_summary(summary, baseline=None):
+    print(f"\n{'route':<36}{'count':>8}{'rps':>9}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, r in summary["routes"].items():
+        row = (f"{route:<36}{r['count']:>8}{r['rps']:>9.1f}{r['errors']:>6}"
+               f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+        prev = (baseline or {}).get("routes", {}).get(route)
+        if prev:
+            row += f"   p95 {_delta(prev['p95_ms'], r['p95_ms'])}  rps {_delta(prev['rps'], r['rps'])}"
+        print(row)
+    line = f"\ntotal {summary['total_requests']} requests, {summary['rps']:.1f} req/s"
+    if baseline:
+        line += f" (baseline {baseline['summary']['rps']:.1f} req/s, {_delta(baseline['summary']['rps'], summary['rps'])})"
+    print(line)
+
+
+def _delta(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def serve_in_process(port):
+    from werkzeug.serving import make_server
+    # every persona logs in from 127.0.0.1; don't let the login throttle skew the run
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    from app import app
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def parse_credentials(values):
+    creds = []
+    for value in values:
+        email, _, password = value.partition(":")
+        creds.append((email, password))
+    return creds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--serve", action="store_true", help="run app.py in-process on --base-url's port")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured traffic")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admin", action="append", default=None, metavar="EMAIL:PASSWORD")
+    parser.add_argument("--vet", action="append", default=None, metavar="EMAIL:PASSWORD")
+    parser.add_argument("--owner", action="append", default=None, metavar="EMAIL:PASSWORD")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    credentials = {
+        "admin": parse_credentials(args.admin or ["admin@pawpoint.com:admin123"]),
+        "veterinarian": parse_credentials(args.vet or ["victor@pawpoint.com:vet123"]),
+        "pet_owner": parse_credentials(args.owner or ["olivia@pawpoint.com:owner123"]),
+    }
+
+    server = serve_in_process(urlsplit(args.base_url).port or 5000) if args.serve else None
+
+    stats = Stats()
+    deadline = [float("inf")]
+    barrier = threading.Barrier(args.threads + 1)
+    start = threading.Event()
+    threads = [threading.Thread(target=worker, args=(i, args, credentials, stats, deadline, barrier, start),
+                                daemon=True)
+               for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    barrier.wait()  # everyone logged in; logins are excluded from the measured window
+    with stats._lock:
+        login_stats = stats.latencies.pop("POST /login", [])
+        stats.errors.pop("POST /login", None)
+        stats.statuses.pop("POST /login", None)
+
+    started = time.monotonic()
+    deadline[0] = started + args.duration
+    start.set()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    if server:
+        server.shutdown()
+
+    summary = summarize(stats, elapsed)
+    summary["logins"] = {"count": len(login_stats),
+                         "p50_ms": (percentile(sorted(login_stats), 50) or 0) * 1000}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_summary(summary, baseline)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        result = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "config": {"base_url": args.base_url, "threads": args.threads, "duration": args.duration,
+                       "seed": args.seed, "persona_weights": PERSONA_WEIGHTS},
+            "elapsed_s": elapsed,
+            "summary": summary,
+        }
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
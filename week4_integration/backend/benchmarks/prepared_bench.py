@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Parse/plan time saved by the prepared statement registry (prepared.py).
+
+For each hot statement of query_bench.STATEMENTS (the appointment joins, treatments, the
+vet lookups) the script measures on one direct connection:
+
+    plain     cur.execute(sql, args): parse + plan + execute every time
+    prepared  prepared.execute(): PREPARE once, then EXECUTE name(...)
+
+and reports median client latency of both, plus the server-side planning time taken from
+EXPLAIN (ANALYZE, FORMAT JSON) of the plain statement and of EXECUTE on the prepared one
+(Postgres switches to a cached generic plan after five executions when it is not worse).
+
+Run it against a direct connection (DB_PORT=5432); through the transaction pooler on 6543
+prepared statements are disabled by design.
+
+Usage:
+    python benchmarks/prepared_bench.py --dbname pawpoint_1m [--repeat 50] [--only appointments]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dotenv import load_dotenv  # noqa: E402
+
+import prepared  # noqa: E402
+from query_bench import STATEMENTS, connect, sample_params  # noqa: E402
+
+HOT = ("appointments.", "treatments.", "ensure_vet_and_clinic", "schedules.")
+
+
+def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def planning_ms(cur, explain_sql, args):
+    cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + explain_sql, args)
+    return cur.fetchone()[0][0].get("Planning Time", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dbname", default=None, help="database (default DB_NAME)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--only", action="append", default=[], help="statement name prefix filter")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = connect(args.dbname or os.environ.get("DB_NAME", "postgres"))
+    conn.autocommit = True
+    prepared.configure(True)
+    prefixes = args.only or HOT
+    names = [n for n in STATEMENTS if n.startswith(tuple(prefixes))]
+
+    print(f"{'statement':<38}{'plain ms':>10}{'prepared':>10}{'saved':>8}{'plan ms':>9}{'plan(prep)':>11}")
+    total_plain = total_prepared = 0.0
+    try:
+        with conn.cursor() as cur:
+            params = sample_params(cur)
+            for name in names:
+                sql, make_args = STATEMENTS[name]
+                query_args = make_args(params)
+
+                def plain():
+                    cur.execute(sql, query_args)
+                    cur.fetchall()
+
+                def prep():
+                    prepared.execute(cur, sql, query_args)
+                    cur.fetchall()
+
+                plain()
+                prep()  # PREPARE happens here, outside the timings
+                plain_ms = timed(plain, args.repeat)
+                prepared_ms = timed(prep, args.repeat)
+
+                plan_plain = planning_ms(cur, sql, query_args)
+                _, count = prepared.to_server_params(sql)
+                execute_sql = f"EXECUTE {prepared.statement_name(sql)}" + (
+                    f" ({', '.join(['%s'] * count)})" if count else ""
+                )
+                plan_prepared = planning_ms(cur, execute_sql, query_args if count else None)
+
+                total_plain += plain_ms
+                total_prepared += prepared_ms
+                print(f"{name:<38}{plain_ms:>10.2f}{prepared_ms:>10.2f}{plain_ms - prepared_ms:>8.2f}"
+                      f"{plan_plain:>9.2f}{plan_prepared:>11.2f}")
+    finally:
+        conn.close()
+
+    print(f"\ntotal median latency {total_plain:.2f} ms plain vs {total_prepared:.2f} ms prepared "
+          f"({total_plain - total_prepared:.2f} ms saved per round of {len(names)} statements)")
+    print(f"registry: {prepared.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Per-statement SQL benchmarks with latency budgets and scaling checks.
+
+Runs every hot statement the API issues (the get_appointments variants, get_treatments,
+/reports/*, ensure_vet_and_clinic, the schedule ordering query) in isolation against one
+or more seeded databases, typically 10k / 1M / 10M appointments built with
+generate_dataset.py. For each statement and dataset it records:
+
+    - client-side latency (median / p95 / min over --repeat runs, rows fully fetched)
+    - planning and execution time from EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+    - the plan shape (node tree) and any sequential scans (the *.month variants show
+      whether a ?from=/?to= range prunes appointment partitions)
+
+and then flags
+    - budget:  median latency above the statement's budget in query_budgets.json
+    - scaling: latency growth between two dataset sizes worse than the statement's
+               expected class ("log" for keyed lookups, "linear" for full reports)
+
+The process exits 1 when anything is flagged, so it can gate CI.
+
+Connection settings come from .env (DB_HOST, DB_USER, ...); each dataset is a database
+name on that server.
+
+Usage:
+    python benchmarks/query_bench.py --dataset 10k=pawpoint_10k --dataset 1m=pawpoint_1m \\
+        --dataset 10m=pawpoint_10m --repeat 7 --out benchmarks/results/queries.json
+    python benchmarks/query_bench.py --dataset local=pawpoint --only appointments
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import psycopg2  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+import projection  # noqa: E402
+import queries  # noqa: E402
+
+BUDGETS_FILE = os.path.join(os.path.dirname(__file__), "query_budgets.json")
+ALL_APPOINTMENT_FIELDS = list(projection.APPOINTMENTS.fields)
+ALL_TREATMENT_FIELDS = list(projection.TREATMENTS.fields)
+
+# name -> (sql, function(params) -> query args)
+STATEMENTS = {
+    "appointments.admin": (
+        projection.APPOINTMENTS.build(ALL_APPOINTMENT_FIELDS),
+        lambda p: None,
+    ),
+    "appointments.vet": (
+        projection.APPOINTMENTS.build(ALL_APPOINTMENT_FIELDS, "WHERE v.user_id = %s", required=("v",)),
+        lambda p: (p["vet_user_id"],),
+    ),
+    "appointments.owner": (
+        projection.APPOINTMENTS.build(ALL_APPOINTMENT_FIELDS, "WHERE po.user_id = %s", required=("po",)),
+        lambda p: (p["owner_user_id"],),
+    ),
+    "appointments.detail": (
+        projection.APPOINTMENTS.build(ALL_APPOINTMENT_FIELDS, "WHERE a.appointment_id = %s"),
+        lambda p: (p["appointment_id"],),
+    ),
+    "appointments.admin.month": (
+        projection.APPOINTMENTS.build(
+            ALL_APPOINTMENT_FIELDS, "WHERE a.datetime >= %s AND a.datetime < %s"
+        ),
+        lambda p: p["month"],
+    ),
+    "appointments.vet.month": (
+        projection.APPOINTMENTS.build(
+            ALL_APPOINTMENT_FIELDS, "WHERE v.user_id = %s AND a.datetime >= %s AND a.datetime < %s",
+            required=("v",)
+        ),
+        lambda p: (p["vet_user_id"],) + p["month"],
+    ),
+    "treatments.admin": (
+        projection.TREATMENTS.build(ALL_TREATMENT_FIELDS),
+        lambda p: None,
+    ),
+    "treatments.vet": (
+        projection.TREATMENTS.build(ALL_TREATMENT_FIELDS, "WHERE v.user_id = %s", required=("v",)),
+        lambda p: (p["vet_user_id"],),
+    ),
+    "reports.status": (queries.REPORT_BY_STATUS, lambda p: None),
+    "reports.clinic": (queries.REPORT_BY_CLINIC, lambda p: None),
+    "reports.treatments": (queries.REPORT_TREATMENTS, lambda p: None),
+    "reports.status.month": (
+        queries.filtered(queries.REPORT_BY_STATUS_TEMPLATE, ["a.datetime >= %s", "a.datetime < %s"]),
+        lambda p: p["month"],
+    ),
+    "ensure_vet_and_clinic": (
+        queries.VET_CLINIC_CHECK,
+        lambda p: (p["veterinarian_id"], p["veterinarian_id"], p["clinic_id"]),
+    ),
+    "schedules.by_vet": (queries.VET_SCHEDULES, lambda p: (p["veterinarian_id"],)),
+}
+
+
+def connect(dbname):
+    return psycopg2.connect(
+        host=os.environ["DB_HOST"],
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+        dbname=dbname,
+        port=int(os.environ.get("DB_PORT", 6543)),
+        sslmode=os.environ.get("DB_SSLMODE", "require"),
+        connect_timeout=10,
+    )
+
+
+def appointment_count(cur):
+    # partitioned (migrations/002): the parent has no stats of its own, sum its partitions
+    cur.execute("""
+        SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0)::bigint FROM pg_class
+        WHERE oid = 'appointment'::regclass
+           OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'appointment'::regclass)
+    """)
+    estimate = cur.fetchone()[0]
+    if estimate and estimate > 0:
+        return estimate
+    cur.execute("SELECT COUNT(*) FROM appointment")
+    return cur.fetchone()[0]
+
+
+def sample_params(cur):
+    """Pick realistic keys cheaply (PK-ordered lookups only) from the newest appointment."""
+    cur.execute("""
+        SELECT a.appointment_id, a.veterinarian_id, a.clinic_id, a.pet_id,
+               date_trunc('month', a.datetime), date_trunc('month', a.datetime) + interval '1 month'
+        FROM appointment a
+        JOIN veterinarian v ON v.veterinarian_id = a.veterinarian_id
+        WHERE v.user_id IS NOT NULL
+        ORDER BY a.appointment_id DESC
+        LIMIT 1
+    """)
+    row = cur.fetchone()
+    if not row:
+        sys.exit("dataset has no appointment with a registered veterinarian; run generate_dataset.py first")
+    appointment_id, veterinarian_id, clinic_id, pet_id, month_start, month_end = row
+    cur.execute("SELECT user_id FROM veterinarian WHERE veterinarian_id = %s", (veterinarian_id,))
+    vet_user_id = cur.fetchone()[0]
+    cur.execute("SELECT user_id FROM pet_owner WHERE pet_id = %s LIMIT 1", (pet_id,))
+    owner = cur.fetchone()
+    return {
+        "appointment_id": appointment_id,
+        "veterinarian_id": veterinarian_id,
+        "clinic_id": clinic_id,
+        "vet_user_id": vet_user_id,
+        "owner_user_id": owner[0] if owner else None,
+        "month": (month_start, month_end),
+    }
+
+
+def plan_shape(node):
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" {node['Relation Name']}"
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    children = node.get("Plans", [])
+    if children:
+        label += "(" + ", ".join(plan_shape(child) for child in children) + ")"
+    return label
+
+
+def seq_scans(node, found=None):
+    found = [] if found is None else found
+    if node["Node Type"] == "Seq Scan":
+        found.append(node.get("Relation Name"))
+    for child in node.get("Plans", []):
+        seq_scans(child, found)
+    return found
+
+
+def bench_statement(cur, sql, args, repeat):
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, args)
+    explain = cur.fetchone()[0][0]
+
+    cur.execute(sql, args)  # warm-up
+    cur.fetchall()
+    timings, rows = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(sql, args)
+        rows = len(cur.fetchall())
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[max(0, math.ceil(0.95 * len(timings)) - 1)],
+        "min_ms": timings[0],
+        "rows": rows,
+        "planning_ms": explain.get("Planning Time"),
+        "execution_ms": explain.get("Execution Time"),
+        "plan": plan_shape(explain["Plan"]),
+        "seq_scans": seq_scans(explain["Plan"]),
+    }
+
+
+def run_dataset(label, dbname, names, repeat, timeout_ms):
+    conn = connect(dbname)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SET statement_timeout = {int(timeout_ms)}")
+            size = appointment_count(cur)
+            params = sample_params(cur)
+            print(f"\n[{label}] {dbname}: ~{size} appointments, params {params}")
+            results = {}
+            for name in names:
+                sql, make_args = STATEMENTS[name]
+                try:
+                    result = bench_statement(cur, sql, make_args(params), repeat)
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    result = {"error": str(e).strip()}
+                    print(f"  {name:<38} ERROR {result['error']}")
+                else:
+                    print(f"  {name:<38}{result['median_ms']:>10.2f} ms{result['rows']:>10} rows"
+                          f"  plan {result['planning_ms']:.2f} ms  seq {','.join(result['seq_scans']) or '-'}")
+                results[name] = result
+            conn.rollback()
+        return {"label": label, "database": dbname, "appointments": size, "params": params, "statements": results}
+    finally:
+        conn.close()
+
+
+def budget_for(budgets, name, label):
+    spec = {**budgets.get("default", {}), **budgets.get("statements", {}).get(name, {})}
+    budget = spec.get("budget_ms")
+    if isinstance(budget, dict):
+        budget = budget.get(label)
+    return budget, spec.get("scaling", "log"), spec.get("scaling_tolerance", 1.5)
+
+
+def check(datasets, budgets, noise_floor_ms):
+    flags = []
+    for ds in datasets:
+        for name, result in ds["statements"].items():
+            if "error" in result:
+                flags.append(f"{name} [{ds['label']}]: error {result['error']}")
+                continue
+            budget, _, _ = budget_for(budgets, name, ds["label"])
+            if budget is not None and result["median_ms"] > budget:
+                flags.append(f"{name} [{ds['label']}]: median {result['median_ms']:.1f} ms > budget {budget} ms")
+
+    ordered = sorted(datasets, key=lambda ds: ds["appointments"])
+    for small, large in zip(ordered, ordered[1:]):
+        if small["appointments"] < 2 or large["appointments"] <= small["appointments"]:
+            continue
+        for name, big in large["statements"].items():
+            little = small["statements"].get(name)
+            if not little or "error" in little or "error" in big or big["median_ms"] < noise_floor_ms:
+                continue
+            _, scaling, tolerance = budget_for(budgets, name, large["label"])
+            if scaling == "linear":
+                expected = large["appointments"] / small["appointments"]
+            else:
+                expected = math.log(large["appointments"]) / math.log(small["appointments"])
+            observed = big["median_ms"] / max(little["median_ms"], noise_floor_ms / 10)
+            if observed > expected * tolerance:
+                flags.append(
+                    f"{name} [{small['label']} -> {large['label']}]: latency x{observed:.1f} "
+                    f"vs expected x{expected:.1f} for {scaling} scaling"
+                )
+    return flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", action="append", required=True, metavar="LABEL=DBNAME",
+                        help="dataset label and database name, repeat for each size")
+    parser.add_argument("--only", action="append", default=[], help="statement name prefix filter")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout-ms", type=int, default=120000, help="statement_timeout while benchmarking")
+    parser.add_argument("--budgets", default=BUDGETS_FILE)
+    parser.add_argument("--noise-floor-ms", type=float, default=1.0,
+                        help="ignore scaling of statements faster than this on the larger dataset")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    load_dotenv()
+    names = [n for n in STATEMENTS if not args.only or any(n.startswith(p) for p in args.only)]
+    with open(args.budgets) as f:
+        budgets = json.load(f)
+
+    datasets = []
+    for spec in args.dataset:
+        label, _, dbname = spec.partition("=")
+        datasets.append(run_dataset(label, dbname or label, names, args.repeat, args.timeout_ms))
+
+    flags = check(datasets, budgets, args.noise_floor_ms)
+    print()
+    for flag in flags:
+        print(f"FLAG {flag}")
+    print(f"{len(flags)} statement(s) flagged" if flags else "all statements within budget")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"datasets": datasets, "flags": flags}, f, indent=2, default=str)
+        print(f"saved {args.out}")
+
+    sys.exit(1 if flags else 0)
+
+
+if __name__ == "__main__":
+    main()
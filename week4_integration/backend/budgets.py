@@ -0,0 +1,238 @@
+"""
+Per-route latency budgets enforced in the database.
+
+Every request gets a deadline when its handler starts: ROUTE_BUDGETS for the endpoint
+(function name, without the blueprint), or BUDGET_READ_MS / BUDGET_WRITE_MS by method.
+Cursors handed out by routes.common.get_connection() are wrapped so each new
+transaction first runs
+
+    SET LOCAL statement_timeout = <ms left until the deadline>
+
+(MySQL: SET SESSION max_execution_time), so a runaway report is cancelled by the server at
+the end of its budget instead of holding a connection for the 30 s session ceiling
+(DB_STATEMENT_TIMEOUT_MS). A statement that would start after the deadline is not sent.
+
+While a statement runs, a watchdog thread polls the client's socket. If the client has
+disconnected, it cancels the statement server-side (PostgreSQL connection.cancel()).
+
+Either way the handler's generic 500 is turned into a 504 by an after_request hook, and the
+decision is counted by reason (timeout, deadline, disconnect) and route for /metrics.
+"""
+import os
+import select
+import socket
+import threading
+import time
+
+from flask import g, has_app_context, jsonify, request
+
+from db import dialect
+from routes import endpoint_name
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# milliseconds; routes not listed fall back to BUDGET_READ_MS / BUDGET_WRITE_MS
+DEFAULT_ROUTE_BUDGETS = {
+    "get_clinics": 500,
+    "get_clinic": 500,
+    "report_by_status": 5000,
+    "report_by_clinic": 5000,
+    "report_treatments": 5000,
+    "report_summary": 5000,
+    "dashboard": 5000,
+    # unpaginated admin listings
+    "get_appointments": 10000,
+    "get_treatments": 10000,
+    "get_owners": 10000,
+    "get_users": 10000,
+}
+
+
+class BudgetExceeded(Exception):
+    """The request's deadline passed before a statement could be sent."""
+
+
+_lock = threading.Lock()
+_stats = {"reasons": {}, "routes": {}}
+
+
+def _count(reason, route):
+    with _lock:
+        for group, key in (("reasons", reason), ("routes", route or "other")):
+            counts = _stats[group]
+            counts[key] = counts.get(key, 0) + 1
+
+
+def stats():
+    with _lock:
+        return {group: dict(counts) for group, counts in _stats.items()}
+
+
+class Watchdog:
+    """Cancels running statements whose client has gone away; one polling thread per process."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, sock, conn, state):
+        key = object()
+        with self._lock:
+            self._active[key] = (sock, conn, state)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="budget-watchdog", daemon=True)
+                self._thread.start()
+        return key
+
+    def unwatch(self, key):
+        with self._lock:
+            self._active.pop(key, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            for key, (sock, conn, state) in active:
+                if client_disconnected(sock):
+                    with self._lock:
+                        if self._active.pop(key, None) is None:
+                            continue  # the statement finished meanwhile
+                    state["reason"] = "disconnect"
+                    try:
+                        dialect.cancel(conn)
+                    except Exception as e:
+                        print(f"Cancel after disconnect failed: {str(e)}")
+
+
+def client_disconnected(sock):
+    """True when the peer closed the connection (readable with nothing left to read)."""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return False
+
+
+watchdog = None
+
+
+class BudgetCursor:
+    """Cursor proxy applying the request's remaining budget to each transaction it starts."""
+
+    def __init__(self, cursor, conn, state):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_state", state)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._cursor.__exit__(exc_type, exc, tb)
+
+    def _apply(self):
+        state = self._state
+        remaining_ms = (state["deadline"] - time.monotonic()) * 1000
+        if remaining_ms < 1:
+            state["reason"] = "deadline"
+            raise BudgetExceeded(f"time budget of {state['budget_ms']} ms exhausted")
+        if dialect.timeout_scope == "session" and id(self._conn) in state["applied"]:
+            return
+        if dialect.statement_timeout(self._conn, remaining_ms):
+            state["applied"].add(id(self._conn))
+
+    def _run(self, method, *args):
+        self._apply()
+        sock = self._state["socket"]
+        key = watchdog.watch(sock, self._conn, self._state) if sock is not None and watchdog else None
+        try:
+            return getattr(self._cursor, method)(*args)
+        except Exception as e:
+            if dialect.is_timeout(e) and self._state["reason"] is None:
+                self._state["reason"] = "timeout"
+            raise
+        finally:
+            if key is not None:
+                watchdog.unwatch(key)
+
+    def execute(self, sql, params=None):
+        return self._run("execute", sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run("executemany", sql, seq_of_params)
+
+
+def wrap_cursor(conn, cursor):
+    """The budgeted proxy when g carries a budget (requests, parallel.gather() threads), else the plain cursor."""
+    if not has_app_context():
+        return cursor
+    state = g.get("budget")
+    if state is None:
+        return cursor
+    return BudgetCursor(cursor, conn, state)
+
+
+def budget_ms(app, endpoint, method):
+    endpoint = endpoint_name(endpoint)
+    budgets = app.config["ROUTE_BUDGETS"]
+    if endpoint in budgets:
+        return budgets[endpoint]
+    return app.config["BUDGET_WRITE_MS"] if method in WRITE_METHODS else app.config["BUDGET_READ_MS"]
+
+
+def init_budgets(app):
+    global watchdog
+    app.config.setdefault("BUDGET_READ_MS", int(os.environ.get("BUDGET_READ_MS", 3000)))
+    app.config.setdefault("BUDGET_WRITE_MS", int(os.environ.get("BUDGET_WRITE_MS", 2000)))
+    app.config.setdefault("BUDGET_DISCONNECT_POLL_MS", int(os.environ.get("BUDGET_DISCONNECT_POLL_MS", 100)))
+    budgets = dict(DEFAULT_ROUTE_BUDGETS)
+    for item in os.environ.get("ROUTE_BUDGETS", "").split(","):
+        endpoint, sep, ms = item.partition("=")
+        if sep and endpoint.strip():
+            budgets[endpoint.strip()] = int(ms)
+    app.config.setdefault("ROUTE_BUDGETS", budgets)
+    watchdog = Watchdog(app.config["BUDGET_DISCONNECT_POLL_MS"] / 1000.0)
+
+    @app.before_request
+    def _start_budget():
+        if request.endpoint is None:
+            return None
+        ms = budget_ms(app, request.endpoint, request.method)
+        if ms and ms > 0:
+            g.budget = {
+                "budget_ms": ms,
+                "deadline": time.monotonic() + ms / 1000.0,
+                "applied": set(),
+                "reason": None,
+                # werkzeug's dev server and gunicorn expose the client socket
+                "socket": request.environ.get("werkzeug.socket") or request.environ.get("gunicorn.socket"),
+            }
+        return None
+
+    @app.after_request
+    def _timeout_response(response):
+        state = g.get("budget")
+        if state is None or state["reason"] is None or response.status_code < 500:
+            return response
+        _count(state["reason"], endpoint_name(request.endpoint))
+        timed_out = jsonify({
+            "message": f"Request exceeded its {state['budget_ms']} ms time budget",
+            "reason": state["reason"],
+        })
+        timed_out.status_code = 504
+        return timed_out
+
+    return app
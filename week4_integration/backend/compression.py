@@ -0,0 +1,101 @@
+"""
+gzip / brotli response compression negotiated from Accept-Encoding.
+
+Buffered responses are compressed in one go once they pass COMPRESS_MIN_SIZE; streamed
+responses (chunked exports) are compressed chunk by chunk with a sync flush after each
+chunk so the client keeps receiving data while the export is still running.
+"""
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+}
+
+
+def init_compression(app):
+    """Register the after_request hook; settings can come from app.config or the environment."""
+    app.config.setdefault("COMPRESS_ALGORITHMS", os.environ.get("COMPRESS_ALGORITHMS", "br,gzip"))
+    app.config.setdefault("COMPRESS_MIN_SIZE", int(os.environ.get("COMPRESS_MIN_SIZE", 1024)))
+    app.config.setdefault("COMPRESS_LEVEL", int(os.environ.get("COMPRESS_LEVEL", 6)))
+    app.config.setdefault("COMPRESS_BR_LEVEL", int(os.environ.get("COMPRESS_BR_LEVEL", 4)))
+    app.config.setdefault("COMPRESS_STREAMS", os.environ.get("COMPRESS_STREAMS", "1") == "1")
+
+    @app.after_request
+    def _compress(response):
+        from flask import request
+        return compress_response(response, request, app.config)
+
+    return app
+
+
+def supported_algorithms(config):
+    algorithms = [a.strip() for a in config["COMPRESS_ALGORITHMS"].split(",") if a.strip()]
+    return [a for a in algorithms if a == "gzip" or (a == "br" and brotli is not None)]
+
+
+def compress_response(response, request, config):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if "Content-Encoding" in response.headers or response.direct_passthrough:
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(supported_algorithms(config))
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        if not config["COMPRESS_STREAMS"]:
+            return response
+        response.response = _compress_stream(response.response, encoding, config)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress_bytes(body, encoding, config))
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def compress_bytes(body, encoding, config):
+    if encoding == "br":
+        return brotli.compress(body, quality=config["COMPRESS_BR_LEVEL"])
+    return gzip.compress(body, compresslevel=config["COMPRESS_LEVEL"], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config["COMPRESS_BR_LEVEL"])
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 31)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield compressor.flush()
@@ -1,45 +1,488 @@
 import os
-import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2.extras import DictCursor
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from contextlib import contextmanager
 
 load_dotenv()
 
+# "postgres" (default) or "mysql" (the week2 ddl_schema.sql deployments)
+DB_DIALECT = os.environ.get("DB_DIALECT", "postgres").strip().lower()
+
+# connections per process; admission.py sizes its request gate to this
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+# idle connections kept open; warm_pool() opens them at startup
+DB_POOL_MIN = min(int(os.environ.get("DB_POOL_MIN", 4)), DB_POOL_MAX)
+# seconds a request may wait for a free connection before PoolTimeout
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 3))
+# session ceiling for any statement; routes set tighter budgets per transaction (budgets.py)
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+# per-clinic databases (libpq URIs, comma separated) holding appointment and treatment_record;
+# empty = one database for everything. Routing is in shards.py.
+DB_SHARDS = [dsn.strip() for dsn in os.environ.get("DB_SHARDS", "").split(",") if dsn.strip()]
+DB_SHARD_POOL_MAX = int(os.environ.get("DB_SHARD_POOL_MAX", DB_POOL_MAX))
+
 _pool = None
+_shard_pools = None
+_pool_lock = threading.Lock()
+
+
+# =========================
+# Dialects
+# =========================
+class PostgresDialect:
+    name = "postgres"
+
+    def insert_returning(self, cur, sql, params, key):
+        """Run an INSERT and return the generated `key` column (None if no row was inserted)."""
+        cur.execute(f"{sql} RETURNING {key}", params)
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def insert_ignore(self, table, columns, conflict):
+        """INSERT that silently skips rows violating the `conflict` unique key."""
+        placeholders = ", ".join(["%s"] * len(columns))
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+        )
+
+    def time_hhmm(self, column):
+        return f"TO_CHAR({column}, 'HH24:MI')"
+
+    # statement_timeout() bounds the current transaction; re-apply for every new one
+    timeout_scope = "transaction"
+
+    def statement_timeout(self, conn, ms):
+        """Bound the statements of the transaction about to start on `conn` to `ms` milliseconds."""
+        if conn.info.transaction_status != 0:  # TRANSACTION_STATUS_IDLE: nothing started yet
+            return False
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (int(ms),))
+        return True
+
+    def is_timeout(self, exc):
+        """True when `exc` is a statement cancelled by statement_timeout or cancel()."""
+        return getattr(exc, "pgcode", None) == "57014"  # query_canceled
+
+    def cancel(self, conn):
+        """Cancel the statement running on `conn` from another thread; False if unsupported."""
+        conn.cancel()
+        return True
+
+
+class MySQLDialect(PostgresDialect):
+    name = "mysql"
+
+    def insert_returning(self, cur, sql, params, key):
+        cur.execute(sql, params)
+        return cur.lastrowid if cur.rowcount else None
+
+    def insert_ignore(self, table, columns, conflict):
+        placeholders = ", ".join(["%s"] * len(columns))
+        return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def time_hhmm(self, column):
+        # statements are always executed with parameters, so % must be doubled
+        return f"TIME_FORMAT({column}, '%%H:%%i')"
+
+    # max_execution_time is a session variable (and only bounds SELECTs)
+    timeout_scope = "session"
+
+    def statement_timeout(self, conn, ms):
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION max_execution_time = %s", (int(ms),))
+        # outlives the request: the pool restores the session default in putconn()
+        conn.execution_time_ms = int(ms)
+        return True
+
+    def is_timeout(self, exc):
+        return bool(getattr(exc, "args", None)) and exc.args[0] == 3024  # ER_QUERY_TIMEOUT
+
+    def cancel(self, conn):
+        # pymysql has no out-of-band cancel; max_execution_time still applies
+        return False
+
+
+dialect = MySQLDialect() if DB_DIALECT == "mysql" else PostgresDialect()
+
+
+# =========================
+# Drivers
+# =========================
+if dialect.name == "mysql":
+    import pymysql
+    from pymysql.cursors import SSCursor
+
+    # cursor_factory for plain tuple rows (rows_response(), the fan-out listings)
+    TupleCursor = pymysql.cursors.Cursor
+
+    class MySQLRow(tuple):
+        """Tuple row that also indexes by column name, like psycopg2's DictRow."""
+
+        def __new__(cls, index, values):
+            row = super().__new__(cls, values)
+            row._index = index
+            return row
+
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                key = self._index[key]
+            return super().__getitem__(key)
+
+        def get(self, key, default=None):
+            return self[key] if key in self._index else default
+
+        def keys(self):
+            return self._index.keys()
+
+        def items(self):
+            return [(name, tuple.__getitem__(self, i)) for name, i in self._index.items()]
+
+    class MySQLDictCursor(pymysql.cursors.Cursor):
+        """Default cursor for the MySQL driver; rows behave like psycopg2 DictRow."""
+
+        def _do_get_result(self):
+            super()._do_get_result()
+            if self.description and self._rows:
+                index = {col[0]: i for i, col in enumerate(self.description)}
+                self._rows = [MySQLRow(index, row) for row in self._rows]
+
+    class MySQLConnection:
+        """
+        pymysql connection exposing the psycopg2 cursor() signature used by the handlers:
+        cursor_factory picks the cursor class and name= asks for a streaming cursor.
+        """
+
+        def __init__(self, conn):
+            self._conn = conn
+            # max_execution_time set by a request's budget; None = the session default
+            self.execution_time_ms = None
+
+        def cursor(self, cursor_factory=None, name=None):
+            if name:
+                return self._conn.cursor(SSCursor)
+            return self._conn.cursor(cursor_factory or MySQLDictCursor)
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+    class MySQLConnectionPool:
+        """Thread-safe pymysql pool with the getconn/putconn interface of psycopg2's pools."""
+
+        def __init__(self, minconn, maxconn, **kwargs):
+            self.maxconn = maxconn
+            self._kwargs = kwargs
+            self._idle = []
+            self._used = 0
+            self._lock = threading.Lock()
+            for _ in range(minconn):
+                self._idle.append(self._connect())
+
+        def _connect(self):
+            return MySQLConnection(pymysql.connect(**self._kwargs))
+
+        def open_idle(self):
+            """Open one more idle connection (called concurrently by BoundedPool.prewarm())."""
+            conn = self._connect()
+            with self._lock:
+                self._idle.append(conn)
+            return conn
+
+        def idle_count(self):
+            with self._lock:
+                return len(self._idle)
+
+        def getconn(self):
+            with self._lock:
+                if self._idle:
+                    conn = self._idle.pop()
+                elif self._used >= self.maxconn:
+                    raise pymysql.err.OperationalError("connection pool exhausted")
+                else:
+                    conn = None
+                self._used += 1
+            try:
+                if conn is None:
+                    conn = self._connect()
+                else:
+                    conn.ping(reconnect=True)
+            except Exception:
+                with self._lock:
+                    self._used -= 1
+                raise
+            return conn
+
+        def putconn(self, conn):
+            try:
+                conn.rollback()
+                if conn.execution_time_ms is not None:
+                    # don't hand the last request's budget to the next borrower
+                    with conn.cursor() as cur:
+                        cur.execute("SET SESSION max_execution_time = %s", (DB_STATEMENT_TIMEOUT_MS,))
+                    conn.execution_time_ms = None
+            except Exception:
+                conn = None
+            with self._lock:
+                self._used -= 1
+                if conn is not None and len(self._idle) < self.maxconn:
+                    self._idle.append(conn)
+                    return
+            if conn is not None:
+                conn.close()
+else:
+    from psycopg2.pool import ThreadedConnectionPool
+    import psycopg2.extensions
+    from psycopg2.extras import DictCursor
+
+    TupleCursor = psycopg2.extensions.cursor
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the wait timeout."""
+
+
+# called with each connection a pool closes instead of keeping idle (prepared.forget)
+discard_hooks = []
+
+
+class BoundedPool:
+    """
+    Waits up to `timeout` seconds for a free connection instead of failing at maxconn,
+    and records how long callers waited (exposed by stats() for /metrics).
+    """
+
+    def __init__(self, pool, maxconn, timeout):
+        self._pool = pool
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {"acquired": 0, "waited": 0, "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        with self._cond:
+            if self._in_use >= self.maxconn:
+                self._waiting += 1
+                self._stats["waited"] += 1
+                try:
+                    deadline = start + timeout
+                    while self._in_use >= self.maxconn:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeout(f"no database connection free within {timeout:g}s")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            waited_ms = (time.monotonic() - start) * 1000
+            self._stats["acquired"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._done()
+            raise
+
+    def putconn(self, conn):
+        try:
+            self._pool.putconn(conn)
+        finally:
+            self._done()
+        if getattr(conn, "closed", False):
+            for hook in discard_hooks:
+                hook(conn)
+
+    def prewarm(self, count):
+        """Have `count` connections open and idle (psycopg2 keeps up to its minconn)."""
+        if hasattr(self._pool, "open_idle"):
+            # MySQLConnectionPool connects outside its lock: open the missing ones side by side
+            missing = count - self._pool.idle_count()
+            if missing > 0:
+                with ThreadPoolExecutor(max_workers=missing, thread_name_prefix="pool-warm") as executor:
+                    for future in [executor.submit(self._pool.open_idle) for _ in range(missing)]:
+                        future.result()
+            return
+        # psycopg2 connects while holding its lock: open the missing ones side by side out
+        # here, with the pool's connect arguments, and add them to its idle list under the lock
+        pool = self._pool
+        missing = count - len(pool._pool)
+        if missing <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=missing, thread_name_prefix="pool-warm") as executor:
+            futures = [executor.submit(psycopg2.connect, *pool._args, **pool._kwargs) for _ in range(missing)]
+        conns, error = [], None
+        for future in futures:
+            try:
+                conns.append(future.result())
+            except Exception as e:
+                error = error or e
+        with pool._lock:
+            for conn in conns:
+                if not pool.closed and len(pool._pool) < count and len(pool._pool) + len(pool._used) < pool.maxconn:
+                    pool._pool.append(conn)
+                else:
+                    conn.close()
+        if error is not None:
+            raise error
+
+    def idle_count(self):
+        if hasattr(self._pool, "idle_count"):
+            return self._pool.idle_count()
+        return len(self._pool._pool)
+
+    def _done(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            acquired = self._stats["acquired"]
+            return dict(
+                self._stats,
+                maxconn=self.maxconn,
+                in_use=self._in_use,
+                waiting=self._waiting,
+                wait_ms_avg=self._stats["wait_ms_total"] / acquired if acquired else 0.0,
+            )
+
+
+def postgres_settings():
+    """psycopg2 connect() arguments for the central PostgreSQL database."""
+    return dict(
+        host=os.environ["DB_HOST"],
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+        database=os.environ.get("DB_NAME", "postgres"),
+        port=int(os.environ.get("DB_PORT", 6543)),
+        sslmode=os.environ.get("DB_SSLMODE", "require"),
+        cursor_factory=DictCursor,
+        connect_timeout=10,
+        options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    )
+
+
+def listen_connection(dsn=None):
+    """
+    A dedicated autocommit connection to the central database, outside the pool, for
+    LISTEN (shared_cache.py). `dsn` overrides the DB_* settings, e.g. to reach a
+    session-mode port when DB_PORT is a transaction pooler. The caller closes it.
+    """
+    if dialect.name != "postgres":
+        raise RuntimeError("LISTEN/NOTIFY requires the PostgreSQL dialect")
+    import psycopg2
+
+    conn = psycopg2.connect(dsn, connect_timeout=10) if dsn else psycopg2.connect(**postgres_settings())
+    conn.autocommit = True
+    return conn
 
 
 def init_db_pool():
     """
-    Initialize PostgreSQL connection pool (Supabase-safe)
+    Initialize the connection pool for DB_DIALECT (PostgreSQL is Supabase-safe by default)
     """
     global _pool
-    if _pool is None:
-        _pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,  # allow more concurrent requests; still modest for Supabase
-            host=os.environ["DB_HOST"],
-            user=os.environ["DB_USER"],
-            password=os.environ["DB_PASSWORD"],
-            database=os.environ.get("DB_NAME", "postgres"),
-            port=int(os.environ.get("DB_PORT", 6543)),
-            sslmode=os.environ.get("DB_SSLMODE", "require"),
-            cursor_factory=DictCursor,
-            connect_timeout=10,
-            options="-c statement_timeout=30000"
-        )
+    with _pool_lock:
+        if _pool is not None:
+            return
+        if dialect.name == "mysql":
+            pool = MySQLConnectionPool(
+                minconn=0,
+                maxconn=DB_POOL_MAX,
+                host=os.environ.get("DB_HOST", "localhost"),
+                user=os.environ.get("DB_USER", "root"),
+                password=os.environ.get("DB_PASSWORD", ""),
+                database=os.environ.get("DB_NAME") or None,
+                port=int(os.environ.get("DB_PORT", 3306)),
+                connect_timeout=10,
+                autocommit=False,
+                # "user" is quoted ANSI-style throughout the shared SQL
+                init_command=(
+                    "SET SESSION sql_mode = CONCAT(@@SESSION.sql_mode, ',ANSI_QUOTES'), "
+                    f"max_execution_time = {DB_STATEMENT_TIMEOUT_MS}"
+                ),
+            )
+        else:
+            pool = ThreadedConnectionPool(
+                minconn=0,
+                maxconn=DB_POOL_MAX,  # default 10: allow more concurrent requests; still modest for Supabase
+                **postgres_settings()
+            )
+            # opened lazily or by warm_pool(); up to DB_POOL_MIN idle ones are kept on putconn
+            pool.minconn = DB_POOL_MIN
+        _pool = BoundedPool(pool, DB_POOL_MAX, DB_POOL_TIMEOUT)
 
 
-def get_connection():
+def init_shard_pools():
+    """One pool per DB_SHARDS entry; session settings as for the central database."""
+    global _shard_pools
+    with _pool_lock:
+        if _shard_pools is not None:
+            return
+        if dialect.name != "postgres":
+            raise RuntimeError("DB_SHARDS requires the PostgreSQL dialect")
+        pools = []
+        for dsn in DB_SHARDS:
+            pool = ThreadedConnectionPool(
+                minconn=0,
+                maxconn=DB_SHARD_POOL_MAX,
+                dsn=dsn,
+                cursor_factory=DictCursor,
+                connect_timeout=10,
+                options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+            )
+            pool.minconn = min(DB_POOL_MIN, DB_SHARD_POOL_MAX)
+            pools.append(BoundedPool(pool, DB_SHARD_POOL_MAX, DB_POOL_TIMEOUT))
+        _shard_pools = pools
+
+
+def _pool_for(shard):
+    if shard is None or not DB_SHARDS:
+        if _pool is None:
+            init_db_pool()
+        return _pool
+    if _shard_pools is None:
+        init_shard_pools()
+    return _shard_pools[shard]
+
+
+def warm_pool(count=None):
+    """Open up to `count` (default DB_POOL_MIN) idle connections; returns the idle count."""
     if _pool is None:
         init_db_pool()
-    return _pool.getconn()
+    count = DB_POOL_MIN if count is None else min(count, DB_POOL_MAX)
+    _pool.prewarm(count)
+    return _pool.idle_count()
+
+
+def get_connection(timeout=None, shard=None):
+    """
+    Pooled connection to the central database, or to DB_SHARDS[shard] when sharded (without
+    DB_SHARDS every shard is the central database); raises PoolTimeout after `timeout`
+    (default DB_POOL_TIMEOUT) seconds.
+    """
+    return _pool_for(shard).getconn(timeout)
+
+
+def release_connection(conn, shard=None):
+    """Return `conn` to the pool it came from (pass the same `shard` as get_connection)."""
+    pool = _shard_pools[shard] if shard is not None and _shard_pools else _pool
+    if pool and conn:
+        pool.putconn(conn)
 
 
-def release_connection(conn):
-    if _pool and conn:
-        _pool.putconn(conn)
+def pool_stats():
+    stats = _pool.stats() if _pool is not None else {}
+    if _shard_pools:
+        stats = dict(stats, shards=[pool.stats() for pool in _shard_pools])
+    return stats
 
 
 @contextmanager
@@ -60,6 +503,6 @@ if __name__ == "__main__":
         with get_db_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1 AS test")
-                print("DB connected! Result:", cur.fetchone())
+                print(f"DB connected ({dialect.name})! Result:", cur.fetchone())
     except Exception as e:
         print("Connection error:", e)
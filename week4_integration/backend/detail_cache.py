@@ -0,0 +1,242 @@
+"""
+Per-appointment cache of the joined GET /appointments/<id> row.
+
+The detail joins appointment, pet, clinic, veterinarian, pet_owner and two "user" rows for
+a single id, and the vet and owner appointment pages ask for the same ids over and over.
+The cache keeps that row keyed by appointment_id, unfiltered: every field of
+projection.APPOINTMENTS plus the ids needed to check access and to invalidate it
+(pet_id, clinic_id, the owners' user ids). The handler applies the caller's role and
+?fields= to the cached row, so one entry serves admins, the vet and every owner. The
+appointment's treatment records are cached alongside once ?include=treatments asks for
+them.
+
+Writes keep entries exact rather than waiting for them to expire:
+
+    update_status                         write-through: the cached status is replaced
+    update_appointment                    the entry is dropped
+    create_treatment                      the entry's treatment records are dropped
+    update_treatment                      write-through into the cached treatment record
+    pet updated/deleted, owner added      entries of that pet_id are dropped
+    clinic updated                        entries of that clinic_id are dropped
+    license bound to a user (/register)   entries of that veterinarian_id are dropped
+
+A row read before a write commits must not be stored after the write has invalidated it:
+put() takes the generation() read before the query and is ignored when an invalidation
+happened in between. So a handler applies its change with the module functions
+(invalidate(), update(), ...) after its commit, and publish()es the same change inside the
+write's transaction beforehand, which broadcasts it to the other workers when that commits
+(shared_cache.broadcaster); the cache itself is per process. DETAIL_CACHE_TTL bounds how long an entry lives should a
+broadcast be lost, DETAIL_CACHE_SIZE the number of appointments kept (0 turns the cache
+off). Hits, misses and the hit ratio are reported under /metrics.
+
+With a shared backend (CACHE_URL) a worker's miss is looked up in the shared tier before
+the database, and loaded once for all workers (single-flight). The shared copy has no
+treatment records; writes that change one appointment invalidate its shared key, writes
+that match by pet, clinic or veterinarian clear the namespace.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import shared_cache
+
+
+class DetailCache:
+    """Thread-safe LRU of appointment detail entries with a TTL and a generation counter."""
+
+    def __init__(self, maxsize=10000, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, appointment_id):
+        """The cached entry ({"row", "owner_ids", "treatments"}) or None; never mutate it."""
+        with self._lock:
+            item = self._entries.get(appointment_id)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._entries[appointment_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(appointment_id)
+            self.hits += 1
+            return item[1]
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, appointment_id, entry, generation):
+        """Store `entry` unless something was invalidated since generation() was read."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[appointment_id] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(appointment_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _replace(self, appointment_id, entry):
+        # caller holds the lock; keeps the expiry, swaps in a new entry object
+        expires_at, _ = self._entries[appointment_id]
+        self._entries[appointment_id] = (expires_at, entry)
+
+    def _invalidated(self, count=1):
+        self._generation += 1
+        self.invalidations += count
+
+    def invalidate(self, appointment_id):
+        with self._lock:
+            self._invalidated(1 if self._entries.pop(appointment_id, None) else 0)
+
+    def invalidate_where(self, key, value):
+        """Drop the entries whose row has `key` (pet_id, clinic_id, veterinarian_id) == value."""
+        with self._lock:
+            matches = [aid for aid, (_, entry) in self._entries.items() if str(entry["row"].get(key)) == str(value)]
+            for appointment_id in matches:
+                del self._entries[appointment_id]
+            self._invalidated(len(matches))
+
+    def update(self, appointment_id, **fields):
+        """Write-through of changed appointment columns into the cached row."""
+        with self._lock:
+            self._generation += 1
+            if appointment_id in self._entries:
+                entry = self._entries[appointment_id][1]
+                self._replace(appointment_id, dict(entry, row=dict(entry["row"], **fields)))
+
+    def set_treatments(self, appointment_id, treatments, generation):
+        """Attach loaded treatment records to a cached entry (same rule as put())."""
+        with self._lock:
+            if generation == self._generation and appointment_id in self._entries:
+                self._replace(appointment_id, dict(self._entries[appointment_id][1], treatments=treatments))
+
+    def invalidate_treatments(self, appointment_id):
+        with self._lock:
+            self._generation += 1
+            if appointment_id in self._entries:
+                self._replace(appointment_id, dict(self._entries[appointment_id][1], treatments=None))
+                self.invalidations += 1
+
+    def update_treatment(self, record_id, **fields):
+        """Write-through of a changed treatment record into the entry holding it."""
+        with self._lock:
+            self._generation += 1
+            for appointment_id, (_, entry) in list(self._entries.items()):
+                records = entry["treatments"]
+                if records and any(str(r["record_id"]) == str(record_id) for r in records):
+                    records = [dict(r, **fields) if str(r["record_id"]) == str(record_id) else r for r in records]
+                    self._replace(appointment_id, dict(entry, treatments=records))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = DetailCache()
+# the shared tier's namespace when CACHE_URL is set, else None
+shared = None
+
+# what other workers may ask this one to apply, besides "reset"
+BROADCAST_OPS = {"invalidate", "invalidate_where", "update", "invalidate_treatments", "update_treatment"}
+
+
+def init_detail_cache(app):
+    """Call after shared_cache.init_shared_cache()."""
+    global shared
+    app.config.setdefault("DETAIL_CACHE_SIZE", int(os.environ.get("DETAIL_CACHE_SIZE", 10000)))
+    app.config.setdefault("DETAIL_CACHE_TTL", float(os.environ.get("DETAIL_CACHE_TTL", 30)))
+    cache.maxsize = app.config["DETAIL_CACHE_SIZE"]
+    cache.ttl = app.config["DETAIL_CACHE_TTL"]
+    shared = None
+    if shared_cache.tier.shared and cache.maxsize > 0:
+        shared = shared_cache.namespace("appointment_detail", cache.ttl)
+    shared_cache.broadcaster.subscribe("detail_cache", _apply_broadcast)
+    return cache
+
+
+def _apply_broadcast(op, args, kwargs):
+    if op == "reset":
+        cache.clear()
+    elif op in BROADCAST_OPS:
+        getattr(cache, op)(*args, **kwargs)
+
+
+def load(appointment_id, loader):
+    """Entry for a local miss: from the shared tier when there is one, else loader()."""
+    if shared is None:
+        return loader()
+    return shared.get_or_set(appointment_id, loader, stored=lambda entry: dict(entry, treatments=None))
+
+
+def publish(cur, op, *args, **kwargs):
+    """Broadcast `op` (one of BROADCAST_OPS) with the transaction of `cur`, before its commit."""
+    shared_cache.broadcaster.publish(cur, "detail_cache", op, *args, **kwargs)
+
+
+def invalidate(appointment_id):
+    cache.invalidate(appointment_id)
+    if shared is not None:
+        shared.invalidate(appointment_id)
+
+
+def update(appointment_id, **fields):
+    cache.update(appointment_id, **fields)
+    if shared is not None:
+        shared.invalidate(appointment_id)
+
+
+def invalidate_where(key, value):
+    cache.invalidate_where(key, value)
+    if shared is not None:
+        shared.clear()
+
+
+def invalidate_treatments(appointment_id):
+    # the shared copy carries no treatment records
+    cache.invalidate_treatments(appointment_id)
+
+
+def update_treatment(record_id, **fields):
+    cache.update_treatment(record_id, **fields)
+
+
+def entry_from_rows(rows, fields):
+    """
+    Cache entry from the detail query's rows (one per owner of the pet): the first row's
+    `fields` plus pet_id and clinic_id, and the user ids of all owners.
+    """
+    first = rows[0]
+    row = {name: first[name] for name in list(fields) + ["pet_id", "clinic_id"]}
+    owner_ids = frozenset(str(r["owner_user_id"]) for r in rows if r["owner_user_id"] is not None)
+    return {"row": row, "owner_ids": owner_ids, "treatments": None}
+
+
+def visible(entry, role, user_id, vet_id=None):
+    """Whether the caller may see the cached appointment, as the role's WHERE clause did."""
+    if role == "admin":
+        return True
+    if role == "veterinarian":
+        return vet_id is not None and str(entry["row"]["veterinarian_id"]) == str(vet_id)
+    return str(user_id) in entry["owner_ids"]
@@ -0,0 +1,34 @@
+"""
+gunicorn settings: preloaded app, forked workers, per-worker warm-up.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The master imports app.py once (preload_app) and forks the workers from it, so the
+imported modules and the app are shared copy-on-write instead of being built again in
+every worker. gc.freeze() moves everything loaded so far out of the collector's reach, so
+collections in the workers don't write to, and un-share, those pages.
+
+Database connections must not cross the fork: WARMUP_DEFER keeps create_app() from
+warming up in the master, and post_worker_init starts the warm-up in each worker instead.
+"""
+import gc
+import os
+
+os.environ.setdefault("WARMUP_DEFER", "1")
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    import warmup
+
+    if worker.wsgi.config["WARMUP_DEFER"]:
+        warmup.start(worker.wsgi)
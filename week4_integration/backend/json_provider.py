@@ -0,0 +1,182 @@
+"""
+Fast JSON for Flask responses.
+
+FastJSONProvider swaps Flask's stdlib encoder for orjson when it is installed (falling back
+to the stdlib otherwise). rows_response() builds a JSON array of objects from tuple-cursor
+rows + column names: no DictRow per row and no [dict(r) for r in rows] in the handlers, but
+still one plain dict per row, handed to a single orjson call. Encoding the tuples without
+that dict (per value, or into one reused dict) measured slower in Python than the C-level
+dict(zip()), see benchmarks/json_bench.py; the body that skips Python rows entirely is the
+json_agg passthrough below.
+
+With PG_JSON_AGG enabled, query_response() instead has Postgres aggregate the whole result
+into one json_agg() text value that is passed through as the body without any Python-side
+decode or encode (Postgres writes dates as ISO 8601 in that mode).
+
+Datetime output is controlled by JSON_DATETIME_FORMAT:
+    "http" (default) - RFC 822 strings, identical to what jsonify() produced before
+    "iso"            - ISO 8601, encoded natively by orjson (fastest)
+"""
+import datetime
+import decimal
+import os
+import uuid
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+import prepared
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the app working without the wheel
+    orjson = None
+
+
+def _http_default(o):
+    if isinstance(o, datetime.date):
+        return http_date(o)
+    if isinstance(o, datetime.time):
+        return o.isoformat()
+    return _default(o)
+
+
+def _iso_default(o):
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    return _default(o)
+
+
+def _default(o):
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, datetime.timedelta):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # rows keep column order; sorting keys only costs time
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.datetime_format = app.config.get("JSON_DATETIME_FORMAT", "http")
+        self.default = _iso_default if self.datetime_format == "iso" else _http_default
+
+    def _orjson_options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.datetime_format != "iso":
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+        return self.dumps(obj).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode("utf-8")
+        kwargs.setdefault("default", self.default)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def init_json(app):
+    app.config.setdefault("JSON_DATETIME_FORMAT", os.environ.get("JSON_DATETIME_FORMAT", "http"))
+    app.config.setdefault("PG_JSON_AGG", os.environ.get("PG_JSON_AGG", "0") == "1")
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def rows_to_json(columns, rows):
+    """
+    Encode tuple rows as a JSON array of {column: value} objects. Builds one short-lived
+    dict per row (dict(zip()) runs in C), which is what orjson encodes fastest.
+    """
+    provider = current_app.json
+    records = [dict(zip(columns, row)) for row in rows]
+    if isinstance(provider, FastJSONProvider):
+        return provider.dumps_bytes(records)
+    return provider.dumps(records).encode("utf-8")
+
+
+def rows_response(cur, rows=None):
+    """
+    Response for a result set: column names come from cur.description, rows from
+    cur.fetchall() unless given. Works with tuple and DictCursor cursors alike.
+    """
+    columns = [col[0] for col in cur.description]
+    if rows is None:
+        rows = cur.fetchall()
+    return current_app.response_class(rows_to_json(columns, rows), mimetype="application/json")
+
+
+def json_agg_sql(sql):
+    """`sql` wrapped so Postgres returns its rows as one JSON array text."""
+    return f"SELECT COALESCE(json_agg(row_to_json(q)), '[]'::json)::text FROM ({sql}) q"
+
+
+def json_agg_response(cur, sql, params=None):
+    """Run `sql` wrapped in json_agg(row_to_json(...)) and return the JSON text as-is."""
+    prepared.execute(cur, json_agg_sql(sql), params)
+    return current_app.response_class(cur.fetchone()[0], mimetype="application/json")
+
+
+def query_response(cur, sql, params=None):
+    """
+    Execute a list query (as a prepared statement when enabled, see prepared.py) and respond
+    with its rows, via json_agg when PG_JSON_AGG is on.
+    """
+    if current_app.config.get("PG_JSON_AGG"):
+        return json_agg_response(cur, sql, params)
+    prepared.execute(cur, sql, params)
+    return rows_response(cur)
+
+
+def query_result(cur, sql, params=None):
+    """
+    What query_response() would send, before it is sent: the json_agg text when PG_JSON_AGG
+    is on, (columns, rows) otherwise. merged_response() joins several, e.g. one per shard.
+    """
+    if current_app.config.get("PG_JSON_AGG"):
+        prepared.execute(cur, json_agg_sql(sql), params)
+        return cur.fetchone()[0]
+    prepared.execute(cur, sql, params)
+    return [col[0] for col in cur.description], cur.fetchall()
+
+
+def concat_json_arrays(texts):
+    """'[a, b]' + '[]' + '[c]' -> '[a, b,c]' without decoding the elements."""
+    parts = [text.strip()[1:-1].strip() for text in texts]
+    return "[" + ",".join(part for part in parts if part) + "]"
+
+
+def merged_json(results):
+    """One JSON array (bytes) from the query_result()s of the same query."""
+    if results and isinstance(results[0], str):
+        return concat_json_arrays(results).encode("utf-8")
+    columns = results[0][0] if results else []
+    return rows_to_json(columns, [row for _, rows in results for row in rows])
+
+
+def merged_response(results):
+    """One JSON array response from the query_result()s of the same query."""
+    return current_app.response_class(merged_json(results), mimetype="application/json")
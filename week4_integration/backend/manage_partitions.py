@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Maintenance for the monthly appointment partitions (migrations/002_partition_appointments.sql).
+
+    list     partitions of appointment (hot) and appointment_archive (cold), with estimated rows
+    create   make sure partitions exist from this month through --months-ahead months ahead;
+             run daily from cron so new bookings always have a partition
+    archive  detach every partition older than --keep-months months and move it, together
+             with its treatment_record rows, into the appointment_archive schema
+
+Archiving runs one transaction per partition: treatment rows of that month are moved to
+appointment_archive.treatment_record, then the partition is detached and moved to the cold
+schema. Archived data stays queryable there but is no longer scanned by the API.
+
+Connection settings come from .env (DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, ...).
+
+Usage:
+    python manage_partitions.py list
+    python manage_partitions.py create --months-ahead 12
+    python manage_partitions.py archive --keep-months 24 --dry-run
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import date
+
+import psycopg2
+from dotenv import load_dotenv
+
+ARCHIVE_SCHEMA = "appointment_archive"
+PARTITION_NAME = re.compile(r"^appointment_p(\d{4})_(\d{2})$")
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.environ["DB_HOST"],
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+        dbname=os.environ.get("DB_NAME", "postgres"),
+        port=int(os.environ.get("DB_PORT", 6543)),
+        sslmode=os.environ.get("DB_SSLMODE", "require"),
+        connect_timeout=10,
+    )
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partitions(cur):
+    """Attached partitions of appointment as (month, schema, name, estimated rows), oldest first."""
+    cur.execute("""
+        SELECT n.nspname, c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = 'appointment'::regclass
+    """)
+    return sorted(_with_month(cur.fetchall()))
+
+
+def archived(cur):
+    cur.execute("""
+        SELECT n.nspname, c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relkind = 'r' AND c.relname LIKE 'appointment\\_p%%'
+    """, (ARCHIVE_SCHEMA,))
+    return sorted(_with_month(cur.fetchall()))
+
+
+def _with_month(rows):
+    for schema, name, estimate in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            yield date(int(match.group(1)), int(match.group(2)), 1), schema, name, estimate
+
+
+def cmd_list(conn, args):
+    with conn.cursor() as cur:
+        hot, cold = partitions(cur), archived(cur)
+    for label, rows in (("hot", hot), ("archived", cold)):
+        print(f"{label}: {len(rows)} partition(s)")
+        for month, schema, name, estimate in rows:
+            print(f"  {month:%Y-%m}  {schema}.{name:<28}~{estimate} rows")
+
+
+def cmd_create(conn, args):
+    first = date.today().replace(day=1)
+    with conn.cursor() as cur:
+        cur.execute("SELECT create_appointment_partitions(%s, %s)", (first, add_months(first, args.months_ahead)))
+        created = cur.fetchone()[0]
+    conn.commit()
+    print(f"created {created} partition(s) through {add_months(first, args.months_ahead):%Y-%m}")
+
+
+def cmd_archive(conn, args):
+    cutoff = add_months(date.today().replace(day=1), -args.keep_months)
+    with conn.cursor() as cur:
+        old = [p for p in partitions(cur) if p[0] < cutoff]
+    if not old:
+        print(f"nothing to archive before {cutoff:%Y-%m}")
+        return
+
+    for month, schema, name, estimate in old:
+        upper = add_months(month, 1)
+        if args.dry_run:
+            print(f"would archive {schema}.{name} ({month:%Y-%m}, ~{estimate} rows)")
+            continue
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM treatment_record
+                    WHERE appointment_datetime >= %s AND appointment_datetime < %s
+                    RETURNING *
+                )
+                INSERT INTO {ARCHIVE_SCHEMA}.treatment_record SELECT * FROM moved
+            """, (month, upper))
+            treatments = cur.rowcount
+            cur.execute(f'ALTER TABLE appointment DETACH PARTITION "{schema}"."{name}"')
+            cur.execute(f'ALTER TABLE "{schema}"."{name}" SET SCHEMA {ARCHIVE_SCHEMA}')
+        conn.commit()
+        print(f"archived {name} ({month:%Y-%m}): ~{estimate} appointments, {treatments} treatment records")
+
+
+COMMANDS = {"list": cmd_list, "create": cmd_create, "archive": cmd_archive}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    create = sub.add_parser("create")
+    create.add_argument("--months-ahead", type=int, default=12)
+    archive = sub.add_parser("archive")
+    archive.add_argument("--keep-months", type=int, default=24, help="months of history to keep hot")
+    archive.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = connect()
+    try:
+        COMMANDS[args.command](conn, args)
+    except psycopg2.Error as e:
+        conn.rollback()
+        sys.exit(f"{args.command} failed: {str(e).strip()}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- Trigram indexes backing the ?q= typeahead search on /users, /owners, /pets and /clinics.
+-- PostgreSQL only (the app's production database); run once per database:
+--   psql -U postgres -d pawpoint -f migrations/001_trgm_search.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Expressions must match the ones used in routes/ exactly so the planner can use them
+CREATE INDEX IF NOT EXISTS idx_user_full_name_trgm
+    ON "user" USING gin ((first_name || ' ' || last_name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_user_email_trgm
+    ON "user" USING gin (email gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_veterinarian_license_trgm
+    ON veterinarian USING gin (license_no gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_pet_name_trgm
+    ON pet USING gin (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_clinic_name_trgm
+    ON clinic USING gin (name gin_trgm_ops);
+
+-- Joins used when narrowing search hits back to owners
+CREATE INDEX IF NOT EXISTS idx_pet_owner_user_id ON pet_owner (user_id);
+CREATE INDEX IF NOT EXISTS idx_pet_owner_pet_id ON pet_owner (pet_id);
+
+ANALYZE "user";
+ANALYZE veterinarian;
+ANALYZE pet;
+ANALYZE clinic;
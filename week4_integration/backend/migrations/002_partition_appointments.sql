@@ -0,0 +1,172 @@
+-- Monthly range partitioning of appointment on datetime, plus the cold schema used by
+-- manage_partitions.py archive. PostgreSQL 15+ (FKs that follow rows moved between
+-- partitions by a reschedule); run once per database, during a maintenance window:
+--   psql -U postgres -d pawpoint -f migrations/002_partition_appointments.sql
+--
+-- appointment is rebuilt as a partitioned table with the same columns, defaults, id
+-- sequence, checks, foreign keys, indexes and triggers. A partitioned table can only be
+-- referenced through a key that contains the partition column, so the primary key becomes
+-- (appointment_id, datetime) and treatment_record gains appointment_datetime, kept in sync
+-- by a trigger, so existing INSERTs that only set appointment_id keep working.
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS appointment_archive;
+
+-- Creates the missing monthly partitions appointment_pYYYY_MM covering first_month..last_month.
+-- Months that were already archived are skipped. Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION create_appointment_partitions(
+    first_month date DEFAULT date_trunc('month', now())::date,
+    last_month date DEFAULT (date_trunc('month', now()) + interval '12 months')::date
+) RETURNS int LANGUAGE plpgsql AS $$
+DECLARE
+    cur_month date := date_trunc('month', first_month)::date;
+    part text;
+    created int := 0;
+BEGIN
+    WHILE cur_month <= last_month LOOP
+        part := 'appointment_p' || to_char(cur_month, 'YYYY_MM');
+        IF to_regclass(quote_ident(part)) IS NULL
+           AND to_regclass('appointment_archive.' || quote_ident(part)) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF appointment FOR VALUES FROM (%L) TO (%L)',
+                part, cur_month, (cur_month + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        cur_month := (cur_month + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- Rebuild appointment as a partitioned table
+ALTER TABLE appointment RENAME TO appointment_unpartitioned;
+
+CREATE TABLE appointment (
+    LIKE appointment_unpartitioned
+    INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS INCLUDING GENERATED
+) PARTITION BY RANGE (datetime);
+
+ALTER TABLE appointment ADD CONSTRAINT appointment_pkey PRIMARY KEY (appointment_id, datetime);
+
+DO $$
+DECLARE
+    old regclass := 'appointment_unpartitioned'::regclass;
+    seq text := pg_get_serial_sequence('appointment_unpartitioned', 'appointment_id');
+    def record;
+    index_defs text[] := '{}';
+    trigger_defs text[] := '{}';
+    stmt text;
+BEGIN
+    -- serial ids: move sequence ownership so dropping the old table keeps it
+    IF seq IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = old AND attname = 'appointment_id' AND attidentity <> ''
+    ) THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY appointment.appointment_id', seq);
+    END IF;
+
+    PERFORM create_appointment_partitions(
+        COALESCE((SELECT MIN(datetime) FROM appointment_unpartitioned), now())::date,
+        (date_trunc('month', GREATEST(now(), (SELECT MAX(datetime) FROM appointment_unpartitioned)))
+            + interval '12 months')::date
+    );
+
+    INSERT INTO appointment SELECT * FROM appointment_unpartitioned;
+
+    -- identity ids get a fresh sequence with the table
+    PERFORM setval(
+        pg_get_serial_sequence('appointment', 'appointment_id'),
+        (SELECT COALESCE(MAX(appointment_id), 1) FROM appointment)
+    );
+
+    -- outgoing foreign keys (pet, clinic, veterinarian)
+    FOR def IN
+        SELECT conname, pg_get_constraintdef(oid) AS body
+        FROM pg_constraint WHERE conrelid = old AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE appointment ADD CONSTRAINT %I %s', def.conname, def.body);
+    END LOOP;
+
+    -- incoming foreign keys are re-added below against the new key
+    FOR def IN
+        SELECT conrelid::regclass AS rel, conname
+        FROM pg_constraint WHERE confrelid = old AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', def.rel, def.conname);
+    END LOOP;
+
+    -- non-unique indexes and user triggers are recreated once the old names are free
+    SELECT COALESCE(array_agg(regexp_replace(
+               pg_get_indexdef(indexrelid), ' ON (ONLY )?(\S+\.)?appointment_unpartitioned ', ' ON appointment ')),
+           '{}')
+    INTO index_defs
+    FROM pg_index WHERE indrelid = old AND NOT indisunique;
+
+    SELECT COALESCE(array_agg(regexp_replace(
+               pg_get_triggerdef(oid), ' ON (\S+\.)?appointment_unpartitioned ', ' ON appointment ')),
+           '{}')
+    INTO trigger_defs
+    FROM pg_trigger WHERE tgrelid = old AND NOT tgisinternal;
+
+    DROP TABLE appointment_unpartitioned;
+
+    FOREACH stmt IN ARRAY index_defs LOOP
+        EXECUTE stmt;
+    END LOOP;
+    FOREACH stmt IN ARRAY trigger_defs LOOP
+        EXECUTE stmt;
+    END LOOP;
+
+    -- treatment_record keeps the partition key of its appointment, same type as appointment.datetime
+    EXECUTE format(
+        'ALTER TABLE treatment_record ADD COLUMN IF NOT EXISTS appointment_datetime %s',
+        (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+         WHERE attrelid = 'appointment'::regclass AND attname = 'datetime')
+    );
+END $$;
+
+UPDATE treatment_record t
+SET appointment_datetime = a.datetime
+FROM appointment a
+WHERE a.appointment_id = t.appointment_id;
+
+CREATE OR REPLACE FUNCTION treatment_record_appointment_datetime() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.appointment_id IS NULL THEN
+        NEW.appointment_datetime := NULL;
+    ELSIF TG_OP = 'INSERT' AND NEW.appointment_datetime IS NULL
+          OR TG_OP = 'UPDATE' AND NEW.appointment_id IS DISTINCT FROM OLD.appointment_id THEN
+        SELECT datetime INTO NEW.appointment_datetime
+        FROM appointment WHERE appointment_id = NEW.appointment_id;
+    END IF;
+    RETURN NEW;
+END $$;
+
+CREATE TRIGGER trg_treatment_record_appointment_datetime
+BEFORE INSERT OR UPDATE OF appointment_id ON treatment_record
+FOR EACH ROW EXECUTE FUNCTION treatment_record_appointment_datetime();
+
+-- reschedules move the row to another partition; the reference follows it
+ALTER TABLE treatment_record
+    ADD CONSTRAINT treatment_record_appointment_fkey
+    FOREIGN KEY (appointment_id, appointment_datetime)
+    REFERENCES appointment (appointment_id, datetime)
+    ON UPDATE CASCADE ON DELETE SET NULL;
+
+-- archival moves treatment rows by their appointment's month
+CREATE INDEX IF NOT EXISTS idx_treatment_record_appointment_datetime
+    ON treatment_record (appointment_datetime);
+
+-- Per-partition indexes for the role-scoped listings and reports; datetime second so a
+-- date range narrows within each pruned partition
+CREATE INDEX IF NOT EXISTS idx_appointment_veterinarian_datetime ON appointment (veterinarian_id, datetime);
+CREATE INDEX IF NOT EXISTS idx_appointment_pet_datetime ON appointment (pet_id, datetime);
+CREATE INDEX IF NOT EXISTS idx_appointment_clinic_datetime ON appointment (clinic_id, datetime);
+
+CREATE TABLE IF NOT EXISTS appointment_archive.treatment_record (LIKE treatment_record);
+
+COMMIT;
+
+ANALYZE appointment;
+ANALYZE treatment_record;
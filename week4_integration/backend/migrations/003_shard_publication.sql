@@ -0,0 +1,16 @@
+-- Reference data for clinic shards (shards.py): publishes the global tables so that every
+-- shard database can keep a read-only copy to join against. Run once on the central
+-- database, which needs wal_level = logical (a restart when it is changed):
+--   psql -U postgres -d pawpoint -f migrations/003_shard_publication.sql
+--
+-- appointment and treatment_record are not published; on a sharded deployment they live
+-- only on the shards (004_shard_node.sql). veterinarian_schedule has no clinic_id and is
+-- only read centrally, so it is not published either.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'pawpoint_reference') THEN
+        CREATE PUBLICATION pawpoint_reference FOR TABLE
+            "user", role, user_role, clinic, veterinarian, veterinarian_clinic, pet, pet_owner;
+    END IF;
+END $$;
@@ -0,0 +1,46 @@
+-- Turns an empty copy of the schema into shard :shard_index of :shard_count (shards.py).
+-- Run once on each shard database, in DB_SHARDS order:
+--   pg_dump --schema-only -d pawpoint | psql -d pawpoint_shard0
+--   psql -d pawpoint_shard0 -v shard_index=0 -v shard_count=2 -v id_floor=<max id on central> \
+--        -v central='host=<central> dbname=pawpoint user=<replication user> password=<...>' \
+--        -f migrations/004_shard_node.sql
+--
+-- 1. Interleaves the appointment and treatment_record id sequences: shard i hands out ids
+--    with id % shard_count = i, starting above id_floor (the largest appointment_id /
+--    record_id on the central database at cut-over), so ids stay unique across shards
+--    and say which shard holds the row.
+-- 2. Subscribes to the central database's reference tables (003_shard_publication.sql);
+--    the initial copy runs in the background.
+--
+-- Existing appointments move clinic by clinic, keeping their ids, e.g. for shard 0 of 2:
+--   \copy (SELECT * FROM appointment WHERE clinic_id % 2 = 0) TO 'shard0_appointments.csv' CSV
+-- on the central database and \copy ... FROM on the shard, then the same for treatment_record
+-- joined to those appointments. shards.find() looks for such rows beyond their id's shard.
+
+CREATE OR REPLACE FUNCTION interleave_shard_sequences(shard_index int, shard_count int, id_floor bigint)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    target record;
+    next_id bigint;
+BEGIN
+    FOR target IN
+        SELECT * FROM (VALUES ('appointment', 'appointment_id'), ('treatment_record', 'record_id')) AS t(tbl, col)
+    LOOP
+        EXECUTE format('SELECT greatest(%s, coalesce(max(%I), 0)) + 1 FROM %I', id_floor, target.col, target.tbl)
+            INTO next_id;
+        -- first id at or above next_id that belongs to this shard
+        next_id := next_id + ((shard_index - next_id) % shard_count + shard_count) % shard_count;
+        EXECUTE format(
+            'ALTER SEQUENCE %s INCREMENT BY %s RESTART WITH %s',
+            pg_get_serial_sequence(target.tbl, target.col), shard_count, next_id
+        );
+    END LOOP;
+END $$;
+
+SELECT interleave_shard_sequences(:shard_index, :shard_count, :id_floor);
+
+-- one replication slot per shard on the central database
+\set subscription pawpoint_reference_shard :shard_index
+CREATE SUBSCRIPTION :subscription
+    CONNECTION :'central'
+    PUBLICATION pawpoint_reference;
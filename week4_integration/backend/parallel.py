@@ -0,0 +1,152 @@
+"""
+Concurrent execution of a request's independent queries.
+
+A handler that needs several results that don't depend on each other (a dashboard's counts
+and its recent rows, an appointment and its treatment records, the same report on every
+shard) can run them side by side, each on a pooled connection of its own, so it answers in
+the time of the slowest query rather than the sum of all of them:
+
+    record, treatments = parallel.gather(
+        lambda: shards.run_on(home, appointment),
+        lambda: shards.run_on(home, treatment_records),
+    )
+
+Calls run on a thread pool shared by the process (PARALLEL_QUERY_THREADS), under the app
+context and a copy of the request's g, so the request's time budget (budgets.py) and the
+token cache apply inside them. At most PARALLEL_QUERY_MAX of one request's calls run at
+once, the first of them on the request's own thread. The request's admission slot pays for
+that one; each of the others needs a slot of its own from the gate (admission.borrow()),
+and without free slots the calls run one after another on the request thread, so fan-out
+never takes connections the admitted requests are counting on. gather() waits no longer
+than the budget: when it runs out the request fails like any other over-budget request
+(504), and calls not started yet are dropped.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from flask import current_app, g, has_app_context
+
+import admission
+from budgets import BudgetExceeded
+
+# worker threads shared by all requests of the process
+PARALLEL_QUERY_THREADS = int(os.environ.get("PARALLEL_QUERY_THREADS", 16))
+# calls of one gather() running at the same time, the request thread included
+PARALLEL_QUERY_MAX = int(os.environ.get("PARALLEL_QUERY_MAX", 4))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    # created on first use, so preloaded gunicorn masters fork without threads
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PARALLEL_QUERY_THREADS, thread_name_prefix="parallel-query")
+        return _executor
+
+
+def _in_context(fn):
+    """`fn` for a worker thread: runs under this app and a copy of this request's g."""
+    if not has_app_context():
+        return fn
+    app = current_app._get_current_object()
+    values = {name: g.get(name) for name in g}
+
+    def call():
+        with app.app_context():
+            for name, value in values.items():
+                setattr(g, name, value)
+            return fn()
+
+    return call
+
+
+def _remaining():
+    """Seconds left in the request's budget, or None without one."""
+    state = g.get("budget") if has_app_context() else None
+    if state is None:
+        return None
+    return state["deadline"] - time.monotonic()
+
+
+def _out_of_budget():
+    state = g.get("budget")
+    if state["reason"] is None:
+        state["reason"] = "deadline"
+    return BudgetExceeded(f"time budget of {state['budget_ms']} ms exhausted")
+
+
+def _release_when_done(futures, release):
+    """release() once the calls gather() stopped waiting for have finished."""
+    left = [len(futures)]
+    lock = threading.Lock()
+
+    def finished(_):
+        with lock:
+            left[0] -= 1
+            last = left[0] == 0
+        if last:
+            release()
+
+    for future in futures:
+        future.add_done_callback(finished)
+
+
+def gather(*calls):
+    """
+    Run the zero-argument `calls` concurrently; returns their results in order. The first
+    error is raised once the calls already running have finished. Calls must not gather()
+    themselves: put every query of the request into one gather().
+    """
+    extra, release = admission.borrow(min(PARALLEL_QUERY_MAX, len(calls)) - 1)
+    if extra <= 0:
+        return [call() for call in calls]
+
+    pending = list(enumerate(calls))
+    inline = pending.pop(0)
+    running = {}
+
+    def submit():
+        while pending and len(running) < extra:
+            index, call = pending.pop(0)
+            running[_pool().submit(_in_context(call))] = index
+
+    results = [None] * len(calls)
+    error = None
+    try:
+        submit()
+        try:
+            results[inline[0]] = inline[1]()
+        except Exception as e:
+            error = e
+            pending.clear()
+
+        while running:
+            remaining = _remaining()
+            if remaining is not None and remaining <= 0:
+                pending.clear()
+                raise error or _out_of_budget()
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                    pending.clear()
+            if error is None:
+                submit()
+    finally:
+        # the borrowed slots stay taken while their connections are
+        if running:
+            _release_when_done(list(running), release)
+        else:
+            release()
+    if error is not None:
+        raise error
+    return results
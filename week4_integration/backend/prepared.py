@@ -0,0 +1,195 @@
+"""
+Server-side prepared statements for the hot queries.
+
+execute(cur, sql, params) runs `sql` through a named PREPARE on the cursor's connection the
+first time that connection sees it, and as EXECUTE name(...) afterwards, so Postgres parses
+and plans the big appointment joins once per pooled connection instead of on every request.
+Statements are named by a hash of their text, which also covers the ?fields= variants
+built by projection.py. Each connection holds at most PREPARED_MAX statements; anything
+beyond that (and named %(x)s parameters) runs as plain SQL. The names are kept per
+connection object and forgotten when the pool closes it.
+
+psycopg2 speaks the simple query protocol, so these are SQL-level prepared statements and
+belong to one server session. Behind a transaction pooler (Supabase on port 6543,
+pgbouncer in transaction mode) consecutive transactions land on different sessions, so:
+
+    PREPARED_STATEMENTS=auto (default) - on, except for DB_PORT 6543 and the MySQL dialect
+    PREPARED_STATEMENTS=1 / 0          - force on / off
+
+and if the server ever reports a missing or duplicate statement name, the registry
+switches itself off for the process and the statement is re-run as plain SQL. A PREPARE
+sent inside a transaction goes with a savepoint, so the re-run happens in the same
+transaction; only an EXECUTE that fails mid-transaction (the session changed since the
+PREPARE) still fails its request.
+"""
+import hashlib
+import os
+import re
+import threading
+import weakref
+
+from db import dialect, discard_hooks
+
+try:
+    from psycopg2 import errors as pg_errors
+    FALLBACK_ERRORS = (pg_errors.InvalidSqlStatementName, pg_errors.DuplicatePreparedStatement)
+except ImportError:  # MySQL-only deployments never prepare
+    FALLBACK_ERRORS = ()
+
+_PLACEHOLDER = re.compile(r"%%|%s|%\(")
+# taken before a PREPARE inside a transaction, released with the EXECUTE that follows
+_SAVEPOINT = "pp_prepare"
+
+_lock = threading.Lock()
+_prepared = weakref.WeakKeyDictionary()  # connection -> set of statement names
+_stats = {"prepared": 0, "executed": 0, "plain": 0, "fallbacks": 0}
+_config = {"enabled": False, "max": 64}
+
+
+def auto_enabled(port=None):
+    if dialect.name != "postgres":
+        return False
+    setting = os.environ.get("PREPARED_STATEMENTS", "auto").strip().lower()
+    if setting in ("1", "true", "on"):
+        return True
+    if setting in ("0", "false", "off"):
+        return False
+    port = port if port is not None else int(os.environ.get("DB_PORT", 6543))
+    return port != 6543
+
+
+def init_prepared(app):
+    app.config.setdefault("PREPARED_STATEMENTS", auto_enabled())
+    app.config.setdefault("PREPARED_MAX", int(os.environ.get("PREPARED_MAX", 64)))
+    configure(app.config["PREPARED_STATEMENTS"], app.config["PREPARED_MAX"])
+    return app
+
+
+def configure(enabled, max_statements=64):
+    with _lock:
+        _config["enabled"] = bool(enabled)
+        _config["max"] = max_statements
+        _prepared.clear()
+
+
+def enabled():
+    return _config["enabled"]
+
+
+def stats():
+    with _lock:
+        return dict(_stats, enabled=_config["enabled"], connections=len(_prepared))
+
+
+def statement_name(sql):
+    return "pp_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+
+
+def to_server_params(sql):
+    """Rewrite %s placeholders as $1..$n (and %% as %); None when the SQL can't be prepared."""
+    count = 0
+
+    def swap(match):
+        nonlocal count
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        if token == "%(":
+            raise ValueError("named parameters")
+        count += 1
+        return f"${count}"
+
+    try:
+        return _PLACEHOLDER.sub(swap, sql), count
+    except ValueError:
+        return None, 0
+
+
+def forget(conn):
+    """Drop the statement names of a connection the pool has closed."""
+    with _lock:
+        _prepared.pop(conn, None)
+
+
+discard_hooks.append(forget)
+
+
+def _plain(cur, sql, params):
+    with _lock:
+        _stats["plain"] += 1
+    cur.execute(sql, params)
+
+
+def prepare(cur, sql):
+    """PREPARE `sql` on the cursor's connection ahead of its first execute(); False when skipped."""
+    if not _config["enabled"]:
+        return False
+    body, _ = to_server_params(sql)
+    if body is None:
+        return False
+    name = statement_name(sql)
+    conn = cur.connection
+    with _lock:
+        names = _prepared.setdefault(conn, set())
+        if name in names or len(names) >= _config["max"]:
+            return False
+    cur.execute(f"PREPARE {name} AS {body}")
+    with _lock:
+        names.add(name)
+        _stats["prepared"] += 1
+    return True
+
+
+def execute(cur, sql, params=None):
+    """cur.execute(sql, params), through a per-connection prepared statement when enabled."""
+    if not _config["enabled"]:
+        return _plain(cur, sql, params)
+    body, count = to_server_params(sql)
+    if body is None or (params is not None and not isinstance(params, (tuple, list))):
+        return _plain(cur, sql, params)
+
+    conn = cur.connection
+    name = statement_name(sql)
+    with _lock:
+        names = _prepared.setdefault(conn, set())
+        known = name in names
+        if not known and len(names) >= _config["max"]:
+            _stats["plain"] += 1
+            full = True
+        else:
+            full = False
+    if full:
+        return cur.execute(sql, params)
+
+    idle = conn.info.transaction_status == 0  # TRANSACTION_STATUS_IDLE: nothing to lose on retry
+    args = tuple(params or ())
+    call = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * count)})" if count else "")
+    savepoint = not known and not idle
+    try:
+        if not known:
+            # one round trip either way: the savepoint rides with the PREPARE
+            cur.execute(f"SAVEPOINT {_SAVEPOINT}; PREPARE {name} AS {body}" if savepoint else f"PREPARE {name} AS {body}")
+            with _lock:
+                names.add(name)
+                _stats["prepared"] += 1
+            if savepoint:
+                call = f"RELEASE SAVEPOINT {_SAVEPOINT}; {call}"
+        cur.execute(call, args if count else None)
+        with _lock:
+            _stats["executed"] += 1
+    except FALLBACK_ERRORS as e:
+        # the session changed under us: a transaction pooler or a DISCARD ALL
+        print(f"Prepared statements disabled: {str(e).strip()}")
+        with _lock:
+            _config["enabled"] = False
+            _prepared.clear()
+            _stats["fallbacks"] += 1
+        if savepoint and name not in names:
+            # the PREPARE failed: undo it and carry on in the same transaction
+            cur.execute(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+        elif not idle:
+            raise
+        else:
+            conn.rollback()
+        return _plain(cur, sql, params)
+
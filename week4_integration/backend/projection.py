@@ -0,0 +1,124 @@
+"""
+Sparse field selection (?fields=) for read endpoints.
+
+Each resource declares a whitelist of output fields (SQL expression + the join aliases
+it needs) and an ordered list of joins. build() emits only the requested columns and
+only the joins those columns, or the caller's filter, depend on.
+"""
+
+
+class FieldSelectionError(ValueError):
+    """Raised when ?fields= names a column outside the whitelist."""
+
+
+class Projection:
+    def __init__(self, base, fields, joins=()):
+        # base:   "FROM <table> <alias>"
+        # fields: {name: (sql_expression, (join_alias, ...))}, in default output order
+        # joins:  [(alias, join_sql, (depends_on_alias, ...))], in emit order
+        self.base = base
+        self.fields = fields
+        self.joins = joins
+        self._join_deps = {alias: deps for alias, _, deps in joins}
+
+    def parse(self, raw):
+        """Turn a comma separated ?fields= value into a list of field names (all fields when empty)."""
+        if not raw:
+            return list(self.fields)
+
+        names = []
+        for part in raw.split(","):
+            name = part.strip()
+            if not name:
+                continue
+            if name not in self.fields:
+                raise FieldSelectionError(
+                    f"Unknown field: {name}. Allowed: {', '.join(self.fields)}"
+                )
+            if name not in names:
+                names.append(name)
+        return names or list(self.fields)
+
+    def build(self, names, tail="", required=(), extra=None):
+        """
+        Build the SELECT for the given fields. `tail` is appended verbatim (WHERE / ORDER BY /
+        LIMIT) and `required` lists the join aliases it references. `extra` adds internal
+        columns after them, declared like `fields` but never selectable through ?fields=.
+        """
+        fields = dict(self.fields, **extra) if extra else self.fields
+        names = list(names) + list(extra or ())
+        aliases = set(required)
+        for name in names:
+            aliases.update(fields[name][1])
+
+        # pull in joins that the selected joins hang off (e.g. vet user needs veterinarian)
+        pending = list(aliases)
+        while pending:
+            for dep in self._join_deps.get(pending.pop(), ()):
+                if dep not in aliases:
+                    aliases.add(dep)
+                    pending.append(dep)
+
+        columns = ",\n    ".join(f"{fields[name][0]} AS {name}" for name in names)
+        joins = "\n".join(sql for alias, sql, _ in self.joins if alias in aliases)
+        return f"SELECT\n    {columns}\n{self.base}\n{joins}\n{tail}"
+
+
+APPOINTMENTS = Projection(
+    "FROM appointment a",
+    {
+        "appointment_id": ("a.appointment_id", ()),
+        "datetime": ("a.datetime", ()),
+        "status": ("a.status", ()),
+        "pet_name": ("p.name", ("p",)),
+        "clinic_name": ("c.name", ("c",)),
+        "owner_name": ("CONCAT(owner_u.first_name, ' ', owner_u.last_name)", ("owner_u",)),
+        "veterinarian_id": ("a.veterinarian_id", ()),
+        "license_no": ("v.license_no", ("v",)),
+        "vet_name": ("CONCAT(vu.first_name, ' ', vu.last_name)", ("vu",)),
+    },
+    [
+        ("p", "JOIN pet p ON a.pet_id = p.pet_id", ()),
+        ("c", "JOIN clinic c ON a.clinic_id = c.clinic_id", ()),
+        ("v", "JOIN veterinarian v ON a.veterinarian_id = v.veterinarian_id", ()),
+        ("vu", 'LEFT JOIN "user" vu ON v.user_id = vu.user_id', ("v",)),
+        ("po", "LEFT JOIN pet_owner po ON a.pet_id = po.pet_id", ()),
+        ("owner_u", 'LEFT JOIN "user" owner_u ON po.user_id = owner_u.user_id', ("po",)),
+    ],
+)
+
+TREATMENTS = Projection(
+    "FROM treatment_record t",
+    {
+        "record_id": ("t.record_id", ()),
+        "date": ("t.date", ()),
+        "diagnosis": ("t.diagnosis", ()),
+        "note": ("t.note", ()),
+        "appointment_id": ("t.appointment_id", ()),
+        "pet_name": ("p.name", ("p",)),
+        "vet_name": ("CONCAT(u.first_name, ' ', u.last_name)", ("u",)),
+        "license_no": ("v.license_no", ("v",)),
+    },
+    [
+        ("a", "LEFT JOIN appointment a ON t.appointment_id = a.appointment_id", ()),
+        ("p", "LEFT JOIN pet p ON a.pet_id = p.pet_id", ("a",)),
+        ("v", "LEFT JOIN veterinarian v ON a.veterinarian_id = v.veterinarian_id", ("a",)),
+        ("u", 'LEFT JOIN "user" u ON v.user_id = u.user_id', ("v",)),
+    ],
+)
+
+PETS = Projection(
+    "FROM pet p",
+    {
+        "pet_id": ("p.pet_id", ()),
+        "name": ("p.name", ()),
+        "species": ("p.species", ()),
+        "breed": ("p.breed", ()),
+        "gender": ("p.gender", ()),
+        "birth_date": ("p.birth_date", ()),
+        "age": ("p.age", ()),
+    },
+    [
+        ("po", "JOIN pet_owner po ON p.pet_id = po.pet_id", ()),
+    ],
+)
@@ -0,0 +1,183 @@
+"""
+Named SQL statements shared by the route handlers and the benchmark suite.
+
+Keeping the text in one place means benchmarks/query_bench.py measures exactly what the
+API runs. Statements whose shape depends on the request (sparse ?fields=, role filters)
+are built through projection.py instead. Dialect-specific fragments come from db.dialect.
+"""
+from db import dialect
+
+# ensure_vet_and_clinic(): both checks in one round trip
+VET_CLINIC_CHECK = """
+    SELECT
+        EXISTS (SELECT 1 FROM veterinarian WHERE veterinarian_id=%s) AS vet_exists,
+        EXISTS (
+            SELECT 1 FROM veterinarian_clinic
+            WHERE veterinarian_id=%s AND clinic_id=%s
+        ) AS vet_in_clinic
+"""
+
+# Outcome of one requested booking `r` (datetime, status, pet_id, clinic_id, veterinarian_id,
+# owner_id); the first failing check wins. owner_id is NULL when ownership isn't checked.
+BOOKING_OUTCOME = """
+    CASE
+        WHEN r.owner_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM pet_owner po WHERE po.pet_id = r.pet_id AND po.user_id = r.owner_id
+        ) THEN 'not_owner'
+        WHEN NOT EXISTS (SELECT 1 FROM pet p WHERE p.pet_id = r.pet_id) THEN 'pet_not_found'
+        WHEN NOT EXISTS (
+            SELECT 1 FROM veterinarian v WHERE v.veterinarian_id = r.veterinarian_id
+        ) THEN 'vet_not_found'
+        WHEN NOT EXISTS (
+            SELECT 1 FROM veterinarian_clinic vc
+            WHERE vc.veterinarian_id = r.veterinarian_id AND vc.clinic_id = r.clinic_id
+        ) THEN 'vet_not_in_clinic'
+        ELSE 'created'
+    END
+"""
+
+# POST /appointments and /appointments/batch (PostgreSQL): validates a JSON array of
+# bookings and inserts the valid ones in one statement. Rows are typed by the appointment
+# columns themselves; ids are drawn up front so every input row maps to its new id. With
+# %(atomic)s nothing is inserted unless every row passes. Returns (idx, outcome, id) per
+# input row, idx 1-based; valid rows held back by atomic come out as 'skipped'.
+BOOK_APPOINTMENTS = f"""
+    WITH r AS (
+        SELECT
+            e.idx, a.datetime, COALESCE(a.status, 'scheduled') AS status,
+            a.pet_id, a.clinic_id, a.veterinarian_id,
+            (e.item->>'owner_id')::int AS owner_id
+        FROM jsonb_array_elements(%(rows)s::jsonb) WITH ORDINALITY AS e(item, idx)
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::appointment, e.item) AS a
+    ),
+    checked AS (
+        SELECT r.*, {BOOKING_OUTCOME} AS outcome FROM r
+    ),
+    booked AS (
+        SELECT idx, nextval(pg_get_serial_sequence('appointment', 'appointment_id')) AS appointment_id
+        FROM checked
+        WHERE outcome = 'created'
+          AND NOT (%(atomic)s AND EXISTS (SELECT 1 FROM checked WHERE outcome <> 'created'))
+    ),
+    inserted AS (
+        INSERT INTO appointment (appointment_id, datetime, status, pet_id, clinic_id, veterinarian_id)
+        SELECT b.appointment_id, c.datetime, c.status, c.pet_id, c.clinic_id, c.veterinarian_id
+        FROM booked b
+        JOIN checked c USING (idx)
+        RETURNING appointment_id
+    )
+    SELECT
+        c.idx,
+        CASE WHEN c.outcome = 'created' AND i.appointment_id IS NULL THEN 'skipped' ELSE c.outcome END,
+        i.appointment_id
+    FROM checked c
+    LEFT JOIN booked b USING (idx)
+    LEFT JOIN inserted i ON i.appointment_id = b.appointment_id
+    ORDER BY c.idx
+"""
+
+# MySQL has no data-modifying CTEs: one guarded INSERT per booking, and the outcome query
+# only when it inserted nothing
+_BOOKING_ROW = """
+    (SELECT %(datetime)s AS datetime, %(status)s AS status, %(pet_id)s AS pet_id,
+            %(clinic_id)s AS clinic_id, %(veterinarian_id)s AS veterinarian_id,
+            %(owner_id)s AS owner_id) r
+"""
+
+BOOK_APPOINTMENT_GUARDED = f"""
+    INSERT INTO appointment (datetime, status, pet_id, clinic_id, veterinarian_id)
+    SELECT r.datetime, r.status, r.pet_id, r.clinic_id, r.veterinarian_id
+    FROM {_BOOKING_ROW}
+    WHERE {BOOKING_OUTCOME} = 'created'
+"""
+
+BOOKING_ROW_OUTCOME = f"SELECT {BOOKING_OUTCOME} FROM {_BOOKING_ROW}"
+
+# GET /veterinarians/<id>/schedules, ordered monday..sunday
+VET_SCHEDULES = f"""
+    SELECT 
+        schedule_id,
+        day,
+        {dialect.time_hhmm("time_start")} AS time_start,
+        {dialect.time_hhmm("time_end")} AS time_end,
+        veterinarian_id
+    FROM veterinarian_schedule
+    WHERE veterinarian_id = %s
+    ORDER BY 
+        CASE LOWER(day)
+            WHEN 'monday' THEN 1
+            WHEN 'tuesday' THEN 2
+            WHEN 'wednesday' THEN 3
+            WHEN 'thursday' THEN 4
+            WHEN 'friday' THEN 5
+            WHEN 'saturday' THEN 6
+            WHEN 'sunday' THEN 7
+            ELSE 8
+        END,
+        time_start
+"""
+
+# GET /reports/*
+# {where} takes the optional ?from=/?to= range on a.datetime (see filtered())
+REPORT_BY_STATUS_TEMPLATE = """
+    SELECT status, COUNT(*) AS total
+    FROM appointment a
+    {where}
+    GROUP BY status
+"""
+
+REPORT_BY_CLINIC_TEMPLATE = """
+    SELECT c.name AS clinic, COUNT(a.appointment_id) AS total
+    FROM appointment a
+    JOIN clinic c ON a.clinic_id = c.clinic_id
+    {where}
+    GROUP BY c.clinic_id, c.name
+"""
+
+REPORT_TREATMENTS_TEMPLATE = """
+    SELECT 
+        a.appointment_id,
+        p.name AS pet_name,
+        t.diagnosis,
+        CONCAT(u.first_name, ' ', u.last_name) AS vet_name,
+        v.license_no
+    FROM treatment_record t
+    JOIN appointment a ON t.appointment_id = a.appointment_id
+    JOIN pet p ON a.pet_id = p.pet_id
+    LEFT JOIN veterinarian v ON a.veterinarian_id = v.veterinarian_id
+    LEFT JOIN "user" u ON v.user_id = u.user_id
+    {where}
+"""
+
+
+# GET /reports/dashboard: global totals from the central database, plus per-shard rows
+DASHBOARD_TOTALS = """
+    SELECT
+        (SELECT COUNT(*) FROM pet) AS pets,
+        (SELECT COUNT(DISTINCT user_id) FROM pet_owner) AS owners,
+        (SELECT COUNT(*) FROM clinic) AS clinics,
+        (SELECT COUNT(*) FROM veterinarian) AS veterinarians
+"""
+
+DASHBOARD_RECENT_TREATMENTS = """
+    SELECT t.record_id, t.date, t.diagnosis, t.appointment_id, p.name AS pet_name
+    FROM treatment_record t
+    JOIN appointment a ON t.appointment_id = a.appointment_id
+    JOIN pet p ON a.pet_id = p.pet_id
+    ORDER BY t.date DESC, t.record_id DESC
+    LIMIT %s
+"""
+
+
+def where(conditions):
+    """WHERE clause AND-ing `conditions`, or an empty string when there are none."""
+    return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def filtered(template, conditions=()):
+    return template.format(where=where(list(conditions)))
+
+
+REPORT_BY_STATUS = filtered(REPORT_BY_STATUS_TEMPLATE)
+REPORT_BY_CLINIC = filtered(REPORT_BY_CLINIC_TEMPLATE)
+REPORT_TREATMENTS = filtered(REPORT_TREATMENTS_TEMPLATE)
@@ -0,0 +1,180 @@
+"""
+Sliding-window rate limiting for /login.
+
+Every attempt costs a user lookup and a scrypt hash check, so credential stuffing turns
+straight into CPU load. login_allowed() runs before any of that and counts attempts per
+client IP and per email. Each counter is a sliding window approximated from two fixed
+windows, so a check is O(1) in time and memory:
+
+    estimate = previous_window_count * (1 - elapsed / window) + current_window_count
+
+Configuration (app.config or environment):
+
+    LOGIN_LIMIT_PER_IP         attempts/seconds per client IP (default 20/60)
+    LOGIN_LIMIT_PER_EMAIL      attempts/seconds per email (default 5/300); reset on success
+    RATE_LIMIT_URL             redis://host:port shared by all workers; empty = per process
+    RATE_LIMIT_TRUSTED_PROXIES proxies in front of the app whose X-Forwarded-For is trusted
+    RATE_LIMIT_ENABLED         0 turns limiting off
+
+When the shared backend cannot be reached the limiter keeps counting in process, so a
+backend outage neither locks everyone out nor switches throttling off; the shared backend
+is retried every few seconds.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+from resp import RespClient, RespError
+
+BACKEND_RETRY_SECONDS = 5.0
+
+
+def parse_rate(value):
+    """'20/60' -> (20, 60.0): attempts per window in seconds."""
+    limit, _, window = str(value).partition("/")
+    return int(limit), float(window or 60)
+
+
+class MemoryBackend:
+    """Per-process counters, key -> [window index, count, previous count], LRU bounded."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, index, ttl):
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = [index, 0, 0]
+            elif entry[0] != index:
+                # roll forward: the old window is the previous one only if adjacent
+                entry[2] = entry[1] if entry[0] == index - 1 else 0
+                entry[0], entry[1] = index, 0
+            entry[1] += 1
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return entry[1], entry[2]
+
+    def reset(self, key, index):
+        with self._lock:
+            self._windows.pop(key, None)
+
+
+class RespBackend:
+    """Counters in a Redis-compatible server: one key per window, pipelined INCR/EXPIRE/GET."""
+
+    def __init__(self, client, prefix="rl:"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, index, ttl):
+        current = f"{self.prefix}{key}:{index}"
+        count, _, previous = self.client.pipeline(
+            ("INCR", current),
+            ("EXPIRE", current, int(math.ceil(ttl))),
+            ("GET", f"{self.prefix}{key}:{index - 1}"),
+        )
+        return count, int(previous or 0)
+
+    def reset(self, key, index):
+        self.client.execute("DEL", f"{self.prefix}{key}:{index}", f"{self.prefix}{key}:{index - 1}")
+
+
+class SlidingWindowLimiter:
+    """At most `limit` hits per `window` seconds and key; hit() counts and decides."""
+
+    def __init__(self, name, limit, window, backend, fallback=None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.backend = backend
+        self.fallback = fallback or MemoryBackend()
+        self._backend_down_until = 0.0
+
+    def _call(self, method, *args):
+        if time.time() >= self._backend_down_until:
+            try:
+                return getattr(self.backend, method)(*args)
+            except (OSError, RespError) as e:
+                # don't pay a connect timeout on every attempt while the backend is away
+                print(f"Rate limit backend error ({self.name}): {str(e)}")
+                self._backend_down_until = time.time() + BACKEND_RETRY_SECONDS
+        return getattr(self.fallback, method)(*args)
+
+    def hit(self, key, now=None):
+        """(allowed, retry_after seconds). Rejected attempts count too, so a steady flood stays blocked."""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        elapsed = now - index * self.window
+        count, previous = self._call("hit", f"{self.name}:{key}", index, 2 * self.window)
+        weight = (self.window - elapsed) / self.window
+        if previous * weight + count <= self.limit:
+            return True, 0
+        if count > self.limit:
+            # only the next window can bring the estimate back under the limit
+            retry_after = self.window - elapsed
+        else:
+            # wait for the previous window's share to decay
+            retry_after = self.window * (1 - (self.limit - count) / previous) - elapsed
+        return False, max(1, int(math.ceil(retry_after)))
+
+    def reset(self, key, now=None):
+        now = time.time() if now is None else now
+        self._call("reset", f"{self.name}:{key}", int(now // self.window))
+
+
+_limiters = {}
+_config = {"enabled": True, "trusted_proxies": 0}
+
+
+def init_ratelimit(app):
+    app.config.setdefault("RATE_LIMIT_ENABLED", os.environ.get("RATE_LIMIT_ENABLED", "1") == "1")
+    app.config.setdefault("RATE_LIMIT_URL", os.environ.get("RATE_LIMIT_URL", ""))
+    app.config.setdefault("RATE_LIMIT_TRUSTED_PROXIES", int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", 0)))
+    app.config.setdefault("LOGIN_LIMIT_PER_IP", os.environ.get("LOGIN_LIMIT_PER_IP", "20/60"))
+    app.config.setdefault("LOGIN_LIMIT_PER_EMAIL", os.environ.get("LOGIN_LIMIT_PER_EMAIL", "5/300"))
+
+    url = app.config["RATE_LIMIT_URL"]
+    backend = RespBackend(RespClient(url)) if url else MemoryBackend()
+    _config["enabled"] = app.config["RATE_LIMIT_ENABLED"]
+    _config["trusted_proxies"] = app.config["RATE_LIMIT_TRUSTED_PROXIES"]
+    for name, setting in (("login_ip", "LOGIN_LIMIT_PER_IP"), ("login_email", "LOGIN_LIMIT_PER_EMAIL")):
+        limit, window = parse_rate(app.config[setting])
+        _limiters[name] = SlidingWindowLimiter(name, limit, window, backend)
+    return app
+
+
+def client_ip():
+    """Client address, skipping RATE_LIMIT_TRUSTED_PROXIES hops of X-Forwarded-For."""
+    route = request.access_route
+    trusted = _config["trusted_proxies"]
+    if trusted and len(route) > trusted:
+        return route[-(trusted + 1)]
+    return request.remote_addr or "unknown"
+
+
+def _email_key(email):
+    return str(email).strip().lower()
+
+
+def login_allowed(email):
+    """(allowed, retry_after) for a login attempt; call before any database or hash work."""
+    if not _config["enabled"] or not _limiters:
+        return True, 0
+    allowed, retry_after = _limiters["login_ip"].hit(client_ip())
+    if not allowed:
+        return False, retry_after
+    return _limiters["login_email"].hit(_email_key(email))
+
+
+def login_succeeded(email):
+    """Clear the per-email counter so a user's own typos don't outlive a good login."""
+    if _config["enabled"] and _limiters:
+        _limiters["login_email"].reset(_email_key(email))
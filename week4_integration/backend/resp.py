@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Minimal RESP (Redis protocol) client, plus a local stand-in server.
+
+RespClient speaks just enough of the protocol for the shared backends (ratelimit.py,
+shared_cache.py): pipelined commands over a small pool of sockets. Any Redis-compatible
+server works (Redis, Valkey, KeyDB). For development and tests there is a stand-in that
+keeps strings with expiry in memory and implements PING, GET, SET [EX|PX] [NX], INCR,
+INCRBY, EXPIRE, PEXPIRE, TTL, DEL, EXISTS and FLUSHALL:
+
+    python resp.py --port 6390            # then RATE_LIMIT_URL / CACHE_URL=redis://localhost:6390
+
+or in-process: `url = LocalRespServer().start()`.
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply from the server (-ERR ...)."""
+
+
+def encode(args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        else:
+            data = str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f"unexpected reply {line!r}")
+
+
+class RespClient:
+    """Thread-safe client; each call borrows one pooled socket for a pipelined round trip."""
+
+    def __init__(self, url, timeout=0.5, max_idle=8):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._roundtrip(conn, setup)
+        return conn
+
+    def _roundtrip(self, conn, commands):
+        sock, stream = conn
+        sock.sendall(b"".join(encode(cmd) for cmd in commands))
+        replies = [read_reply(stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def pipeline(self, *commands):
+        """Send all commands in one write and return their replies in order."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            replies = self._roundtrip(conn, commands)
+        except RespError:
+            self._release(conn)
+            raise
+        except Exception:
+            conn[0].close()
+            raise
+        self._release(conn)
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn[0].close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, _ in idle:
+            sock.close()
+
+
+# =========================
+# Stand-in server
+# =========================
+class _Store:
+    def __init__(self):
+        self.data = {}  # key -> [value bytes, expires_at or None]
+        self.lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def call(self, args):
+        name = args[0].decode("utf-8").upper()
+        handler = getattr(self, "cmd_" + name.lower(), None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{name}'")
+        with self.lock:
+            try:
+                return handler(time.time(), *args[1:])
+            except (TypeError, ValueError, IndexError):
+                return RespError(f"ERR wrong arguments for '{name}'")
+
+    def cmd_ping(self, now, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_get(self, now, key):
+        entry = self._live(key, now)
+        return entry[0] if entry else None
+
+    def cmd_set(self, now, key, value, *options):
+        options = [o.decode("utf-8").upper() for o in options]
+        expires_at = None
+        if "NX" in options and self._live(key, now):
+            return None
+        for unit, scale in (("EX", 1.0), ("PX", 0.001)):
+            if unit in options:
+                expires_at = now + int(options[options.index(unit) + 1]) * scale
+        self.data[key] = [value, expires_at]
+        return "OK"
+
+    def cmd_incrby(self, now, key, amount):
+        entry = self._live(key, now) or self.data.setdefault(key, [b"0", None])
+        value = int(entry[0]) + int(amount)
+        entry[0] = str(value).encode("utf-8")
+        return value
+
+    def cmd_incr(self, now, key):
+        return self.cmd_incrby(now, key, b"1")
+
+    def cmd_pexpire(self, now, key, millis):
+        entry = self._live(key, now)
+        if entry is None:
+            return 0
+        entry[1] = now + int(millis) / 1000.0
+        return 1
+
+    def cmd_expire(self, now, key, seconds):
+        return self.cmd_pexpire(now, key, int(seconds) * 1000)
+
+    def cmd_ttl(self, now, key):
+        entry = self._live(key, now)
+        if entry is None:
+            return -2
+        return -1 if entry[1] is None else int(entry[1] - now + 0.999)
+
+    def cmd_del(self, now, *keys):
+        return sum(1 for key in keys if self._live(key, now) and self.data.pop(key))
+
+    def cmd_exists(self, now, *keys):
+        return sum(1 for key in keys if self._live(key, now))
+
+    def cmd_flushall(self, now, *args):
+        self.data.clear()
+        return "OK"
+
+
+def _encode_reply(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, RespError):
+        return b"-%s\r\n" % str(reply).encode("utf-8")
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode_reply(r) for r in reply)
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, ValueError):
+                return
+            if not isinstance(command, list) or not command:
+                self.wfile.write(b"-ERR expected a command array\r\n")
+                continue
+            self.wfile.write(_encode_reply(self.server.store.call(command)))
+
+
+class LocalRespServer(socketserver.ThreadingTCPServer):
+    """In-memory RESP server for development and tests; not for production."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+    # many workers connect at once in tests; the default backlog of 5 drops connects
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}"
+
+    def start(self):
+        """Serve from a daemon thread; returns the redis:// URL to connect to."""
+        threading.Thread(target=self.serve_forever, name="resp-server", daemon=True).start()
+        return self.url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server = LocalRespServer(args.host, args.port)
+    print(f"RESP stand-in listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
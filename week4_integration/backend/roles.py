@@ -0,0 +1,74 @@
+"""
+Role directory cache.
+
+The role table holds three fixed rows (pet_owner, veterinarian, admin), so handlers resolve
+role names <-> ids from an in-memory copy instead of querying or joining `role`.
+The copy is loaded once (at startup, or lazily on first use) and only reloaded through the
+admin refresh endpoint. Lookups read an immutable mapping that is swapped wholesale on
+refresh, so they need no locking.
+
+The copy is per process. The worker serving the refresh publish()es it in the refresh's
+transaction, and every other worker drops its copy when that arrives
+(shared_cache.broadcaster) and reloads it on its next lookup. Without broadcasting (MySQL,
+or CACHE_NOTIFY off) the other workers keep their copy until they restart.
+"""
+import threading
+from types import MappingProxyType
+
+import shared_cache
+
+_lock = threading.Lock()
+_by_name = MappingProxyType({})
+_by_id = MappingProxyType({})
+
+
+def load_roles(cur):
+    """(Re)load the role table through `cur` and publish the new mappings."""
+    global _by_name, _by_id
+    cur.execute("SELECT role_id, role FROM role")
+    rows = [(row[0], row[1]) for row in cur.fetchall()]
+    with _lock:
+        _by_name = MappingProxyType({name: role_id for role_id, name in rows})
+        _by_id = MappingProxyType({role_id: name for role_id, name in rows})
+    return _by_name
+
+
+def forget():
+    """Drop the copy; the next lookup with a cursor loads it again."""
+    global _by_name, _by_id
+    with _lock:
+        _by_name = MappingProxyType({})
+        _by_id = MappingProxyType({})
+
+
+def init_roles(app):
+    shared_cache.broadcaster.subscribe("roles", _apply_broadcast)
+    return app
+
+
+def _apply_broadcast(op, args, kwargs):
+    # "reset": the listener reconnected and may have missed a reload
+    if op in ("reload", "reset"):
+        forget()
+
+
+def publish(cur):
+    """Have the other workers reload, with the transaction of `cur` (before its commit)."""
+    shared_cache.broadcaster.publish(cur, "roles", "reload")
+
+
+def _ensure_loaded(cur):
+    if not _by_id and cur is not None:
+        load_roles(cur)
+
+
+def role_id(name, cur=None):
+    """role_id for a role name, or None when the role does not exist."""
+    _ensure_loaded(cur)
+    return _by_name.get(name)
+
+
+def role_name(role_id, cur=None):
+    """Role name for a role_id, or None when the id is unknown."""
+    _ensure_loaded(cur)
+    return _by_id.get(role_id)
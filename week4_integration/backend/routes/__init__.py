@@ -0,0 +1,30 @@
+"""
+The API's blueprints, one module per area.
+
+create_app() imports them through register_blueprints() rather than at the top of app.py,
+so building an app costs only the blueprints it registers. BLUEPRINTS (comma-separated,
+default all) lets a process serve a subset, e.g. a reports-only deployment:
+
+    BLUEPRINTS=auth,reports gunicorn -c gunicorn.conf.py app:app
+
+Endpoint names are "<blueprint>.<function>" (pets.get_pets). Configuration keyed by
+endpoint (ROUTE_BUDGETS, ROUTE_CONCURRENCY) uses the function name alone, see endpoint_name().
+"""
+import importlib
+
+BLUEPRINTS = ("auth", "pets", "appointments", "vets", "treatments", "reports")
+
+
+def endpoint_name(endpoint):
+    """'pets.get_pets' -> 'get_pets'; endpoints registered on the app itself are unchanged."""
+    return endpoint.rpartition(".")[2] if endpoint else endpoint
+
+
+def register_blueprints(app, names=None):
+    """Import and register the named blueprints (default: all of BLUEPRINTS)."""
+    for name in names or BLUEPRINTS:
+        if name not in BLUEPRINTS:
+            raise ValueError(f"Unknown blueprint '{name}'; expected one of {', '.join(BLUEPRINTS)}")
+        module = importlib.import_module(f"{__name__}.{name}")
+        app.register_blueprint(module.bp)
+    return app
@@ -0,0 +1,466 @@
+"""Appointment booking, listings, detail and status changes."""
+import json
+from functools import partial
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import detail_cache
+import parallel
+import prepared
+import projection
+import queries
+import shards
+import token_cache
+from db import PoolTimeout, TupleCursor, dialect
+from json_provider import merged_response, query_result
+from routes.common import current_role, current_user_id, date_range_params, get_connection, role_required
+
+bp = Blueprint("appointments", __name__)
+
+
+def ensure_vet_and_clinic(cur, veterinarian_id, clinic_id):
+    """Validate that veterinarian exists and is assigned to the target clinic via veterinarian_clinic."""
+    cur.execute(queries.VET_CLINIC_CHECK, (veterinarian_id, veterinarian_id, clinic_id))
+    vet_exists, vet_in_clinic = cur.fetchone()
+    if not vet_exists:
+        return False, BOOKING_ERRORS["vet_not_found"][1]
+    if not vet_in_clinic:
+        return False, BOOKING_ERRORS["vet_not_in_clinic"][1]
+    return True, None
+
+
+# Booking outcomes of queries.BOOKING_OUTCOME -> (HTTP status, message)
+BOOKING_ERRORS = {
+    "missing_fields": (400, "datetime, pet_id, clinic_id and veterinarian_id are required"),
+    "not_owner": (403, "You can only book appointments for your own pets"),
+    "pet_not_found": (404, "Pet not found"),
+    "vet_not_found": (400, "Veterinarian not found"),
+    "vet_not_in_clinic": (400, "Veterinarian must be assigned to the selected clinic"),
+    "skipped": (409, "Not booked: another appointment in the batch failed validation"),
+}
+BOOKING_FIELDS = ("datetime", "pet_id", "clinic_id", "veterinarian_id")
+
+
+def book_appointments(cur, bookings, atomic=False):
+    """
+    Validate and insert appointment bookings; returns one (outcome, appointment_id) per booking.
+
+    Each booking is a dict with datetime, pet_id, clinic_id, veterinarian_id, optional status
+    and owner_id (the pet must belong to that user). Ownership, pet, vet and clinic checks
+    run inside the INSERT itself (queries.BOOKING_OUTCOME). With atomic=True nothing is
+    booked unless every booking is valid; the caller rolls back in that case on MySQL.
+    """
+    results = [None] * len(bookings)
+    rows = []
+    for i, booking in enumerate(bookings):
+        if not isinstance(booking, dict) or any(booking.get(k) in (None, "") for k in BOOKING_FIELDS):
+            results[i] = ("missing_fields", None)
+            continue
+        rows.append((i, {
+            "datetime": booking["datetime"],
+            "status": booking.get("status") or "scheduled",
+            "pet_id": booking["pet_id"],
+            "clinic_id": booking["clinic_id"],
+            "veterinarian_id": booking["veterinarian_id"],
+            "owner_id": booking.get("owner_id"),
+        }))
+    atomic_failed = atomic and len(rows) < len(bookings)
+
+    if rows and not atomic_failed and dialect.name == "postgres":
+        cur.execute(queries.BOOK_APPOINTMENTS, {
+            "rows": json.dumps([row for _, row in rows], default=str),
+            "atomic": bool(atomic),
+        })
+        for idx, outcome, appointment_id in cur.fetchall():
+            results[rows[idx - 1][0]] = (outcome, appointment_id)
+    elif rows and not atomic_failed:
+        for i, row in rows:
+            cur.execute(queries.BOOK_APPOINTMENT_GUARDED, row)
+            if cur.rowcount:
+                results[i] = ("created", cur.lastrowid)
+            else:
+                cur.execute(queries.BOOKING_ROW_OUTCOME, row)
+                results[i] = (cur.fetchone()[0], None)
+
+    if atomic and any(r is not None and r[0] != "created" for r in results):
+        # nothing is kept; valid bookings report why they were not made
+        results = [("skipped", None) if r is None or r[0] == "created" else r for r in results]
+    return results
+
+
+def book_on_shards(bookings, atomic=False):
+    """
+    book_appointments() on the shard of each booking's clinic; outcomes in input order.
+
+    An atomic batch is committed only when every shard's part of it is valid, but the
+    commits themselves are not atomic across shards (there is no two-phase commit).
+    """
+    groups = {}
+    for i, booking in enumerate(bookings):
+        clinic_id = booking.get("clinic_id") if isinstance(booking, dict) else None
+        groups.setdefault(shards.for_clinic(clinic_id), []).append(i)
+
+    results = [None] * len(bookings)
+    conns = []
+    try:
+        for shard, indices in sorted(groups.items()):
+            conn = get_connection(shard=shard)
+            conns.append(conn)
+            with conn.cursor() as cur:
+                outcomes = book_appointments(cur, [bookings[i] for i in indices], atomic=atomic)
+            for i, outcome in zip(indices, outcomes):
+                results[i] = outcome
+        failed = atomic and any(outcome != "created" for outcome, _ in results)
+        for conn in conns:
+            if failed:
+                conn.rollback()
+            else:
+                conn.commit()
+    except Exception:
+        for conn in conns:
+            conn.rollback()
+        raise
+    finally:
+        for conn in conns:
+            conn.close()
+
+    if failed:
+        # another shard's part failed; what this one booked was rolled back
+        results = [("skipped", None) if r[0] == "created" else r for r in results]
+    return results
+
+
+# =========================
+# APPOINTMENT (OWNER / ADMIN)
+# =========================
+@bp.post("/appointments")
+@role_required("pet_owner", "admin")
+def create_appointment():
+    data = request.json or {}
+    booking = dict(data, owner_id=current_user_id() if current_role() == "pet_owner" else data.get("owner_id"))
+
+    try:
+        # One statement checks ownership and the vet/clinic pairing and inserts
+        outcome, appointment_id = book_on_shards([booking])[0]
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Create appointment error: {str(e)}")
+        return jsonify({"message": f"Failed to create appointment: {str(e)}"}), 500
+
+    if outcome != "created":
+        status, message = BOOKING_ERRORS[outcome]
+        return jsonify({"message": message}), status
+    return jsonify({"message": "Appointment created", "appointment_id": appointment_id}), 201
+
+
+@bp.post("/appointments/batch")
+@role_required("pet_owner", "admin")
+def create_appointments_batch():
+    data = request.json or {}
+    bookings = data.get("appointments")
+    if not isinstance(bookings, list) or not bookings:
+        return jsonify({"message": "appointments must be a non-empty list"}), 400
+    if len(bookings) > current_app.config["BOOKING_BATCH_MAX"]:
+        return jsonify({"message": f"At most {current_app.config['BOOKING_BATCH_MAX']} appointments per batch"}), 400
+    atomic = bool(data.get("atomic", False))
+    if current_role() == "pet_owner":
+        # owners book for their own pets only
+        user_id = current_user_id()
+        bookings = [dict(b, owner_id=user_id) if isinstance(b, dict) else b for b in bookings]
+
+    try:
+        outcomes = book_on_shards(bookings, atomic=atomic)
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Create appointments batch error: {str(e)}")
+        return jsonify({"message": f"Failed to create appointments: {str(e)}"}), 500
+
+    results = []
+    for index, (outcome, appointment_id) in enumerate(outcomes):
+        result = {"index": index, "status": outcome}
+        if outcome == "created":
+            result["appointment_id"] = appointment_id
+        else:
+            result["message"] = BOOKING_ERRORS[outcome][1]
+        results.append(result)
+    created = sum(1 for r in results if r["status"] == "created")
+    return jsonify({"created": created, "results": results}), 201 if created == len(results) else 200
+
+
+@bp.get("/appointments")
+@jwt_required()
+def get_appointments():
+    user_id = current_user_id()
+    role = current_role()
+    try:
+        # ?fields= trims both the column list and the joins (e.g. no "user" joins without names)
+        fields = projection.APPOINTMENTS.parse(request.args.get("fields"))
+        period, period_params = date_range_params()
+    except (projection.FieldSelectionError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+
+    def listing(cur):
+        if role == "admin":
+            # Admin sees all appointments
+            conditions, params, required = [], [], ()
+        elif role == "veterinarian":
+            # Vet sees appointments assigned to them (veterinarian_id cached per token)
+            vet_id = token_cache.veterinarian_id(cur)
+            if vet_id is None:
+                return None
+            conditions, params, required = ["a.veterinarian_id = %s"], [vet_id], ()
+        else:
+            # Pet owner sees appointments for their pets
+            conditions, params, required = ["po.user_id = %s"], [user_id], ("po",)
+
+        return query_result(
+            cur,
+            projection.APPOINTMENTS.build(fields, queries.where(conditions + period), required=required),
+            tuple(params + period_params) or None
+        )
+
+    try:
+        # every shard holds some clinics' appointments
+        results = shards.fan_out(listing, cursor_factory=TupleCursor)
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Get appointments error: {str(e)}")
+        return jsonify({"message": f"Failed to get appointments: {str(e)}"}), 500
+
+    if None in results:
+        return jsonify([])
+    return merged_response(results)
+
+
+APPOINTMENT_TREATMENTS_SQL = """
+    SELECT record_id, date, diagnosis, note
+    FROM treatment_record
+    WHERE appointment_id = %s
+    ORDER BY date, record_id
+"""
+
+# every detail field plus what detail_cache needs to filter and invalidate the row
+APPOINTMENT_DETAIL_SQL = projection.APPOINTMENTS.build(
+    list(projection.APPOINTMENTS.fields),
+    "WHERE a.appointment_id = %s",
+    extra={
+        "pet_id": ("a.pet_id", ()),
+        "clinic_id": ("a.clinic_id", ()),
+        "owner_user_id": ("po.user_id", ("po",)),
+    }
+)
+
+
+def appointment_treatments(cur, appointment_id):
+    prepared.execute(cur, APPOINTMENT_TREATMENTS_SQL, (appointment_id,))
+    return [dict(row) for row in cur.fetchall()]
+
+
+def load_appointment_detail(appointment_id, with_treatments):
+    """
+    Uncached detail_cache entry for the appointment, or None when it does not exist. The
+    row and the treatment records come from its home shard side by side; ids copied in
+    before sharding are looked up on the other shards, treatment records included, so a
+    cached entry without them is always on its home shard.
+    """
+    def detail(cur):
+        prepared.execute(cur, APPOINTMENT_DETAIL_SQL, (appointment_id,))
+        rows = cur.fetchall()
+        return detail_cache.entry_from_rows(rows, projection.APPOINTMENTS.fields) if rows else None
+
+    def detail_with_treatments(cur):
+        entry = detail(cur)
+        return entry and dict(entry, treatments=appointment_treatments(cur, appointment_id))
+
+    home = shards.for_id(appointment_id)
+    if with_treatments:
+        entry, records = parallel.gather(
+            partial(shards.run_on, home, detail),
+            partial(shards.run_on, home, partial(appointment_treatments, appointment_id=appointment_id))
+        )
+        if entry:
+            return dict(entry, treatments=records)
+    else:
+        entry = shards.run_on(home, detail)
+        if entry:
+            return entry
+    return shards.find(detail_with_treatments, home) if shards.enabled() else None
+
+
+@bp.get("/appointments/<int:appointment_id>")
+@jwt_required()
+def get_appointment_detail(appointment_id):
+    role = current_role()
+    user_id = current_user_id()
+    try:
+        fields = projection.APPOINTMENTS.parse(request.args.get("fields"))
+    except projection.FieldSelectionError as e:
+        return jsonify({"message": str(e)}), 400
+    # ?include=treatments adds the appointment's treatment records (vet/admin)
+    with_treatments = "treatments" in request.args.get("include", "").split(",")
+    if with_treatments and role not in ("veterinarian", "admin"):
+        return jsonify({"message": "Forbidden"}), 403
+
+    # the cached row is unfiltered; the role check below replaces the per-role WHERE clauses
+    try:
+        generation = detail_cache.cache.generation()
+        entry = detail_cache.cache.get(appointment_id)
+        if entry is None:
+            entry = detail_cache.load(appointment_id, partial(load_appointment_detail, appointment_id, with_treatments))
+            if entry:
+                detail_cache.cache.put(appointment_id, entry, generation)
+        if entry and with_treatments and entry["treatments"] is None:
+            records = shards.run_on(
+                shards.for_id(appointment_id), partial(appointment_treatments, appointment_id=appointment_id)
+            )
+            entry = dict(entry, treatments=records)
+            detail_cache.cache.set_treatments(appointment_id, records, generation)
+
+        vet_id = None
+        if entry and role == "veterinarian":
+            # from the token's claims, or one lookup on the central database
+            state = token_cache.current_state()
+            vet_id = state.resolve("veterinarian_id", lambda: shards.run_on(None, token_cache.veterinarian_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Get appointment detail error: {str(e)}")
+        return jsonify({"message": f"Failed to get appointment: {str(e)}"}), 500
+
+    if not entry or not detail_cache.visible(entry, role, user_id, vet_id):
+        return jsonify({"message": "Not found"}), 404
+    record = {name: entry["row"][name] for name in fields}
+    if with_treatments:
+        record["treatments"] = entry["treatments"]
+    return jsonify(record)
+
+
+@bp.put("/appointments/<int:appointment_id>/status")
+@role_required("veterinarian", "admin")
+def update_status(appointment_id):
+    data = request.json
+    role = current_role()
+
+    def update(cur):
+        if role == "veterinarian":
+            # ownership is part of the UPDATE predicate; no separate check
+            cur.execute("""
+                UPDATE appointment
+                SET status=%s
+                WHERE appointment_id=%s AND veterinarian_id=%s
+            """, (data["status"], appointment_id, token_cache.veterinarian_id(cur)))
+        else:
+            cur.execute("""
+                UPDATE appointment
+                SET status=%s
+                WHERE appointment_id=%s
+            """, (data["status"], appointment_id))
+        updated = cur.rowcount > 0
+        if updated:
+            detail_cache.publish(cur, "update", appointment_id, status=data["status"])
+            if data["status"] == "completed":
+                detail_cache.publish(cur, "invalidate_treatments", appointment_id)
+        return updated
+
+    try:
+        updated = shards.find(update, shards.for_id(appointment_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Update status error: {str(e)}")
+        return jsonify({"message": f"Failed to update status: {str(e)}"}), 500
+
+    if not updated and role == "veterinarian":
+        return jsonify({"message": "You can only update your own appointments"}), 403
+    if updated:
+        detail_cache.update(appointment_id, status=data["status"])
+        if data["status"] == "completed":
+            # the MySQL schema's trg_create_treatment_record adds a record on completion
+            detail_cache.invalidate_treatments(appointment_id)
+    return jsonify({"message": "Status updated"})
+
+
+@bp.put("/appointments/<int:appointment_id>")
+@role_required("veterinarian", "admin")
+def update_appointment(appointment_id):
+    data = request.json
+    role = current_role()
+    allowed = ["datetime", "status", "pet_id", "clinic_id", "veterinarian_id"]
+    fields = []
+    values = []
+    for k in allowed:
+        if k in data:
+            fields.append(f"{k}=%s")
+            values.append(data[k])
+    if not fields:
+        return jsonify({"message": "No fields to update"}), 400
+
+    def update(cur):
+        current_row = own_clinic = None
+        # If clinic or veterinarian is changing, validate the pairing via mapping
+        if "clinic_id" in data or "veterinarian_id" in data:
+            # Fetch current values to fill missing pieces
+            cur.execute(
+                "SELECT clinic_id, veterinarian_id FROM appointment WHERE appointment_id=%s",
+                (appointment_id,)
+            )
+            current_row = cur.fetchone()
+            if not current_row:
+                return None
+
+            target_clinic = data.get("clinic_id", current_row['clinic_id'])
+            target_vet = data.get("veterinarian_id", current_row['veterinarian_id'])
+            if shards.for_clinic(target_clinic) != shards.for_clinic(current_row['clinic_id']):
+                return 409, "Moving an appointment to a clinic on another shard is not supported; book a new one"
+            if role == "veterinarian" and str(target_vet) == str(token_cache.veterinarian_id(cur)):
+                # checked by the UPDATE against veterinarian_clinic as it is now; the token's
+                # clinic_ids claim may predate a change of assignments
+                own_clinic = target_clinic
+            else:
+                is_valid, err = ensure_vet_and_clinic(cur, target_vet, target_clinic)
+                if not is_valid:
+                    return 400, err
+
+        if role == "veterinarian":
+            # Restrict veterinarians to their own appointments, checked by the UPDATE itself
+            vet_id = token_cache.veterinarian_id(cur)
+            assigned, params = "", tuple(values) + (appointment_id, vet_id)
+            if own_clinic is not None:
+                assigned = (" AND EXISTS (SELECT 1 FROM veterinarian_clinic vc"
+                            " WHERE vc.veterinarian_id=%s AND vc.clinic_id=%s)")
+                params += (vet_id, own_clinic)
+            cur.execute(
+                f"UPDATE appointment SET {', '.join(fields)} WHERE appointment_id=%s AND veterinarian_id=%s{assigned}",
+                params
+            )
+            if not cur.rowcount and own_clinic is not None and str(current_row["veterinarian_id"]) == str(vet_id):
+                # their appointment, so the assignment check is what failed
+                return 400, BOOKING_ERRORS["vet_not_in_clinic"][1]
+        else:
+            cur.execute(f"UPDATE appointment SET {', '.join(fields)} WHERE appointment_id=%s",
+                        tuple(values) + (appointment_id,))
+        if not cur.rowcount:
+            return None
+        detail_cache.publish(cur, "invalidate", appointment_id)
+        return 200, "Appointment updated"
+
+    try:
+        result = shards.find(update, shards.for_id(appointment_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Update appointment error: {str(e)}")
+        return jsonify({"message": f"Failed to update appointment: {str(e)}"}), 500
+
+    if result is None:
+        if role == "veterinarian":
+            return jsonify({"message": "You can only update your own appointments"}), 403
+        return jsonify({"message": "Appointment not found"}), 404
+    status, message = result
+    if status == 200:
+        detail_cache.invalidate(appointment_id)
+    return jsonify({"message": message}), status
@@ -0,0 +1,318 @@
+"""Registration, login, the caller's profile and the admin user directory."""
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import create_access_token, jwt_required
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import admission
+import budgets
+import detail_cache
+import prepared
+import ratelimit
+import roles
+import shared_cache
+import token_cache
+from db import PoolTimeout, TupleCursor, dialect, pool_stats
+from json_provider import rows_response
+from routes.common import VET_CLINIC_LINK_SQL, get_connection, role_required, search_params
+
+bp = Blueprint("auth", __name__)
+
+
+# =========================
+# AUTH
+# =========================
+@bp.post("/register")
+def register():
+    data = request.json
+    hashed_pw = generate_password_hash(data["password"])
+    role_name = data.get("role", "pet_owner")
+
+    # normalize common role aliases to DB enum values
+    role_map = {
+        "owner": "pet_owner",
+        "pet_owner": "pet_owner",
+        "vet": "veterinarian",
+        "veterinarian": "veterinarian",
+        "admin": "admin"
+    }
+    role_name = role_map.get(role_name, role_name)
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # insert user (let DB set created_at via DEFAULT CURRENT_TIMESTAMP)
+                user_id = dialect.insert_returning(cur, """
+                    INSERT INTO "user"
+                    (first_name, last_name, email, password_hash, phone_no)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (
+                    data["first_name"],
+                    data["last_name"],
+                    data["email"],
+                    hashed_pw,
+                    data.get("phone_no")
+                ), "user_id")
+
+                # role ids come from the cached role directory
+                role_id = roles.role_id(role_name, cur)
+
+                if not role_id:
+                    return jsonify({"message": f"Invalid role: {role_name}"}), 400
+
+                # link user_role
+                cur.execute("""
+                    INSERT INTO user_role (user_id, role_id)
+                    VALUES (%s, %s)
+                """, (user_id, role_id))
+
+                # If registering as veterinarian, ensure clinic mapping + license uniqueness
+                if role_name == "veterinarian":
+                    license_no = data.get("license_no")
+                    clinic_id = data.get("clinic_id")
+
+                    if not license_no or not clinic_id:
+                        return jsonify({"message": "license_no and clinic_id are required for veterinarians"}), 400
+
+                    # Clinic must exist
+                    cur.execute("SELECT clinic_id FROM clinic WHERE clinic_id=%s", (clinic_id,))
+                    clinic = cur.fetchone()
+                    if not clinic:
+                        return jsonify({"message": "Clinic not found"}), 404
+
+                    # Check license uniqueness; clinic linkage is handled via mapping table
+                    cur.execute(
+                        "SELECT veterinarian_id, user_id FROM veterinarian WHERE license_no=%s",
+                        (license_no,)
+                    )
+                    existing_vet = cur.fetchone()
+
+                    if existing_vet:
+                        if existing_vet[1]:  # user_id
+                            return jsonify({"message": "This license is already registered to another user."}), 400
+                        vet_id = existing_vet[0]
+                        cur.execute(
+                            "UPDATE veterinarian SET user_id=%s WHERE veterinarian_id=%s",
+                            (user_id, vet_id)
+                        )
+                    else:
+                        # create new veterinarian record bound to clinic
+                        vet_id = dialect.insert_returning(
+                            cur,
+                            "INSERT INTO veterinarian (license_no, user_id) VALUES (%s, %s)",
+                            (license_no, user_id),
+                            "veterinarian_id"
+                        )
+
+                    # Map veterinarian to clinic via junction table (avoid duplicates)
+                    cur.execute(
+                        VET_CLINIC_LINK_SQL,
+                        (existing_vet[0] if existing_vet else vet_id, clinic_id)
+                    )
+                    if existing_vet:
+                        detail_cache.publish(cur, "invalidate_where", "veterinarian_id", existing_vet[0])
+
+                conn.commit()
+                if role_name == "veterinarian" and existing_vet:
+                    # the license's appointments now show the vet's name
+                    detail_cache.invalidate_where("veterinarian_id", existing_vet[0])
+    except Exception as e:
+        conn.rollback()
+        print(f"Register error: {str(e)}")
+        return jsonify({"message": f"Registration failed: {str(e)}"}), 500
+
+    return jsonify({"message": "User registered successfully"}), 201
+
+
+@bp.post("/login")
+def login():
+    try:
+        data = request.json
+        
+        if not data.get("email") or not data.get("password"):
+            return jsonify({"message": "Email and password required"}), 400
+
+        # Throttle per IP and per email before any lookup or hash check
+        allowed, retry_after = ratelimit.login_allowed(data["email"])
+        if not allowed:
+            response = jsonify({"message": "Too many login attempts, try again later"})
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+
+        conn = get_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    # role name is resolved from the cached role directory, not a join on role
+                    cur.execute("""
+                        SELECT u.user_id, u.password_hash, ur.role_id, u.first_name, u.last_name
+                        FROM "user" u
+                        JOIN user_role ur ON u.user_id = ur.user_id
+                        WHERE u.email=%s
+                        LIMIT 1
+                    """, (data["email"],))
+                    user = cur.fetchone()
+                    role = roles.role_name(user["role_id"], cur) if user else None
+        finally:
+            conn.close()
+
+        if not user:
+            return jsonify({"message": "User not found"}), 401
+        
+        if not check_password_hash(user["password_hash"], data["password"]):
+            return jsonify({"message": "Invalid password"}), 401
+
+        # Extract user data - handle both tuple and dict responses
+        user_id = user[0]
+        first_name = user[3]
+        last_name = user[4]
+
+        additional_claims = {"role": role}
+        if role == "veterinarian":
+            # veterinarian_id / clinic_ids ride in the token so ownership checks need no join
+            conn = get_connection()
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        additional_claims.update(token_cache.vet_claims(cur, user_id))
+            finally:
+                conn.close()
+
+        ratelimit.login_succeeded(data["email"])
+
+        # JWT subject ('sub') must be a string for jwt library; cast id to str
+        token = create_access_token(
+            identity=str(user_id),
+            additional_claims=additional_claims
+        )
+
+        return jsonify({
+            "access_token": token,
+            "role": role,
+            "user_id": user_id,
+            "first_name": first_name,
+            "last_name": last_name
+        }), 200
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Login error: {str(e)}")
+        return jsonify({"message": f"Server error: {str(e)}"}), 500
+
+
+@bp.post("/admin/roles/refresh")
+@role_required("admin")
+def refresh_roles():
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                loaded = roles.load_roles(cur)
+                roles.publish(cur)
+                return jsonify({
+                    "message": "Roles reloaded",
+                    "roles": dict(loaded),
+                    # False: only this worker reloaded (see CACHE_NOTIFY)
+                    "workers_notified": shared_cache.broadcaster.enabled,
+                })
+    except Exception as e:
+        print(f"Refresh roles error: {str(e)}")
+        return jsonify({"message": f"Failed to reload roles: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.get("/metrics")
+@role_required("admin")
+def metrics():
+    """Admission, pool and cache counters of this process (not gated, so it answers under overload)."""
+    return jsonify({
+        "admission": admission.stats(),
+        "budgets": budgets.stats(),
+        "pool": pool_stats(),
+        "token_cache": token_cache.cache.stats(),
+        "detail_cache": detail_cache.cache.stats(),
+        "shared_cache": shared_cache.stats(),
+        "prepared": prepared.stats(),
+    })
+
+
+@bp.get("/profile")
+@jwt_required()
+def profile():
+    return jsonify(token_cache.current_state().claims)
+
+
+# =========================
+# USERS (ADMIN)
+# =========================
+@bp.get("/users")
+@role_required("admin")
+def get_users():
+    search = search_params()
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                if search:
+                    # Full name, email or veterinarian license; each branch hits its own trigram index
+                    cur.execute("""
+                        WITH hits AS (
+                            SELECT user_id,
+                                   word_similarity(%(q)s, first_name || ' ' || last_name)
+                                   + ((first_name || ' ' || last_name) ILIKE %(prefix)s)::int AS score
+                            FROM "user"
+                            WHERE %(q)s <%% (first_name || ' ' || last_name)
+                               OR (first_name || ' ' || last_name) ILIKE %(prefix)s
+                            UNION ALL
+                            SELECT user_id, word_similarity(%(q)s, email) + (email ILIKE %(prefix)s)::int
+                            FROM "user"
+                            WHERE %(q)s <%% email OR email ILIKE %(prefix)s
+                            UNION ALL
+                            SELECT user_id, word_similarity(%(q)s, license_no) + (license_no ILIKE %(prefix)s)::int
+                            FROM veterinarian
+                            WHERE user_id IS NOT NULL
+                              AND (%(q)s <%% license_no OR license_no ILIKE %(prefix)s)
+                        ),
+                        ranked AS (
+                            SELECT user_id, MAX(score) AS score
+                            FROM hits
+                            GROUP BY user_id
+                            ORDER BY score DESC, user_id
+                            LIMIT %(limit)s
+                        )
+                        SELECT u.user_id, u.first_name, u.last_name, u.email
+                        FROM ranked r
+                        JOIN "user" u ON u.user_id = r.user_id
+                        ORDER BY r.score DESC, u.user_id
+                    """, search)
+                else:
+                    cur.execute("SELECT user_id, first_name, last_name, email FROM \"user\"")
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get users error: {str(e)}")
+        return jsonify({"message": f"Failed to get users: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.get("/users/<int:user_id>")
+@role_required("admin")
+def get_user(user_id):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT user_id, first_name, last_name, email, phone_no, created_at FROM \"user\" WHERE user_id=%s",
+                    (user_id,)
+                )
+                user = cur.fetchone()
+                if not user:
+                    return jsonify({"message": "Not found"}), 404
+                return jsonify(dict(user) if hasattr(user, 'keys') else user)
+    except Exception as e:
+        print(f"Get user error: {str(e)}")
+        return jsonify({"message": f"Failed to get user: {str(e)}"}), 500
+    finally:
+        conn.close()
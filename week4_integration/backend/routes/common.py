@@ -0,0 +1,147 @@
+"""
+Helpers shared by the blueprints: pooled connections, the role decorator and the
+query-string parsers for typeahead search and date ranges.
+"""
+from datetime import datetime
+from functools import wraps
+
+from flask import abort, jsonify, make_response, request
+from flask_jwt_extended import verify_jwt_in_request
+
+import budgets
+import token_cache
+from db import dialect, get_connection as _get_connection, release_connection
+
+
+# =========================
+# CONNECTION WRAPPER
+# =========================
+class ConnectionWrapper:
+    """Wrapper class that proxies all connection methods but overrides close()"""
+    def __init__(self, conn, shard=None):
+        self._conn = conn
+        self._shard = shard
+        self._closed = False
+    
+    def close(self):
+        """Return connection to pool instead of closing it"""
+        if not self._closed:
+            release_connection(self._conn, shard=self._shard)
+            self._closed = True
+    
+    def __getattr__(self, name):
+        """Proxy all other methods to the real connection"""
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        """Cursor whose transactions run under the request's time budget (budgets.py)."""
+        return budgets.wrap_cursor(self._conn, self._conn.cursor(*args, **kwargs))
+
+    def __enter__(self):
+        """Allow `with conn:` to return the wrapper itself."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Commit/rollback then return the connection to the pool."""
+        try:
+            if exc_type:
+                self._conn.rollback()
+            else:
+                self._conn.commit()
+        finally:
+            self.close()
+        # propagate exceptions (don't suppress)
+        return False
+
+def get_connection(shard=None):
+    """
+    Get connection from pool and wrap it to ensure proper cleanup.
+    When conn.close() is called, connection is returned to pool.
+    `shard` picks a shard database (shards.py) instead of the central one.
+    """
+    conn = _get_connection(shard=shard)
+    return ConnectionWrapper(conn, shard)
+
+
+# =========================
+# ROLE DECORATOR
+# =========================
+def role_required(*roles):
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+
+            if token_cache.current_state().role not in roles:
+                return jsonify({"message": "Forbidden"}), 403
+
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+
+def current_user_id():
+    """Return JWT subject as int when possible, otherwise raw value."""
+    return token_cache.current_state().user_id
+
+
+def current_role():
+    return token_cache.current_state().role
+
+
+# Map veterinarian to clinic via junction table (avoid duplicates)
+VET_CLINIC_LINK_SQL = dialect.insert_ignore(
+    "veterinarian_clinic", ("veterinarian_id", "clinic_id"), ("veterinarian_id", "clinic_id")
+)
+
+# =========================
+# TYPEAHEAD SEARCH
+# =========================
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def search_params():
+    """
+    Read ?q= and ?limit= for typeahead search.
+    Returns None when no search term was given so callers can keep their full listing,
+    otherwise a dict of named query parameters: q (raw term), prefix (escaped 'term%'
+    for ILIKE) and limit.
+    """
+    q = (request.args.get("q") or "").strip()
+    try:
+        limit = int(request.args.get("limit", SEARCH_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    if not q:
+        return None
+    if dialect.name != "postgres":
+        # ranking relies on pg_trgm (migrations/001_trgm_search.sql)
+        abort(make_response(jsonify({"message": "Search requires the PostgreSQL backend"}), 400))
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return {"q": q, "prefix": escaped + "%", "limit": limit}
+
+
+# =========================
+# DATE RANGE FILTER
+# =========================
+def date_range_params(column="a.datetime"):
+    """
+    Read ?from= and ?to= (ISO dates or datetimes, half-open [from, to)) as conditions on
+    `column`. Comparing the bare partition column lets Postgres prune appointment partitions.
+    Returns (conditions, params), both empty without a filter; raises ValueError on bad input.
+    """
+    conditions, params = [], []
+    for arg, op in (("from", ">="), ("to", "<")):
+        raw = (request.args.get(arg) or "").strip()
+        if not raw:
+            continue
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            raise ValueError(f"Invalid '{arg}' date: {raw}")
+        conditions.append(f"{column} {op} %s")
+        params.append(value)
+    return conditions, params
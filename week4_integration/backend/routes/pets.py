@@ -0,0 +1,316 @@
+"""Pets and their owners."""
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import detail_cache
+import projection
+import shards
+import token_cache
+from db import TupleCursor, dialect
+from json_provider import query_response, rows_response
+from routes.common import current_role, current_user_id, get_connection, role_required, search_params
+
+bp = Blueprint("pets", __name__)
+
+# ownership as a predicate of the statement itself: the token's cached pet ids can lag a
+# change made through another worker
+OWNED = " AND EXISTS (SELECT 1 FROM pet_owner po WHERE po.pet_id = pet.pet_id AND po.user_id = %s)"
+
+
+# =========================
+# PET (OWNER / ADMIN)
+# =========================
+@bp.post("/pets")
+@role_required("pet_owner", "admin")
+def create_pet():
+    data = request.json
+    user_id = current_user_id()
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # Insert pet
+                pet_id = dialect.insert_returning(cur, """
+                    INSERT INTO pet
+                    (name, species, breed, gender, birth_date, age)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    data["name"],
+                    data["species"],
+                    data["breed"],
+                    data["gender"],
+                    data["birth_date"],
+                    data["age"]
+                ), "pet_id")
+
+                # Auto-create pet_owner record linking user to pet
+                cur.execute("""
+                    INSERT INTO pet_owner (address, user_id, pet_id)
+                    VALUES (%s, %s, %s)
+                """, (data.get("address", ""), user_id, pet_id))
+                token_cache.publish(cur, "invalidate_user", user_id)
+
+                conn.commit()
+                token_cache.invalidate_user(user_id)
+    except Exception as e:
+        conn.rollback()
+        print(f"Create pet error: {str(e)}")
+        return jsonify({"message": f"Failed to create pet: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Pet created", "pet_id": pet_id}), 201
+
+
+@bp.get("/pets")
+@role_required("pet_owner", "admin")
+def get_pets():
+    user_id = current_user_id()
+    role = current_role()
+    search = search_params()
+    try:
+        fields = projection.PETS.parse(request.args.get("fields"))
+    except projection.FieldSelectionError as e:
+        return jsonify({"message": str(e)}), 400
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                if search and role == "admin":
+                    # Typeahead: prefix matches first, then closest trigram matches
+                    cur.execute(projection.PETS.build(fields, """
+                        WHERE %(q)s <%% p.name OR p.name ILIKE %(prefix)s
+                        ORDER BY p.name ILIKE %(prefix)s DESC, word_similarity(%(q)s, p.name) DESC, p.pet_id
+                        LIMIT %(limit)s
+                    """), search)
+                elif search:
+                    cur.execute(projection.PETS.build(fields, """
+                        WHERE po.user_id = %(user_id)s
+                          AND (%(q)s <%% p.name OR p.name ILIKE %(prefix)s)
+                        ORDER BY p.name ILIKE %(prefix)s DESC, word_similarity(%(q)s, p.name) DESC, p.pet_id
+                        LIMIT %(limit)s
+                    """, required=("po",)), dict(search, user_id=user_id))
+                elif role == "admin":
+                    # Admin can see all pets
+                    cur.execute(projection.PETS.build(fields))
+                else:
+                    # Pet owner sees only their pets
+                    cur.execute(
+                        projection.PETS.build(fields, "WHERE po.user_id = %s", required=("po",)),
+                        (user_id,)
+                    )
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get pets error: {str(e)}")
+        return jsonify({"message": f"Failed to get pets: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+# additional endpoints expected by frontend
+@bp.get("/pets/<int:pet_id>")
+@jwt_required()
+def get_pet(pet_id):
+    role = current_role()
+    user_id = current_user_id()
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                if role == "admin":
+                    cur.execute("SELECT * FROM pet WHERE pet_id=%s", (pet_id,))
+                else:
+                    # Pet owners may only see their own pets; vets are blocked here for privacy
+                    cur.execute("SELECT * FROM pet WHERE pet_id=%s" + OWNED, (pet_id, user_id))
+                pet = cur.fetchone()
+                if not pet:
+                    return jsonify({"message": "Not found"}), 404
+                return jsonify(dict(pet) if hasattr(pet, 'keys') else pet)
+    except Exception as e:
+        print(f"Get pet error: {str(e)}")
+        return jsonify({"message": f"Failed to get pet: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.put("/pets/<int:pet_id>")
+@role_required("pet_owner", "admin")
+def update_pet(pet_id):
+    data = request.json
+    role = current_role()
+    user_id = current_user_id()
+
+    allowed = ["name", "species", "breed", "gender", "birth_date", "age"]
+    fields = []
+    values = []
+    for k in allowed:
+        if k in data:
+            fields.append(f"{k}=%s")
+            values.append(data[k])
+    if not fields:
+        return jsonify({"message": "No fields to update"}), 400
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                values.append(pet_id)
+                sql = f"UPDATE pet SET {', '.join(fields)} WHERE pet_id=%s"
+                if role == "pet_owner":
+                    sql += OWNED
+                    values.append(user_id)
+                cur.execute(sql, tuple(values))
+                if role == "pet_owner" and cur.rowcount == 0:
+                    return jsonify({"message": "You can only update your own pets"}), 403
+                if "name" in data:
+                    # the appointment detail shows the pet's name
+                    detail_cache.publish(cur, "invalidate_where", "pet_id", pet_id)
+                conn.commit()
+                if "name" in data:
+                    detail_cache.invalidate_where("pet_id", pet_id)
+    except Exception as e:
+        conn.rollback()
+        print(f"Update pet error: {str(e)}")
+        return jsonify({"message": f"Failed to update pet: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Pet updated"})
+
+
+@bp.delete("/pets/<int:pet_id>")
+@role_required("pet_owner", "admin")
+def delete_pet(pet_id):
+    role = current_role()
+    user_id = current_user_id()
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                # the owners' cached pet ids lose this pet (pet_owner rows go with it)
+                cur.execute("SELECT user_id FROM pet_owner WHERE pet_id=%s", (pet_id,))
+                owners = sorted({row[0] for row in cur.fetchall()})
+                if role == "pet_owner":
+                    cur.execute("DELETE FROM pet WHERE pet_id=%s" + OWNED, (pet_id, user_id))
+                    if cur.rowcount == 0:
+                        return jsonify({"message": "You can only delete your own pets"}), 403
+                else:
+                    cur.execute("DELETE FROM pet WHERE pet_id=%s", (pet_id,))
+                for owner in owners:
+                    token_cache.publish(cur, "invalidate_user", owner)
+                detail_cache.publish(cur, "invalidate_where", "pet_id", pet_id)
+                conn.commit()
+                for owner in owners:
+                    token_cache.invalidate_user(owner)
+                detail_cache.invalidate_where("pet_id", pet_id)
+    except Exception as e:
+        conn.rollback()
+        print(f"Delete pet error: {str(e)}")
+        return jsonify({"message": f"Failed to delete pet: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    if shards.enabled():
+        # the ON DELETE CASCADE to appointment does not reach the shards
+        try:
+            shards.fan_out(lambda cur: cur.execute("DELETE FROM appointment WHERE pet_id=%s", (pet_id,)))
+        except Exception as e:
+            print(f"Delete pet appointments error: {str(e)}")
+            return jsonify({"message": f"Pet deleted, but removing its appointments failed: {str(e)}"}), 500
+
+    return jsonify({"message": "Pet deleted"})
+
+
+# =========================
+# OWNERS
+# =========================
+@bp.get("/owners")
+@role_required("admin")
+def get_owners():
+    search = search_params()
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                if search:
+                    # Owner name, owner email or pet name; each branch hits its own trigram index
+                    cur.execute("""
+                        WITH hits AS (
+                            SELECT o.owner_id,
+                                   word_similarity(%(q)s, u.first_name || ' ' || u.last_name)
+                                   + ((u.first_name || ' ' || u.last_name) ILIKE %(prefix)s)::int AS score
+                            FROM "user" u
+                            JOIN pet_owner o ON o.user_id = u.user_id
+                            WHERE %(q)s <%% (u.first_name || ' ' || u.last_name)
+                               OR (u.first_name || ' ' || u.last_name) ILIKE %(prefix)s
+                            UNION ALL
+                            SELECT o.owner_id,
+                                   word_similarity(%(q)s, u.email) + (u.email ILIKE %(prefix)s)::int
+                            FROM "user" u
+                            JOIN pet_owner o ON o.user_id = u.user_id
+                            WHERE %(q)s <%% u.email OR u.email ILIKE %(prefix)s
+                            UNION ALL
+                            SELECT o.owner_id,
+                                   word_similarity(%(q)s, p.name) + (p.name ILIKE %(prefix)s)::int
+                            FROM pet p
+                            JOIN pet_owner o ON o.pet_id = p.pet_id
+                            WHERE %(q)s <%% p.name OR p.name ILIKE %(prefix)s
+                        ),
+                        ranked AS (
+                            SELECT owner_id, MAX(score) AS score
+                            FROM hits
+                            GROUP BY owner_id
+                            ORDER BY score DESC, owner_id
+                            LIMIT %(limit)s
+                        )
+                        SELECT o.owner_id, o.address, o.user_id, o.pet_id, u.first_name, u.last_name, p.name AS pet_name
+                        FROM ranked r
+                        JOIN pet_owner o ON o.owner_id = r.owner_id
+                        JOIN "user" u ON o.user_id = u.user_id
+                        JOIN pet p ON o.pet_id = p.pet_id
+                        ORDER BY r.score DESC, o.owner_id
+                    """, search)
+                    return rows_response(cur)
+                return query_response(cur, """
+                    SELECT o.owner_id, o.address, o.user_id, o.pet_id, u.first_name, u.last_name, p.name AS pet_name 
+                    FROM pet_owner o 
+                    JOIN "user" u ON o.user_id = u.user_id 
+                    JOIN pet p ON o.pet_id = p.pet_id
+                """)
+    except Exception as e:
+        print(f"Get owners error: {str(e)}")
+        return jsonify({"message": f"Failed to get owners: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.post("/owners")
+@role_required("pet_owner", "admin")
+def create_owner():
+    data = request.json
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO pet_owner (address, user_id, pet_id) VALUES (%s, %s, %s)",
+                    (data.get("address"), data.get("user_id"), data.get("pet_id"))
+                )
+                # a new owner may see, and is named on, the pet's appointments
+                token_cache.publish(cur, "invalidate_user", data.get("user_id"))
+                detail_cache.publish(cur, "invalidate_where", "pet_id", data.get("pet_id"))
+                conn.commit()
+                token_cache.invalidate_user(data.get("user_id"))
+                detail_cache.invalidate_where("pet_id", data.get("pet_id"))
+    except Exception as e:
+        conn.rollback()
+        print(f"Create owner error: {str(e)}")
+        return jsonify({"message": f"Failed to create owner: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Owner record created"}), 201
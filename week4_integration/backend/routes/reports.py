@@ -0,0 +1,240 @@
+"""Admin reports, the dashboard and the streamed CSV export."""
+import csv
+import io
+from functools import partial
+
+from flask import Blueprint, Response, current_app, jsonify
+
+import admission
+import parallel
+import projection
+import queries
+import shards
+from db import PoolTimeout, TupleCursor
+from json_provider import merged_json, merged_response, query_result
+from routes.common import date_range_params, get_connection, role_required
+
+bp = Blueprint("reports", __name__)
+
+
+# =========================
+# REPORTS (ADMIN ONLY)
+# =========================
+def _table_report(template, period, params):
+    """run(cur) for a grouped report: (columns, tuple rows) from one shard."""
+    def report(cur):
+        cur.execute(queries.filtered(template, period), tuple(params) or None)
+        return [col[0] for col in cur.description], cur.fetchall()
+
+    return report
+
+
+def _treatments_report(period, params):
+    def report(cur):
+        return query_result(cur, queries.filtered(queries.REPORT_TREATMENTS_TEMPLATE, period), tuple(params) or None)
+
+    return report
+
+
+def _status_totals(results):
+    """Every shard counts each status; add them up into one (columns, rows) result."""
+    totals = {}
+    for _, rows in results:
+        for status, total in rows:
+            totals[status] = totals.get(status, 0) + total
+    return results[0][0], list(totals.items())
+
+
+@bp.get("/reports/appointments/status")
+@role_required("admin")
+def report_by_status():
+    try:
+        period, params = date_range_params()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    report = _table_report(queries.REPORT_BY_STATUS_TEMPLATE, period, params)
+    try:
+        results = shards.fan_out(report, cursor_factory=TupleCursor)
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Report by status error: {str(e)}")
+        return jsonify({"message": f"Failed to get report: {str(e)}"}), 500
+
+    return merged_response([_status_totals(results)])
+
+
+@bp.get("/reports/appointments/clinic")
+@role_required("admin")
+def report_by_clinic():
+    try:
+        period, params = date_range_params()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    report = _table_report(queries.REPORT_BY_CLINIC_TEMPLATE, period, params)
+    try:
+        # a clinic's appointments are all on one shard, so its row comes from exactly one
+        return merged_response(shards.fan_out(report, cursor_factory=TupleCursor))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Report by clinic error: {str(e)}")
+        return jsonify({"message": f"Failed to get report: {str(e)}"}), 500
+
+
+@bp.get("/reports/treatments")
+@role_required("admin")
+def report_treatments():
+    try:
+        period, params = date_range_params()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    try:
+        return merged_response(shards.fan_out(_treatments_report(period, params), cursor_factory=TupleCursor))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Report treatments error: {str(e)}")
+        return jsonify({"message": f"Failed to get report: {str(e)}"}), 500
+
+
+@bp.get("/reports/summary")
+@role_required("admin")
+def report_summary():
+    """The three reports above in one response, all of their queries running concurrently."""
+    try:
+        period, params = date_range_params()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    reports = [
+        _table_report(queries.REPORT_BY_STATUS_TEMPLATE, period, params),
+        _table_report(queries.REPORT_BY_CLINIC_TEMPLATE, period, params),
+        _treatments_report(period, params),
+    ]
+    try:
+        results = parallel.gather(*[
+            call for report in reports for call in shards.calls(report, cursor_factory=TupleCursor)
+        ])
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Report summary error: {str(e)}")
+        return jsonify({"message": f"Failed to get report: {str(e)}"}), 500
+
+    n = shards.count()
+    by_status, by_clinic, treatments = (results[i * n:(i + 1) * n] for i in range(len(reports)))
+    body = b"".join([
+        b'{"by_status":', merged_json([_status_totals(by_status)]),
+        b',"by_clinic":', merged_json(by_clinic),
+        b',"treatments":', merged_json(treatments), b"}",
+    ])
+    return current_app.response_class(body, mimetype="application/json")
+
+
+DASHBOARD_ROWS = 10
+
+DASHBOARD_UPCOMING_FIELDS = ["appointment_id", "datetime", "status", "pet_name", "clinic_name", "vet_name"]
+
+
+@bp.get("/reports/dashboard")
+@role_required("admin")
+def dashboard():
+    """Global totals, appointments by status, the next appointments and the latest treatments."""
+    def totals(cur):
+        cur.execute(queries.DASHBOARD_TOTALS)
+        return dict(cur.fetchone())
+
+    def upcoming(cur):
+        cur.execute(projection.APPOINTMENTS.build(
+            DASHBOARD_UPCOMING_FIELDS,
+            "WHERE a.datetime >= CURRENT_TIMESTAMP AND a.status = 'scheduled' ORDER BY a.datetime LIMIT %s"
+        ), (DASHBOARD_ROWS,))
+        return [dict(row) for row in cur.fetchall()]
+
+    def recent_treatments(cur):
+        cur.execute(queries.DASHBOARD_RECENT_TREATMENTS, (DASHBOARD_ROWS,))
+        return [dict(row) for row in cur.fetchall()]
+
+    status_report = _table_report(queries.REPORT_BY_STATUS_TEMPLATE, [], [])
+    n = shards.count()
+    try:
+        # totals on the central database; the rest on every shard
+        results = parallel.gather(
+            partial(shards.run_on, None, totals),
+            *shards.calls(status_report, cursor_factory=TupleCursor),
+            *shards.calls(upcoming),
+            *shards.calls(recent_treatments),
+        )
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Dashboard error: {str(e)}")
+        return jsonify({"message": f"Failed to get dashboard: {str(e)}"}), 500
+
+    by_status, next_rows, recent_rows = (results[1 + i * n:1 + (i + 1) * n] for i in range(3))
+    # each shard returned its own first rows; keep the overall first ones
+    next_rows = sorted((row for rows in next_rows for row in rows), key=lambda row: row["datetime"])
+    recent_rows = sorted(
+        (row for rows in recent_rows for row in rows), key=lambda row: (row["date"], row["record_id"]), reverse=True
+    )
+    return jsonify({
+        "totals": results[0],
+        "appointments_by_status": dict(_status_totals(by_status)[1]),
+        "upcoming": next_rows[:DASHBOARD_ROWS],
+        "recent_treatments": recent_rows[:DASHBOARD_ROWS],
+    })
+
+
+EXPORT_BATCH_SIZE = 2000
+
+
+@bp.get("/reports/treatments/export")
+@role_required("admin")
+def export_treatments():
+    """Stream the treatments report as CSV, one chunk per server-side cursor batch."""
+    columns = ["appointment_id", "pet_name", "diagnosis", "vet_name", "license_no"]
+    try:
+        period, params = date_range_params()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        # shard after shard, each through its own server-side cursor
+        for shard in range(shards.count()):
+            conn = get_connection(shard=shard)
+            try:
+                with conn:
+                    with conn.cursor(name="export_treatments") as cur:
+                        cur.itersize = EXPORT_BATCH_SIZE
+                        cur.execute(queries.filtered(queries.REPORT_TREATMENTS_TEMPLATE, period), tuple(params) or None)
+                        while True:
+                            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+                            if not rows:
+                                break
+                            writer.writerows(rows)
+                            yield buf.getvalue()
+                            buf.seek(0)
+                            buf.truncate(0)
+            except Exception as e:
+                # headers are already sent; the truncated body is the only signal left
+                print(f"Export treatments error: {str(e)}")
+                return
+            finally:
+                conn.close()
+        yield buf.getvalue()
+
+    response = Response(
+        generate(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=treatments.csv"}
+    )
+    # the admission slot follows the stream, which outlives this view function
+    response.call_on_close(admission.hold_for_stream())
+    return response
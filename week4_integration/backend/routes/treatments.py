@@ -0,0 +1,224 @@
+"""Treatment records written by veterinarians."""
+from flask import Blueprint, jsonify, request
+
+import detail_cache
+import projection
+import shards
+import token_cache
+from db import PoolTimeout, TupleCursor, dialect
+from json_provider import merged_response, query_result
+from routes.common import current_role, role_required
+
+bp = Blueprint("treatments", __name__)
+
+
+# =========================
+# TREATMENT RECORD (VET)
+# =========================
+@bp.get("/treatments")
+@role_required("veterinarian", "admin")
+def get_treatments():
+    try:
+        fields = projection.TREATMENTS.parse(request.args.get("fields"))
+    except projection.FieldSelectionError as e:
+        return jsonify({"message": str(e)}), 400
+
+    claims_role = current_role()
+
+    def listing(cur):
+        if claims_role == "admin":
+            return query_result(cur, projection.TREATMENTS.build(fields))
+        # Veterinarian sees only treatments tied to their own appointments
+        vet_id = token_cache.veterinarian_id(cur)
+        if vet_id is None:
+            return None
+        return query_result(
+            cur,
+            projection.TREATMENTS.build(fields, "WHERE a.veterinarian_id = %s", required=("a",)),
+            (vet_id,)
+        )
+
+    try:
+        results = shards.fan_out(listing, cursor_factory=TupleCursor)
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Get treatments error: {str(e)}")
+        return jsonify({"message": f"Failed to get treatments: {str(e)}"}), 500
+
+    if None in results:
+        return jsonify([])
+    return merged_response(results)
+
+
+@bp.get("/treatments/<int:record_id>")
+@role_required("veterinarian", "admin")
+def get_treatment(record_id):
+    claims_role = current_role()
+
+    def detail(cur):
+        if claims_role == "admin":
+            cur.execute("""
+                SELECT 
+                    t.record_id,
+                    t.date,
+                    t.diagnosis,
+                    t.note,
+                    t.appointment_id,
+                    p.name AS pet_name,
+                    CONCAT(u.first_name, ' ', u.last_name) AS vet_name,
+                    v.license_no
+                FROM treatment_record t
+                LEFT JOIN appointment a ON t.appointment_id = a.appointment_id
+                LEFT JOIN pet p ON a.pet_id = p.pet_id
+                LEFT JOIN veterinarian v ON a.veterinarian_id = v.veterinarian_id
+                LEFT JOIN "user" u ON v.user_id = u.user_id
+                WHERE t.record_id = %s
+            """, (record_id,))
+        else:
+            cur.execute("""
+                SELECT 
+                    t.record_id,
+                    t.date,
+                    t.diagnosis,
+                    t.note,
+                    t.appointment_id,
+                    p.name AS pet_name,
+                    CONCAT(u.first_name, ' ', u.last_name) AS vet_name,
+                    v.license_no
+                FROM treatment_record t
+                LEFT JOIN appointment a ON t.appointment_id = a.appointment_id
+                LEFT JOIN pet p ON a.pet_id = p.pet_id
+                LEFT JOIN veterinarian v ON a.veterinarian_id = v.veterinarian_id
+                LEFT JOIN "user" u ON v.user_id = u.user_id
+                WHERE t.record_id = %s AND a.veterinarian_id = %s
+            """, (record_id, token_cache.veterinarian_id(cur)))
+
+        row = cur.fetchone()
+        return (dict(row) if hasattr(row, 'keys') else row) if row else None
+
+    try:
+        row = shards.find(detail, shards.for_id(record_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Get treatment error: {str(e)}")
+        return jsonify({"message": f"Failed to get treatment: {str(e)}"}), 500
+
+    if not row:
+        return jsonify({"message": "Not found"}), 404
+    return jsonify(row)
+
+
+@bp.post("/treatments")
+@role_required("veterinarian", "admin")
+def create_treatment():
+    data = request.json
+    appointment_id = data.get("appointment_id")
+    if not appointment_id:
+        return jsonify({"message": "appointment_id is required"}), 400
+
+    role = current_role()
+
+    def create(cur):
+        # the record goes to the shard of its appointment
+        cur.execute(
+            "SELECT 1 FROM treatment_record WHERE appointment_id=%s",
+            (appointment_id,)
+        )
+        if cur.fetchone():
+            return 400, "Treatment record already exists for this appointment", None
+
+        # Insert only if the appointment exists and, for vets, is assigned to them
+        owner_check, owner_params = "", ()
+        if role == "veterinarian":
+            owner_check, owner_params = " AND a.veterinarian_id=%s", (token_cache.veterinarian_id(cur),)
+        record_id = dialect.insert_returning(
+            cur,
+            f"""
+                INSERT INTO treatment_record (date, diagnosis, note, appointment_id)
+                SELECT %s, %s, %s, a.appointment_id
+                FROM appointment a
+                WHERE a.appointment_id=%s{owner_check}
+            """,
+            (
+                data.get("date"),
+                data.get("diagnosis", ""),
+                data.get("note", ""),
+                appointment_id
+            ) + owner_params,
+            "record_id"
+        )
+        if record_id is None:
+            return None
+        detail_cache.publish(cur, "invalidate_treatments", int(appointment_id))
+        return 201, "Treatment created", record_id
+
+    try:
+        result = shards.find(create, shards.for_id(appointment_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Create treatment error: {str(e)}")
+        return jsonify({"message": f"Failed to create treatment: {str(e)}"}), 500
+
+    if result is None:
+        return jsonify({"message": "Appointment not found or not authorized"}), 404
+    status, message, record_id = result
+    if record_id is None:
+        return jsonify({"message": message}), status
+    detail_cache.invalidate_treatments(int(appointment_id))
+    return jsonify({"message": message, "record_id": record_id}), status
+
+
+@bp.put("/treatments/<int:record_id>")
+@role_required("veterinarian", "admin")
+def update_treatment(record_id):
+    data = request.json
+
+    claims_role = current_role()
+
+    def update(cur):
+        if claims_role == "veterinarian":
+            cur.execute("""
+                UPDATE treatment_record t
+                SET diagnosis=%s, note=%s
+                WHERE t.record_id=%s
+                  AND EXISTS (
+                      SELECT 1 FROM appointment a
+                      WHERE a.appointment_id = t.appointment_id AND a.veterinarian_id=%s
+                  )
+            """, (
+                data["diagnosis"],
+                data["note"],
+                record_id,
+                token_cache.veterinarian_id(cur)
+            ))
+        else:
+            cur.execute("""
+                UPDATE treatment_record
+                SET diagnosis=%s, note=%s
+                WHERE record_id=%s
+            """, (
+                data["diagnosis"],
+                data["note"],
+                record_id
+            ))
+        updated = cur.rowcount > 0
+        if updated:
+            detail_cache.publish(cur, "update_treatment", record_id, diagnosis=data["diagnosis"], note=data["note"])
+        return updated
+
+    try:
+        updated = shards.find(update, shards.for_id(record_id))
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Update treatment error: {str(e)}")
+        return jsonify({"message": f"Failed to update treatment: {str(e)}"}), 500
+
+    if not updated and claims_role == "veterinarian":
+        return jsonify({"message": "You can only update your own treatment records"}), 403
+    if updated:
+        detail_cache.update_treatment(record_id, diagnosis=data["diagnosis"], note=data["note"])
+    return jsonify({"message": "Treatment updated"})
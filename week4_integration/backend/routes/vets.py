@@ -0,0 +1,327 @@
+"""Clinics, veterinarians and their schedules."""
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import detail_cache
+import queries
+import token_cache
+from db import PoolTimeout, TupleCursor, dialect
+from json_provider import rows_response
+from routes.common import VET_CLINIC_LINK_SQL, get_connection, role_required, search_params
+
+bp = Blueprint("vets", __name__)
+
+
+# =========================
+# CLINICS
+# =========================
+@bp.get("/clinics")
+def get_clinics():
+    search = search_params()
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                if search:
+                    cur.execute("""
+                        SELECT clinic_id, name, phone_no, address
+                        FROM clinic
+                        WHERE %(q)s <%% name OR name ILIKE %(prefix)s
+                        ORDER BY name ILIKE %(prefix)s DESC, word_similarity(%(q)s, name) DESC, clinic_id
+                        LIMIT %(limit)s
+                    """, search)
+                else:
+                    cur.execute("SELECT clinic_id, name, phone_no, address FROM clinic")
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get clinics error: {str(e)}")
+        return jsonify({"message": f"Failed to get clinics: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.get("/clinics/<int:clinic_id>")
+def get_clinic(clinic_id):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT clinic_id, name, phone_no, address FROM clinic WHERE clinic_id=%s", (clinic_id,))
+                clinic = cur.fetchone()
+                if not clinic:
+                    return jsonify({"message": "Not found"}), 404
+                return jsonify(dict(clinic) if hasattr(clinic, 'keys') else clinic)
+    except Exception as e:
+        print(f"Get clinic error: {str(e)}")
+        return jsonify({"message": f"Failed to get clinic: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.post("/clinics")
+@role_required("admin")
+def create_clinic():
+    data = request.json
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO clinic (name, phone_no, address) VALUES (%s, %s, %s)",
+                    (data.get("name"), data.get("phone_no"), data.get("address"))
+                )
+                conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Create clinic error: {str(e)}")
+        return jsonify({"message": f"Failed to create clinic: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Clinic created"}), 201
+
+
+@bp.put("/clinics/<int:clinic_id>")
+@role_required("admin")
+def update_clinic(clinic_id):
+    data = request.json
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE clinic SET name=%s, phone_no=%s, address=%s WHERE clinic_id=%s",
+                    (data.get("name"), data.get("phone_no"), data.get("address"), clinic_id)
+                )
+                detail_cache.publish(cur, "invalidate_where", "clinic_id", clinic_id)
+                conn.commit()
+                detail_cache.invalidate_where("clinic_id", clinic_id)
+    except Exception as e:
+        conn.rollback()
+        print(f"Update clinic error: {str(e)}")
+        return jsonify({"message": f"Failed to update clinic: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Clinic updated"}), 200
+
+
+# =========================
+# VETERINARIAN (VET ENDPOINTS)
+# =========================
+@bp.get("/veterinarians")
+@jwt_required()
+def get_veterinarians():
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                cur.execute("""
+                    SELECT 
+                        v.veterinarian_id,
+                        v.license_no,
+                        v.user_id,
+                        u.first_name,
+                        u.last_name,
+                        u.email,
+                        u.phone_no
+                    FROM veterinarian v
+                    LEFT JOIN "user" u ON v.user_id = u.user_id
+                """)
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get veterinarians error: {str(e)}")
+        return jsonify({"message": f"Failed to get veterinarians: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.get("/veterinarians/<int:vet_id>")
+@jwt_required()
+def get_veterinarian(vet_id):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 
+                        v.veterinarian_id,
+                        v.license_no,
+                        v.user_id,
+                        u.first_name,
+                        u.last_name,
+                        u.email,
+                        u.phone_no
+                    FROM veterinarian v
+                    LEFT JOIN "user" u ON v.user_id = u.user_id
+                    WHERE v.veterinarian_id = %s
+                """, (vet_id,))
+                vet = cur.fetchone()
+                if not vet:
+                    return jsonify({"message": "Not found"}), 404
+                return jsonify(dict(vet) if hasattr(vet, 'keys') else vet)
+    except Exception as e:
+        print(f"Get veterinarian error: {str(e)}")
+        return jsonify({"message": f"Failed to get veterinarian: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.get("/veterinarians/clinic/<int:clinic_id>")
+@jwt_required()
+def get_veterinarians_by_clinic(clinic_id):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                cur.execute("""
+                    SELECT 
+                        v.veterinarian_id,
+                        v.license_no,
+                        v.user_id,
+                        u.first_name,
+                        u.last_name,
+                        u.email,
+                        u.phone_no
+                    FROM veterinarian v
+                    JOIN veterinarian_clinic vc ON vc.veterinarian_id = v.veterinarian_id
+                    JOIN clinic c ON vc.clinic_id = c.clinic_id
+                    LEFT JOIN "user" u ON v.user_id = u.user_id
+                    WHERE c.clinic_id = %s
+                """, (clinic_id,))
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get veterinarians by clinic error: {str(e)}")
+        return jsonify({"message": f"Failed to get veterinarians: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.post("/veterinarians")
+@role_required("admin")
+def create_veterinarian():
+    data = request.json
+    license_no = data.get("license_no")
+    user_id = data.get("user_id")
+    clinic_id = data.get("clinic_id")
+
+    if not license_no:
+        return jsonify({"message": "license_no is required"}), 400
+
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM veterinarian WHERE license_no=%s", (license_no,))
+                if cur.fetchone():
+                    return jsonify({"message": "License already exists"}), 400
+
+                if user_id:
+                    cur.execute("SELECT 1 FROM \"user\" WHERE user_id=%s", (user_id,))
+                    if not cur.fetchone():
+                        return jsonify({"message": "User not found"}), 404
+
+                vet_id = dialect.insert_returning(
+                    cur,
+                    "INSERT INTO veterinarian (license_no, user_id) VALUES (%s, %s)",
+                    (license_no, user_id),
+                    "veterinarian_id"
+                )
+
+                if clinic_id:
+                    cur.execute("SELECT 1 FROM clinic WHERE clinic_id=%s", (clinic_id,))
+                    if not cur.fetchone():
+                        return jsonify({"message": "Clinic not found"}), 404
+                    cur.execute(VET_CLINIC_LINK_SQL, (vet_id, clinic_id))
+
+                if user_id:
+                    token_cache.publish(cur, "invalidate_user", user_id)
+                conn.commit()
+                if user_id:
+                    token_cache.invalidate_user(user_id)
+    except Exception as e:
+        conn.rollback()
+        print(f"Create veterinarian error: {str(e)}")
+        return jsonify({"message": f"Failed to create veterinarian: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"message": "Veterinarian created", "veterinarian_id": vet_id}), 201
+
+
+@bp.get("/veterinarians/<int:vet_id>/schedules")
+@jwt_required()
+def get_veterinarian_schedules(vet_id):
+    conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=TupleCursor) as cur:
+                cur.execute(queries.VET_SCHEDULES, (vet_id,))
+                return rows_response(cur)
+    except Exception as e:
+        print(f"Get schedules error: {str(e)}")
+        return jsonify({"message": f"Failed to get schedules: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+
+@bp.post("/veterinarian-schedules")
+@role_required("veterinarian", "admin")
+def create_schedule():
+    try:
+        data = request.json
+        
+        # Validate required fields
+        if not data.get("day") or not data.get("time_start") or not data.get("time_end") or not data.get("veterinarian_id"):
+            return jsonify({"message": "Missing required fields: day, time_start, time_end, veterinarian_id"}), 400
+        
+        # Normalize day to lowercase
+        day_lower = data["day"].lower()
+        
+        # Validate day value
+        valid_days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+        if day_lower not in valid_days:
+            return jsonify({"message": f"Invalid day. Must be one of: {', '.join(valid_days)}"}), 400
+
+        conn = get_connection()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    # Check if veterinarian exists
+                    cur.execute("SELECT veterinarian_id FROM veterinarian WHERE veterinarian_id=%s", (data["veterinarian_id"],))
+                    if not cur.fetchone():
+                        return jsonify({"message": "Veterinarian not found"}), 404
+                    
+                    # Check if schedule already exists for this day
+                    cur.execute(
+                        "SELECT schedule_id FROM veterinarian_schedule WHERE veterinarian_id=%s AND LOWER(day)=%s",
+                        (data["veterinarian_id"], day_lower)
+                    )
+                    if cur.fetchone():
+                        return jsonify({"message": "Schedule already exists for this day"}), 400
+                    
+                    # Insert schedule with normalized day
+                    cur.execute("""
+                        INSERT INTO veterinarian_schedule
+                        (day, time_start, time_end, veterinarian_id)
+                        VALUES (%s, %s, %s, %s)
+                    """, (
+                        day_lower,
+                        data["time_start"],
+                        data["time_end"],
+                        data["veterinarian_id"]
+                    ))
+                    conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+        return jsonify({"message": "Schedule created successfully"}), 201
+    
+    except PoolTimeout:
+        raise  # answered with 503 by admission
+    except Exception as e:
+        print(f"Error creating schedule: {str(e)}")
+        return jsonify({"message": f"Failed to create schedule: {str(e)}"}), 500
@@ -0,0 +1,90 @@
+"""
+Shard routing by clinic_id, and parallel fan-out across shards.
+
+With DB_SHARDS set (db.py), appointment and treatment_record live in per-shard databases.
+The global tables stay in the central database (DB_HOST...): "user", role, user_role,
+clinic, veterinarian, veterinarian_clinic, pet, pet_owner and veterinarian_schedule. Each
+shard subscribes to a logical-replication copy of them (migrations/003_shard_publication.sql,
+004_shard_node.sql), so the appointment joins, the booking checks and token_cache's lookups
+run unchanged on whichever shard holds the rows.
+
+Placement:
+
+    for_clinic(clinic_id)  clinic_id % shard count; a clinic's appointments and their
+                           treatment records are all on one shard
+    for_id(row_id)         appointment_id / record_id % shard count; each shard's id
+                           sequences are interleaved (INCREMENT BY count) so the id says
+                           where the row is
+
+find() looks on the home shard first and falls back to the others only on a miss (rows
+copied in before the cut-over keep their old ids). fan_out() runs a query on every shard in
+parallel (parallel.py), one pooled connection each, under the request's time budget, so an
+admin listing or a report costs the slowest shard rather than the sum of all of them. Without DB_SHARDS
+there is a single shard, the central database, and everything runs inline.
+"""
+from functools import partial
+
+import budgets
+import parallel
+from db import DB_SHARDS, get_connection, release_connection
+
+
+def count():
+    return len(DB_SHARDS) or 1
+
+
+def enabled():
+    return count() > 1
+
+
+def for_clinic(clinic_id):
+    try:
+        return int(clinic_id) % count()
+    except (TypeError, ValueError):
+        return 0  # invalid ids fail validation wherever they go
+
+
+def for_id(row_id):
+    return int(row_id) % count()
+
+
+def run_on(shard, run, cursor_factory=None):
+    """run(cur) in a transaction of its own on `shard`; returns what it returns."""
+    conn = get_connection(shard=shard)
+    try:
+        cursor = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+        with budgets.wrap_cursor(conn, cursor) as cur:
+            result = run(cur)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_connection(conn, shard=shard)
+
+
+def fan_out(run, shards=None, cursor_factory=None):
+    """
+    run(cur) on each of `shards` (default all) in parallel; returns the results in shard
+    order and raises the first error. run must not use `request`; g, current_app and the
+    token cache are available.
+    """
+    return parallel.gather(*calls(run, shards, cursor_factory))
+
+
+def calls(run, shards=None, cursor_factory=None):
+    """fan_out() as calls for parallel.gather(), to run alongside other queries."""
+    targets = range(count()) if shards is None else shards
+    return [partial(run_on, shard, run, cursor_factory) for shard in targets]
+
+
+def find(run, home, cursor_factory=None):
+    """run(cur) on shard `home`, then on the other shards if that returned nothing; first result."""
+    result = run_on(home, run, cursor_factory)
+    if result or not enabled():
+        return result
+    for result in fan_out(run, [shard for shard in range(count()) if shard != home], cursor_factory):
+        if result:
+            return result
+    return None
@@ -0,0 +1,445 @@
+"""
+Shared cache tier for multi-worker deployments, and cross-worker invalidation.
+
+Caches kept in a worker (token_cache.py, detail_cache.py) are duplicated in every gunicorn
+worker and node, and a write handled by one worker leaves the others' copies stale. This
+module adds two things:
+
+    namespace(name, ttl)   a cache namespace in a backend every worker shares:
+                           RespBackend (CACHE_URL=redis://..., any Redis-compatible server
+                           or `python resp.py`) or MemoryBackend, the in-process reference
+                           implementation used when CACHE_URL is empty
+    broadcaster            Postgres LISTEN/NOTIFY on CACHE_NOTIFY_CHANNEL: a write
+                           publishes its invalidation in its own transaction, and every
+                           other worker applies it to its own in-process caches
+
+Keys are "<CACHE_PREFIX><namespace>:<key>". Every value carries the namespace version
+and the key's version it was loaded under, read in the same round trip as the value, so
+invalidate(key) and clear() (which bump those versions) also reject a value that a slow
+reader stores after the write that invalidated it. Values are pickled: the server must be
+private to the deployment, like the database.
+
+get_or_set() is single-flight: one thread per process computes a missing key while the
+others wait for its result, and across processes a lock key (SET NX PX CACHE_LOCK_MS)
+lets one worker compute while the rest poll for the value. When the backend cannot be
+reached, lookups count as misses for BACKEND_RETRY_SECONDS and the loader runs directly.
+
+publish(cur, ...) runs pg_notify() on the writer's own cursor before its commit, so the
+notification goes out only if the write commits, and the write needs no second connection.
+Writes to appointment and treatment_record notify on their shard (shards.py), so the
+listener runs one dedicated connection (db.listen_connection()) per database: the central
+one and every DB_SHARDS entry. It is a daemon thread per worker, started by the first
+request so preloaded gunicorn masters fork without it. After a reconnect the subscribers
+reset their caches, since notifications sent while the listener was away are lost.
+
+LISTEN needs a server session of its own, which a transaction pooler (Supabase on port
+6543, pgbouncer in transaction mode) does not keep, so notifications sent through one are
+never delivered:
+
+    CACHE_NOTIFY=auto (default) - on, except when a database to LISTEN on is reached on
+                                  port 6543 (set CACHE_NOTIFY_DSN to a session-mode port)
+    CACHE_NOTIFY=1 / 0          - force on / off
+
+MySQL has no NOTIFY. Where broadcasting is off, the in-process caches rely on their TTLs.
+"""
+import json
+import os
+import pickle
+import select
+import threading
+import time
+import uuid
+
+from db import DB_SHARDS, dialect, listen_connection
+from resp import RespClient, RespError
+
+BACKEND_RETRY_SECONDS = 5.0
+# versions outlive the values they guard by this much (a load in flight when they expire)
+VERSION_GRACE_MS = 60000
+LOCK_POLL_SECONDS = 0.02
+
+_MISSING = object()
+
+
+class MemoryBackend:
+    """Reference backend: the same operations on a dict in this process."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def lookup(self, keys):
+        """Values of `keys` (bytes or None) in one round trip."""
+        now = time.monotonic()
+        with self._lock:
+            return [item[0] if item else None for item in (self._live(key, now) for key in keys)]
+
+    def store(self, key, value, ttl_ms, only_if_absent=False):
+        now = time.monotonic()
+        with self._lock:
+            if only_if_absent and self._live(key, now):
+                return False
+            self._data[key] = (value, now + ttl_ms / 1000.0)
+            if len(self._data) > self.max_keys:
+                # expired keys first, then the oldest
+                for stale in [k for k, (_, expires_at) in self._data.items() if expires_at and expires_at <= now]:
+                    del self._data[stale]
+                while len(self._data) > self.max_keys:
+                    del self._data[next(iter(self._data))]
+            return True
+
+    def bump(self, key, ttl_ms=None, delete=()):
+        """Increment the counter `key` (optionally re-arming its TTL) and delete `delete`."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._live(key, now)
+            value = int(item[0]) + 1 if item else 1
+            expires_at = now + ttl_ms / 1000.0 if ttl_ms else (item[1] if item else None)
+            self._data[key] = (str(value).encode("utf-8"), expires_at)
+            for other in delete:
+                self._data.pop(other, None)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RespBackend:
+    """The same operations as pipelined commands to a Redis-compatible server."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def lookup(self, keys):
+        return self.client.pipeline(*[("GET", key) for key in keys])
+
+    def store(self, key, value, ttl_ms, only_if_absent=False):
+        command = ["SET", key, value, "PX", int(ttl_ms)]
+        if only_if_absent:
+            command.append("NX")
+        return self.client.execute(*command) is not None
+
+    def bump(self, key, ttl_ms=None, delete=()):
+        commands = [("INCR", key)]
+        if ttl_ms:
+            commands.append(("PEXPIRE", key, int(ttl_ms)))
+        if delete:
+            commands.append(("DEL",) + tuple(delete))
+        return self.client.pipeline(*commands)[0]
+
+    def delete(self, key):
+        self.client.execute("DEL", key)
+
+
+def _version(raw):
+    return int(raw) if raw is not None else 0
+
+
+class Namespace:
+    """Keys of one cache in the shared tier, with a default TTL in seconds."""
+
+    def __init__(self, tier, name, ttl):
+        self.tier = tier
+        self.name = name
+        self.ttl = ttl
+        self._prefix = f"{tier.prefix}{name}:"
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "waits": 0, "invalidations": 0}
+
+    def _keys(self, key):
+        # value, namespace version, key version, compute lock
+        return (f"{self._prefix}{key}", f"{self._prefix}_v", f"{self._prefix}_v:{key}", f"{self._prefix}_lock:{key}")
+
+    def _lookup(self, key, with_lock=False):
+        """(value or _MISSING, versions it must carry, lock held elsewhere)."""
+        value_key, ns_key, key_key, lock_key = self._keys(key)
+        replies = self.tier.call("lookup", [value_key, ns_key, key_key] + ([lock_key] if with_lock else []))
+        if replies is None:
+            return _MISSING, None, False
+        versions = (_version(replies[1]), _version(replies[2]))
+        value = _MISSING
+        if replies[0] is not None:
+            stored_versions, payload = pickle.loads(replies[0])
+            if tuple(stored_versions) == versions:
+                value = payload
+        return value, versions, with_lock and replies[3] is not None
+
+    def get(self, key, default=None):
+        value, _, _ = self._lookup(key)
+        self.stats["hits" if value is not _MISSING else "misses"] += 1
+        return default if value is _MISSING else value
+
+    def set(self, key, value, versions=None, ttl=None):
+        """Store `value`; `versions` from the lookup before loading it, else the current ones."""
+        if versions is None:
+            _, versions, _ = self._lookup(key)
+            if versions is None:
+                return
+        ttl_ms = (self.ttl if ttl is None else ttl) * 1000
+        self.tier.call("store", self._keys(key)[0], pickle.dumps((versions, value)), ttl_ms)
+
+    def invalidate(self, key):
+        """Drop `key` in every worker's view, including loads already in flight."""
+        value_key, _, key_key, _ = self._keys(key)
+        self.stats["invalidations"] += 1
+        self.tier.call("bump", key_key, self.ttl * 1000 + VERSION_GRACE_MS, (value_key,))
+
+    def clear(self):
+        """Drop every key of the namespace."""
+        self.stats["invalidations"] += 1
+        self.tier.call("bump", self._keys("")[1])
+
+    def get_or_set(self, key, loader, stored=None):
+        """
+        The cached value of `key`, or loader()'s result, stored unless it is None. Single-
+        flight within the process and, through a lock key, across workers. `stored(value)`
+        picks what goes into the cache when that differs from what the caller gets.
+        """
+        value, versions, _ = self._lookup(key)
+        if value is not _MISSING:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {"done": threading.Event(), "value": _MISSING}
+        if not leader:
+            self.stats["waits"] += 1
+            flight["done"].wait(self.tier.lock_ms / 1000.0)
+            return loader() if flight["value"] is _MISSING else flight["value"]
+
+        try:
+            value = self._load(key, loader, versions, stored)
+            flight["value"] = value
+            return value
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight["done"].set()
+
+    def _load(self, key, loader, versions, stored):
+        lock_key = self._keys(key)[3]
+        owns_lock = versions is not None and self.tier.call("store", lock_key, b"1", self.tier.lock_ms, True)
+        if versions is not None and not owns_lock:
+            # another worker is computing it: wait for its value or for its lock to go
+            self.stats["waits"] += 1
+            deadline = time.monotonic() + self.tier.lock_ms / 1000.0
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                value, versions, locked = self._lookup(key, with_lock=True)
+                if value is not _MISSING:
+                    return value
+                if not locked:
+                    break
+        self.stats["loads"] += 1
+        try:
+            value = loader()
+            if value is not None and versions is not None:
+                self.set(key, stored(value) if stored else value, versions)
+            return value
+        finally:
+            if owns_lock:
+                self.tier.call("delete", lock_key)
+
+
+class SharedCache:
+    """A backend plus the process-wide settings of its namespaces."""
+
+    def __init__(self, backend, prefix="pawpoint:", lock_ms=5000, shared=False):
+        self.backend = backend
+        self.prefix = prefix
+        self.lock_ms = lock_ms
+        # True when the backend is a server every worker reaches, not this process's memory
+        self.shared = shared
+        self.errors = 0
+        self._down_until = 0.0
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def call(self, method, *args):
+        """backend.method(*args), or None while the backend is unreachable."""
+        if time.time() < self._down_until:
+            return None
+        try:
+            return getattr(self.backend, method)(*args)
+        except (OSError, RespError) as e:
+            # don't pay a connect timeout on every lookup while the backend is away
+            print(f"Shared cache backend error: {str(e)}")
+            self.errors += 1
+            self._down_until = time.time() + BACKEND_RETRY_SECONDS
+            return None
+
+    def namespace(self, name, ttl):
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = Namespace(self, name, ttl)
+            return self._namespaces[name]
+
+    def stats(self):
+        with self._lock:
+            namespaces = {name: dict(ns.stats) for name, ns in self._namespaces.items()}
+        return {"backend": type(self.backend).__name__, "errors": self.errors, "namespaces": namespaces}
+
+
+class Broadcaster:
+    """
+    Invalidations between workers over LISTEN/NOTIFY. Subscribers get handler(op, args,
+    kwargs) for what other workers publish, and handler("reset", [], {}) when the
+    listener reconnects.
+    """
+
+    def __init__(self, channel="pawpoint_cache", dsns=(None,), enabled=True):
+        self.channel = channel
+        # databases to LISTEN on; None is the central one (DB_* settings)
+        self.dsns = list(dsns)
+        self.enabled = enabled
+        self.node = uuid.uuid4().hex
+        self._handlers = {}
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats = {"sent": 0, "received": 0, "reconnects": 0}
+
+    def subscribe(self, namespace, handler):
+        self._handlers[namespace] = handler
+
+    def publish(self, cur, namespace, op, *args, **kwargs):
+        """
+        Queue `op` for the other workers in the transaction of `cur`: Postgres delivers it
+        when that transaction commits and drops it on rollback. The caller applies `op` to
+        this worker's caches after its commit.
+        """
+        if not self.enabled:
+            return
+        payload = json.dumps({"node": self.node, "ns": namespace, "op": op, "args": args, "kwargs": kwargs})
+        cur.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+        self.stats["sent"] += 1
+
+    def start(self):
+        """Start this process's listener thread once (again after a fork)."""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._listen, name="cache-listener", daemon=True).start()
+
+    def _dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("node") == self.node:
+            return
+        handler = self._handlers.get(message.get("ns"))
+        if handler is not None:
+            self.stats["received"] += 1
+            handler(message["op"], message.get("args") or [], message.get("kwargs") or {})
+
+    def _reset(self):
+        for handler in list(self._handlers.values()):
+            handler("reset", [], {})
+
+    def _listen(self):
+        connected_before = False
+        while True:
+            conns = []
+            try:
+                for dsn in self.dsns:
+                    conns.append(listen_connection(dsn))
+                    with conns[-1].cursor() as cur:
+                        cur.execute(f'LISTEN "{self.channel}"')
+                if connected_before:
+                    # whatever was published while nobody listened is lost
+                    self._reset()
+                connected_before = True
+                while True:
+                    for conn in select.select(conns, [], [], 5.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Cache invalidation listener error: {str(e)}")
+                self.stats["reconnects"] += 1
+            finally:
+                for conn in conns:
+                    conn.close()
+            time.sleep(BACKEND_RETRY_SECONDS)
+
+
+def _port(dsn):
+    """Port a LISTEN connection to `dsn` (None: the DB_* settings) would use."""
+    if dsn is None:
+        return int(os.environ.get("DB_PORT", 6543))
+    from psycopg2.extensions import parse_dsn
+
+    return int(parse_dsn(dsn).get("port") or 5432)
+
+
+def notify_enabled(setting, dsns):
+    """Whether to broadcast for CACHE_NOTIFY `setting`, listening on `dsns`."""
+    if dialect.name != "postgres":
+        return False
+    setting = str(setting).strip().lower()
+    if setting in ("0", "false", "off"):
+        return False
+    pooled = [dsn for dsn in dsns if _port(dsn) == 6543]
+    if not pooled:
+        return True
+    if setting in ("1", "true", "on"):
+        print(f"Cache invalidation broadcast forced on with {len(pooled)} LISTEN connection(s) on port 6543")
+        return True
+    print(
+        f"Cache invalidation broadcast disabled: {len(pooled)} LISTEN connection(s) would go through "
+        "the transaction pooler on port 6543 and receive nothing; set CACHE_NOTIFY_DSN (and DB_SHARDS) "
+        "to session-mode ports. Until then other workers' caches are only refreshed by their TTLs."
+    )
+    return False
+
+
+tier = SharedCache(MemoryBackend())
+broadcaster = Broadcaster(enabled=False)
+
+
+def init_shared_cache(app):
+    global tier
+    app.config.setdefault("CACHE_URL", os.environ.get("CACHE_URL", ""))
+    app.config.setdefault("CACHE_PREFIX", os.environ.get("CACHE_PREFIX", "pawpoint:"))
+    app.config.setdefault("CACHE_LOCK_MS", int(os.environ.get("CACHE_LOCK_MS", 5000)))
+    app.config.setdefault("CACHE_NOTIFY", os.environ.get("CACHE_NOTIFY", "auto"))
+    app.config.setdefault("CACHE_NOTIFY_CHANNEL", os.environ.get("CACHE_NOTIFY_CHANNEL", "pawpoint_cache"))
+    app.config.setdefault("CACHE_NOTIFY_DSN", os.environ.get("CACHE_NOTIFY_DSN", ""))
+
+    url = app.config["CACHE_URL"]
+    backend = RespBackend(RespClient(url)) if url else MemoryBackend()
+    tier = SharedCache(backend, app.config["CACHE_PREFIX"], app.config["CACHE_LOCK_MS"], shared=bool(url))
+    broadcaster.channel = app.config["CACHE_NOTIFY_CHANNEL"]
+    broadcaster.dsns = [app.config["CACHE_NOTIFY_DSN"] or None] + DB_SHARDS
+    broadcaster.enabled = notify_enabled(app.config["CACHE_NOTIFY"], broadcaster.dsns)
+
+    @app.before_request
+    def _start_listener():
+        broadcaster.start()
+
+    return tier
+
+
+def namespace(name, ttl):
+    return tier.namespace(name, ttl)
+
+
+def stats():
+    return dict(tier.stats(), shared=tier.shared, broadcast=dict(broadcaster.stats, enabled=broadcaster.enabled))
@@ -0,0 +1,250 @@
+"""
+Per-token cache of verified JWT claims and the user state resolved from them.
+
+flask_jwt_extended still verifies the signature and expiry of every request; this module
+keeps what the handlers derive from a token afterwards, keyed by its JTI in a bounded LRU:
+
+    - the claims, the parsed integer user id and the role
+    - resolved ids: the caller's veterinarian_id and clinic ids (issued as claims at /login,
+      see vet_claims()) and the pet ids they own (looked up on first use)
+
+so a vet-scoped query can filter on a.veterinarian_id directly instead of joining
+veterinarian on user_id on every request. Entries expire with their token.
+
+Handlers that change what a user resolves to (pets created or deleted, a license bound to
+a user, clinic assignments) call invalidate_user() after their commit. That drops the
+resolved ids of the user's cached tokens and marks claims issued before now as stale, so
+the next request resolves them from the database instead of trusting the token. The cache
+is per process; TOKEN_CACHE_SIZE bounds the number of tokens kept. Before the commit the
+handler publish()es the invalidation in its transaction, and the other workers apply it
+to their own caches once it commits (shared_cache.broadcaster).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from flask import g
+from flask_jwt_extended import get_jwt
+
+import shared_cache
+
+
+class TokenState:
+    """Decoded claims of one token plus the ids resolved for its user."""
+
+    __slots__ = ("claims", "jti", "user_id", "role", "expires_at", "resolved")
+
+    def __init__(self, claims, trust_claims=True):
+        self.claims = claims
+        self.jti = claims.get("jti")
+        self.role = claims.get("role")
+        self.expires_at = claims.get("exp") or float("inf")
+        self.resolved = {}
+        sub = claims.get("sub")
+        try:
+            self.user_id = int(sub)
+        except (TypeError, ValueError):
+            self.user_id = sub
+        if trust_claims and "veterinarian_id" in claims:
+            self.resolved["veterinarian_id"] = claims["veterinarian_id"]
+            self.resolved["clinic_ids"] = tuple(claims.get("clinic_ids") or ())
+
+    def resolve(self, key, loader):
+        """Cached value for `key`, computed once per token with `loader()`."""
+        try:
+            return self.resolved[key]
+        except KeyError:
+            value = self.resolved[key] = loader()
+            return value
+
+
+class TokenCache:
+    """Thread-safe LRU of TokenState by JTI; invalidation scans for the user's tokens."""
+
+    def __init__(self, maxsize=10000, token_lifetime=900.0):
+        self.maxsize = maxsize
+        # seconds an access token is valid (JWT_ACCESS_TOKEN_EXPIRES); invalidations older
+        # than that concern expired tokens only
+        self.token_lifetime = token_lifetime
+        self._entries = OrderedDict()
+        self._invalidated = OrderedDict()  # user_id -> time, oldest first
+        self._reset_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, jti):
+        with self._lock:
+            state = self._entries.get(jti)
+            if state is None:
+                self.misses += 1
+                return None
+            if state.expires_at <= time.time():
+                del self._entries[jti]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(jti)
+            self.hits += 1
+            return state
+
+    def put(self, state):
+        with self._lock:
+            self._entries[state.jti] = state
+            self._entries.move_to_end(state.jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Forget the resolved state of every cached token of `user_id`."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            pass
+        with self._lock:
+            self._mark_invalidated(user_id, time.time())
+            for state in self._entries.values():
+                if state.user_id == user_id:
+                    state.resolved = {}
+
+    def _mark_invalidated(self, user_id, now):
+        # caller holds the lock. Kept to maxsize users: past that, the oldest record still
+        # younger than a token becomes a reset, which distrusts the claims of everyone
+        self._invalidated.pop(user_id, None)
+        self._invalidated[user_id] = now
+        horizon = now - self.token_lifetime
+        while self._invalidated:
+            oldest, at = next(iter(self._invalidated.items()))
+            if at > horizon and len(self._invalidated) <= self.maxsize:
+                break
+            del self._invalidated[oldest]
+            if at > horizon:
+                self._reset_at = max(self._reset_at, at)
+
+    def reset(self):
+        """Invalidate every user: after missed broadcasts nothing resolved so far is trusted."""
+        with self._lock:
+            self._reset_at = time.time()
+            for state in self._entries.values():
+                state.resolved = {}
+
+    def claims_current(self, user_id, claims):
+        """False when `user_id` was invalidated after the token carrying `claims` was issued."""
+        invalidated_at = max(self._invalidated.get(user_id, 0.0), self._reset_at)
+        return not invalidated_at or claims.get("iat", 0) > invalidated_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._reset_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated_users": len(self._invalidated),
+            }
+
+
+cache = TokenCache()
+
+
+def init_token_cache(app):
+    app.config.setdefault("TOKEN_CACHE_SIZE", int(os.environ.get("TOKEN_CACHE_SIZE", 10000)))
+    cache.maxsize = app.config["TOKEN_CACHE_SIZE"]
+    # read before JWTManager sets its defaults; flask_jwt_extended's default is 15 minutes
+    expires = app.config.get("JWT_ACCESS_TOKEN_EXPIRES", timedelta(minutes=15))
+    if isinstance(expires, timedelta):
+        expires = expires.total_seconds()
+    cache.token_lifetime = float(expires) if expires else float("inf")
+    shared_cache.broadcaster.subscribe("token_cache", _apply_broadcast)
+    return cache
+
+
+def _apply_broadcast(op, args, kwargs):
+    if op == "invalidate_user":
+        cache.invalidate_user(*args)
+    elif op == "reset":
+        cache.reset()
+
+
+def current_state():
+    """TokenState of the verified token of this request (after verify_jwt_in_request)."""
+    state = g.get("token_state")
+    if state is not None:
+        return state
+    claims = get_jwt()
+    jti = claims.get("jti")
+    state = cache.get(jti) if jti else None
+    if state is None:
+        state = TokenState(claims)
+        if not cache.claims_current(state.user_id, claims):
+            state = TokenState(claims, trust_claims=False)
+        if jti:
+            cache.put(state)
+    g.token_state = state
+    return state
+
+
+def veterinarian_id(cur):
+    """veterinarian_id of the calling user, or None when they have no veterinarian record."""
+    state = current_state()
+
+    return state.resolve("veterinarian_id", lambda: vet_claims(cur, state.user_id)["veterinarian_id"])
+
+
+def vet_claims(cur, user_id):
+    """veterinarian_id and clinic_ids of a user, as issued in the access token at /login."""
+    cur.execute("""
+        SELECT v.veterinarian_id, vc.clinic_id
+        FROM veterinarian v
+        LEFT JOIN veterinarian_clinic vc ON vc.veterinarian_id = v.veterinarian_id
+        WHERE v.user_id=%s
+        ORDER BY v.veterinarian_id, vc.clinic_id
+    """, (user_id,))
+    rows = cur.fetchall()
+    if not rows:
+        return {"veterinarian_id": None, "clinic_ids": []}
+    vet_id = rows[0][0]
+    return {
+        "veterinarian_id": vet_id,
+        "clinic_ids": [row[1] for row in rows if row[0] == vet_id and row[1] is not None],
+    }
+
+
+def clinic_ids(cur):
+    """
+    Tuple of the clinic ids the calling veterinarian is assigned to (possibly empty). From
+    the token's claims when trusted, which can predate a change made by a worker that has
+    restarted since: not for authorization, check veterinarian_clinic in the write instead.
+    """
+    state = current_state()
+    return state.resolve("clinic_ids", lambda: tuple(vet_claims(cur, state.user_id)["clinic_ids"]))
+
+
+def pet_ids(cur):
+    """
+    Tuple of the pet ids owned by the calling user (possibly empty). Can predate a change
+    made through another worker: not for authorization, check pet_owner in the statement.
+    """
+    state = current_state()
+
+    def load():
+        cur.execute("SELECT pet_id FROM pet_owner WHERE user_id=%s ORDER BY pet_id", (state.user_id,))
+        return tuple(row[0] for row in cur.fetchall())
+
+    return state.resolve("pet_ids", load)
+
+
+def publish(cur, op, *args):
+    """Broadcast `op` ("invalidate_user") with the transaction of `cur`, before its commit."""
+    shared_cache.broadcaster.publish(cur, "token_cache", op, *args)
+
+
+def invalidate_user(user_id):
+    cache.invalidate_user(user_id)
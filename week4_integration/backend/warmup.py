@@ -0,0 +1,148 @@
+"""
+Startup warm-up and the /healthz, /readyz probes.
+
+Without warm-up the first requests after a deploy or a scale-out pay for the pool: every
+connection is a TCP + TLS handshake to Supabase, opened one at a time as requests arrive.
+At startup warm_up() instead:
+
+    1. opens DB_POOL_MIN connections side by side (db.warm_pool)
+    2. runs a readiness probe (SELECT 1) on each of them
+    3. PREPAREs the hot statements on each one when prepared statements are on (prepared.py)
+    4. loads the role directory (roles.py)
+
+WARMUP selects when this happens:
+
+    background (default)  in a thread; /readyz answers 503 until it has finished
+    sync                  before the app serves anything
+    off                   nothing; connections open lazily and /readyz is always ready
+
+A failed warm-up (database unreachable) is retried every WARMUP_RETRY_SECONDS. /healthz
+only says the process is alive. Point the load balancer's readiness check at /readyz so
+it only routes to warm workers.
+
+With WARMUP_DEFER=1 init_warmup() only registers the probes and start() has to be called
+later. gunicorn.conf.py does this from post_worker_init, so with --preload every worker
+opens its own connections instead of inheriting sockets from the master.
+"""
+import os
+import threading
+import time
+
+from flask import jsonify
+
+import prepared
+import projection
+import queries
+import roles
+from db import DB_POOL_MIN, get_connection, release_connection, warm_pool
+from json_provider import json_agg_sql
+
+_lock = threading.Lock()
+state = {"phase": "cold", "ready": False, "error": None, "connections": 0, "prepared": 0, "took_ms": None}
+
+
+def hot_statements(app):
+    """The statement texts the busiest handlers run, as they will reach prepared.execute()."""
+    appointment_fields = projection.APPOINTMENTS.parse(None)
+    treatment_fields = projection.TREATMENTS.parse(None)
+    listings = [
+        projection.APPOINTMENTS.build(appointment_fields, queries.where(["a.veterinarian_id = %s"])),
+        projection.APPOINTMENTS.build(appointment_fields, queries.where(["po.user_id = %s"]), required=("po",)),
+        projection.TREATMENTS.build(treatment_fields),
+    ]
+    if app.config.get("PG_JSON_AGG"):
+        listings = [json_agg_sql(sql) for sql in listings]
+    return listings + [
+        projection.APPOINTMENTS.build(appointment_fields, "WHERE a.appointment_id = %s"),
+        projection.APPOINTMENTS.build(
+            appointment_fields, "WHERE a.appointment_id = %s AND a.veterinarian_id = %s"
+        ),
+        projection.APPOINTMENTS.build(
+            appointment_fields, "WHERE a.appointment_id = %s AND po.user_id = %s", required=("po",)
+        ),
+        queries.VET_CLINIC_CHECK,
+        queries.VET_SCHEDULES,
+    ]
+
+
+def _set(**values):
+    with _lock:
+        state.update(values)
+
+
+def warm_up(app):
+    """Run the startup phase once; returns True when the process is ready."""
+    started = time.monotonic()
+    _set(phase="warming", error=None)
+    conns = []
+    try:
+        warm_pool(DB_POOL_MIN)
+        statements = hot_statements(app) if prepared.enabled() else []
+        prepared_count = 0
+        for _ in range(DB_POOL_MIN):
+            conns.append(get_connection())
+        for i, conn in enumerate(conns):
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")  # readiness probe
+                cur.fetchone()
+                for sql in statements:
+                    prepared_count += prepared.prepare(cur, sql)
+                if i == 0:
+                    roles.load_roles(cur)
+            conn.commit()
+    except Exception as e:
+        print(f"Warm-up error: {str(e)}")
+        _set(phase="failed", error=str(e))
+        return False
+    finally:
+        for conn in conns:
+            release_connection(conn)
+    _set(
+        phase="ready",
+        ready=True,
+        connections=len(conns),
+        prepared=prepared_count,
+        took_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return True
+
+
+def _warm_until_ready(app):
+    while not warm_up(app):
+        time.sleep(app.config["WARMUP_RETRY_SECONDS"])
+
+
+def start(app):
+    """Start the warm-up selected by WARMUP in this process."""
+    mode = app.config["WARMUP"]
+    if mode == "off":
+        _set(phase="ready", ready=True)
+    elif mode == "sync":
+        _warm_until_ready(app)
+    else:
+        threading.Thread(target=_warm_until_ready, args=(app,), name="warmup", daemon=True).start()
+
+
+def init_warmup(app):
+    """Register /healthz and /readyz and, unless WARMUP_DEFER is set, start the warm-up."""
+    app.config.setdefault("WARMUP", os.environ.get("WARMUP", "background").strip().lower())
+    app.config.setdefault("WARMUP_RETRY_SECONDS", float(os.environ.get("WARMUP_RETRY_SECONDS", 5)))
+    app.config.setdefault("WARMUP_DEFER", os.environ.get("WARMUP_DEFER", "0") == "1")
+
+    @app.get("/healthz")
+    def healthz():
+        return jsonify({"status": "ok"})
+
+    @app.get("/readyz")
+    def readyz():
+        with _lock:
+            snapshot = dict(state)
+        if not snapshot["ready"]:
+            response = jsonify(dict(snapshot, status=snapshot["phase"]))
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        return jsonify(dict(snapshot, status="ready"))
+
+    if not app.config["WARMUP_DEFER"]:
+        start(app)
+    return app
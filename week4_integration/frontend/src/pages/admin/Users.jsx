@@ -8,19 +8,21 @@ const Users = () => {
   const [roleFilter, setRoleFilter] = useState('all');
 
   useEffect(() => {
-    const fetchUsers = async () => {
+    // Debounced server-side typeahead; an empty term loads the full list
+    const term = searchTerm.trim();
+    const timer = setTimeout(async () => {
       try {
-        const response = await userAPI.getAll();
+        const response = await userAPI.getAll(term ? { q: term } : undefined);
         setUsers(response.data);
       } catch (err) {
         console.error('Failed to fetch users:', err);
       } finally {
         setLoading(false);
       }
-    };
+    }, term ? 250 : 0);
 
-    fetchUsers();
-  }, []);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   const getRoleColor = (role) => {
     const colors = {
@@ -40,16 +42,10 @@ const Users = () => {
     return icons[role?.toLowerCase()] || '👤';
   };
 
-  const filteredUsers = users.filter(user => {
-    const matchesSearch = 
-      user.first_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.last_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      user.email?.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    const matchesRole = roleFilter === 'all' || user.role?.toLowerCase() === roleFilter.toLowerCase();
-    
-    return matchesSearch && matchesRole;
-  });
+  // Search matching and ranking happen on the server (?q=); only the role filter stays client-side
+  const filteredUsers = users.filter(user => 
+    roleFilter === 'all' || user.role?.toLowerCase() === roleFilter.toLowerCase()
+  );
 
   const roleStats = {
     total: users.length,
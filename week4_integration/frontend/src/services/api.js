@@ -43,7 +43,7 @@ export const authAPI = {
 
 // Pet endpoints
 export const petAPI = {
-  getAll: () => api.get('/pets'),
+  getAll: (params) => api.get('/pets', { params }),
   getById: (id) => api.get(`/pets/${id}`),
   create: (data) => api.post('/pets', data),
   update: (id, data) => api.put(`/pets/${id}`, data),
@@ -79,7 +79,7 @@ export const vetAPI = {
 
 // Clinic endpoints
 export const clinicAPI = {
-  getAll: () => api.get('/clinics'),
+  getAll: (params) => api.get('/clinics', { params }),
   getById: (id) => api.get(`/clinics/${id}`),
   create: (data) => api.post('/clinics', data),
   update: (id, data) => api.put(`/clinics/${id}`, data),
@@ -87,13 +87,13 @@ export const clinicAPI = {
 
 // User endpoints
 export const userAPI = {
-  getAll: () => api.get('/users'),
+  getAll: (params) => api.get('/users', { params }),
   getById: (id) => api.get(`/users/${id}`),
 };
 
 // Owner endpoints
 export const ownerAPI = {
-  getAll: () => api.get('/owners'),
+  getAll: (params) => api.get('/owners', { params }),
   create: (data) => api.post('/owners', data),
 };
 